@@ -0,0 +1,20 @@
+from .bench import run_benchmarks, bench_importers, bench_filters, bench_features, bench_pipeline, bench_streaming, bench_precision
+from .fixtures import write_csv_fixture, write_rr_fixture, write_wfdb_fixture
+from .synthetic import generate_ecg, generate_abp, generate_rr, SCALES
+
+__all__ = [
+    "run_benchmarks",
+    "bench_importers",
+    "bench_filters",
+    "bench_features",
+    "bench_pipeline",
+    "bench_streaming",
+    "bench_precision",
+    "write_csv_fixture",
+    "write_rr_fixture",
+    "write_wfdb_fixture",
+    "generate_ecg",
+    "generate_abp",
+    "generate_rr",
+    "SCALES"
+]
@@ -0,0 +1,40 @@
+import argparse
+
+from .bench import run_benchmarks
+from .synthetic import SCALES
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m cmda.benchmarks',
+        description='Run the CMDA benchmark suite on synthetic ECG/ABP/RR records.'
+    )
+    parser.add_argument('--scale', choices=list(SCALES), default='1h', help='duration of the synthetic records')
+    parser.add_argument('--fs', type=float, default=125, help='sampling frequency of the synthetic records [Hz]')
+    parser.add_argument('--n-records', type=int, default=2, help='number of records of each format')
+    parser.add_argument('--win-len', type=float, default=10, help='window length [s]')
+    parser.add_argument('--n-windows', type=int, default=100, help='number of windows of the importer, filter and feature benchmarks')
+    parser.add_argument('--n-jobs', type=int, default=1, help='number of jobs of the pipeline benchmark')
+    parser.add_argument('--repeat', type=int, default=1, help='number of repetitions of each case')
+    parser.add_argument('--workdir', default=None, help='directory of the fixtures (reused between runs)')
+    parser.add_argument('--suites', nargs='+', default=['importers', 'filters', 'features', 'pipeline', 'streaming', 'precision'],
+                        help='benchmark suites to run')
+    parser.add_argument('--output', default='benchmarks.json', help='path of the JSON output file')
+    args = parser.parse_args()
+
+    run_benchmarks(
+        scale=args.scale,
+        fs=args.fs,
+        n_records=args.n_records,
+        win_len=args.win_len,
+        n_windows=args.n_windows,
+        n_jobs=args.n_jobs,
+        repeat=args.repeat,
+        workdir=args.workdir,
+        output=args.output,
+        suites=tuple(args.suites),
+    )
+
+
+if __name__ == '__main__':
+    main()
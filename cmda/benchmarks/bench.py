@@ -0,0 +1,534 @@
+import os
+import sys
+import json
+import time
+import pickle
+import platform
+import tempfile
+import datetime
+import subprocess
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from ..read_data import ReadCSV, RollingWindowCSV, ReadWFDB, RollingWindowWFDB
+from ..feature_extraction import Features
+from ..preprocessing import Filters
+from ..pipeline import Pipeline, StreamingPipeline
+from ..pipeline._tasks import _process_data
+from ..utils.precision import precision
+from .synthetic import SCALES
+from .fixtures import write_csv_fixture, write_rr_fixture, write_wfdb_fixture
+
+
+
+# arguments of the built-in filters, given by their names in `Filters._ff_list` and `Filters._hrv_list`
+_FILTER_ARGS = {
+    'butter_filter': {'cutoff': 20},
+    'rm_outlier_quantile': {'q_up': 0.99, 'q_low': 0.01},
+    'rm_outlier': {'low': -5, 'high': 5},
+    'scaler': {'factor': 1000},
+    'interpolate_na': {},
+    'rr_rm_outlier': {},
+    'rr_rm_ectopic': {},
+    'rr_scaler': {'factor': 1000},
+    'rr_interpolate': {},
+}
+
+# features of each family, added by the `Features.add` functions
+_FEATURE_FAMILIES = {
+    'td': {
+        'mean': lambda f: f.add.mean(),
+        'max': lambda f: f.add.max(),
+        'min': lambda f: f.add.min(),
+        'median': lambda f: f.add.median(),
+        'std': lambda f: f.add.std(),
+        'skewness': lambda f: f.add.skewness(),
+        'kurtosis': lambda f: f.add.kurtosis(),
+        'rms': lambda f: f.add.rms(),
+        'p2p': lambda f: f.add.p2p(),
+        'mad': lambda f: f.add.mad(),
+        'zcr': lambda f: f.add.zcr(),
+        'perm_entropy': lambda f: f.add.perm_entropy(),
+        'sample_entropy': lambda f: f.add.sample_entropy(),
+    },
+    'ps': {
+        'periodogram': lambda f: f.add.periodogram(),
+        'welch': lambda f: f.add.welch(),
+    },
+    'fd': {
+        'mnf': lambda f: f.add.mnf(),
+        'mdf': lambda f: f.add.mdf(),
+        'stdf': lambda f: f.add.stdf(),
+        'vcf': lambda f: f.add.vcf(),
+        'psr': lambda f: f.add.psr(),
+        'peaks': lambda f: f.add.peaks(),
+        'band_power': lambda f: f.add.band_power(low=0.5, high=40),
+        'band_mnf': lambda f: f.add.band_mnf(low=0.5, high=40),
+        'band_mdf': lambda f: f.add.band_mdf(low=0.5, high=40),
+        'band_agg': lambda f: f.add.band_agg(low=0.5, high=40),
+        'spectral_entropy': lambda f: f.add.spectral_entropy(),
+    },
+    'wf': {
+        'swt_features': lambda f: f.add.swt_features(features=['mnf', 'psr', 'mds'], level=4, start_level=1),
+    },
+    'hrv': {
+        'hrv_time_domain_features': lambda f: f.add.hrv_time_domain_features(),
+        'hrv_nonlinear_features': lambda f: f.add.hrv_nonlinear_features(),
+        'hrv_spectral_features': lambda f: f.add.hrv_spectral_features(fs=4),
+    },
+}
+
+
+def _timeit(func, repeat = 1):
+    # best wall and CPU time of `repeat` runs
+    walls, cpus = [], []
+    for _ in range(repeat):
+        t_wall, t_cpu = time.perf_counter(), time.process_time()
+        func()
+        walls.append(time.perf_counter() - t_wall)
+        cpus.append(time.process_time() - t_cpu)
+    return min(walls), min(cpus)
+
+
+def _case(group, name, func, n = 1, repeat = 1, **params):
+    # run a benchmark case, a failing case is recorded with its error instead of stopping the suite
+    res = {'group': group, 'name': name, 'n': n, **params}
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            wall, cpu = _timeit(func, repeat=repeat)
+        res.update(wall_time=wall, cpu_time=cpu, wall_time_per_item=wall/n, error=None)
+    except Exception as e:
+        res.update(wall_time=None, cpu_time=None, wall_time_per_item=None, error=f'{type(e).__name__}: {e}')
+    print(f"{group:>10} {name:<45} " + (
+        f"{res['wall_time']:10.4f} s" if res['error'] is None else f"failed ({res['error']})"
+    ))
+    return res
+
+
+def _windows(x, fs, win_len, n_windows):
+    win = int(win_len*fs)
+    n_windows = min(n_windows, len(x)//win)
+    return [x[i*win:(i+1)*win] for i in range(n_windows)]
+
+
+def bench_importers(csv_files, csv_time_files, wfdb_records, fs, win_len = 10, n_windows = 100, repeat = 1):
+    '''
+    Time the importers: generating the iterators, reading single windows and reading grouped windows.
+
+    Args:
+        csv_files (list): paths of the CSV fixtures.
+        csv_time_files (list): paths of the CSV fixtures with a `time` column.
+        wfdb_records (list): paths of the WFDB fixtures.
+        fs (float): sampling frequency of the fixtures.
+        win_len (float, optional): window length in seconds. Defaults to 10.
+        n_windows (int, optional): number of windows read. Defaults to 100.
+        repeat (int, optional): number of repetitions of each case. Defaults to 1.
+
+    Returns:
+        list: results of the cases
+    '''
+    res = []
+    channels = ['ECG', 'ABP']
+
+    res.append(_case('import', 'ReadCSV._get_data', repeat=repeat,
+        func=lambda: ReadCSV(csv_files[:1], channels=channels, fs=fs)._get_data(csv_files[0])))
+
+    res.append(_case('import', 'RollingWindowCSV.__init__', n=len(csv_files), repeat=repeat,
+        func=lambda: RollingWindowCSV(csv_files, win_len=win_len, channels=channels, fs=fs)))
+    imp = RollingWindowCSV(csv_files, win_len=win_len, channels=channels, fs=fs)
+    itr = imp.iterators[:n_windows]
+    res.append(_case('import', 'RollingWindowCSV._get_data', n=len(itr), repeat=repeat,
+        func=lambda: [imp._get_data(i) for i in itr]))
+    res.append(_case('import', 'RollingWindowCSV._get_data_batch', n=len(itr), repeat=repeat,
+        func=lambda: imp._get_data_batch(itr)))
+
+    res.append(_case('import', 'RollingWindowCSV.__init__[time_index]', n=len(csv_time_files), repeat=repeat,
+        func=lambda: RollingWindowCSV(csv_time_files, win_len=win_len, channels=channels, fs=fs, time_index_col='time')))
+    imp_t = RollingWindowCSV(csv_time_files, win_len=win_len, channels=channels, fs=fs, time_index_col='time')
+    itr_t = imp_t.iterators[:n_windows]
+    res.append(_case('import', 'RollingWindowCSV._get_data[time_index]', n=len(itr_t), repeat=repeat,
+        func=lambda: [imp_t._get_data(i) for i in itr_t]))
+
+    res.append(_case('import', 'ReadWFDB._get_data', repeat=repeat,
+        func=lambda: ReadWFDB(wfdb_records[:1])._get_data((wfdb_records[0], None))))
+    res.append(_case('import', 'RollingWindowWFDB.__init__', n=len(wfdb_records), repeat=repeat,
+        func=lambda: RollingWindowWFDB(wfdb_records, None, win_len=win_len)))
+    imp_w = RollingWindowWFDB(wfdb_records, None, win_len=win_len)
+    itr_w = imp_w.iterators[:n_windows]
+    res.append(_case('import', 'RollingWindowWFDB._get_data', n=len(itr_w), repeat=repeat,
+        func=lambda: [imp_w._get_data(i) for i in itr_w]))
+    res.append(_case('import', 'RollingWindowWFDB._get_data_batch', n=len(itr_w), repeat=repeat,
+        func=lambda: imp_w._get_data_batch(itr_w)))
+
+    return res
+
+
+def bench_filters(x, rr, fs, win_len = 10, n_windows = 100, repeat = 1):
+    '''
+    Time each built-in filter of `Filters._ff_list` (on windows of `x`) and `Filters._hrv_list` (on windows of `rr`).
+
+    Args:
+        x (ndarray): signal
+        rr (ndarray): RR intervals in ms
+        fs (float): sampling frequency of `x`.
+        win_len (float, optional): window length in seconds. Defaults to 10.
+        n_windows (int, optional): number of windows. Defaults to 100.
+        repeat (int, optional): number of repetitions of each case. Defaults to 1.
+
+    Returns:
+        list: results of the cases
+    '''
+    res = []
+    windows = _windows(x, fs=fs, win_len=win_len, n_windows=n_windows)
+    # windows of 300 beats for the RR filters
+    rr_windows = _windows(rr, fs=1, win_len=300, n_windows=n_windows)
+
+    for name in Filters._ff_list + Filters._hrv_list:
+        flt = Filters()
+        flt.add._ListOfFunctions[f'{name}__0'] = _FILTER_ARGS[name]
+        wins = windows if name in Filters._ff_list else rr_windows
+        res.append(_case('filters', name, n=len(wins), repeat=repeat,
+            func=lambda flt=flt, wins=wins: [flt.transform(x=w.copy(), fs=fs) for w in wins]))
+
+    return res
+
+
+def bench_features(x, rr, rr_time, fs, win_len = 10, n_windows = 100, repeat = 1):
+    '''
+    Time each built-in feature, grouped by the feature families (time-domain, power spectrum,
+    frequency-domain, wavelet and HRV features), on windows of `x` (or `rr` for the HRV features).
+
+    Args:
+        x (ndarray): signal
+        rr (ndarray): RR intervals in ms
+        rr_time (ndarray): time of the RR intervals in seconds
+        fs (float): sampling frequency of `x`.
+        win_len (float, optional): window length in seconds. Defaults to 10.
+        n_windows (int, optional): number of windows. Defaults to 100.
+        repeat (int, optional): number of repetitions of each case. Defaults to 1.
+
+    Returns:
+        list: results of the cases
+    '''
+    res = []
+    windows = _windows(x, fs=fs, win_len=win_len, n_windows=n_windows)
+    rr_windows = _windows(rr, fs=1, win_len=300, n_windows=n_windows)
+    t_windows = _windows(rr_time, fs=1, win_len=300, n_windows=n_windows)
+    t_windows = [t - t[0] for t in t_windows]
+
+    for family, features in _FEATURE_FAMILIES.items():
+        for name, add in features.items():
+            feature_obj = Features()
+            add(feature_obj)
+            if family == 'hrv':
+                func = lambda f=feature_obj: [
+                    f.transform(x=w, fs=4, win_len=t[-1], time_stamps=t) for w, t in zip(rr_windows, t_windows)
+                ]
+                n = len(rr_windows)
+            else:
+                func = lambda f=feature_obj: [f.transform(x=w, fs=fs) for w in windows]
+                n = len(windows)
+            res.append(_case(f'features.{family}', name, n=n, repeat=repeat, func=func))
+
+    return res
+
+
+def bench_pipeline(csv_files, wfdb_records, fs, win_len = 10, n_jobs = 1, repeat = 1):
+    '''
+    Time `Pipeline.run` end to end on the rolling window importers.
+
+    Args:
+        csv_files (list): paths of the CSV fixtures.
+        wfdb_records (list): paths of the WFDB fixtures.
+        fs (float): sampling frequency of the fixtures.
+        win_len (float, optional): window length in seconds. Defaults to 10.
+        n_jobs (int, optional): number of jobs of the pipeline. Defaults to 1.
+        repeat (int, optional): number of repetitions of each case. Defaults to 1.
+
+    Returns:
+        list: results of the cases
+    '''
+    res = []
+
+    features = Features()
+    features.add.mean()
+    features.add.std()
+    features.add.skewness()
+    features.add.kurtosis()
+    features.add.mnf()
+    features.add.band_power(low=0.5, high=40)
+    filters = Filters()
+    filters.add.butter_filter(cutoff=20)
+
+    importers = {
+        'RollingWindowCSV': RollingWindowCSV(csv_files, win_len=win_len, channels=['ECG', 'ABP'], fs=fs),
+        'RollingWindowWFDB': RollingWindowWFDB(wfdb_records, None, win_len=win_len),
+    }
+    for name, importer in importers.items():
+        pipeline = Pipeline(importer=importer, features=features, filters=filters)
+        n = len(importer.iterators)
+        for group_by_record in (False, True):
+            res.append(_case('pipeline', f'{name}[group_by_record={group_by_record}]', n=n, repeat=repeat,
+                n_jobs=n_jobs, func=lambda: pipeline.run(n_jobs=n_jobs, group_by_record=group_by_record)))
+
+    return res
+
+
+def bench_precision(csv_files, wfdb_records, x, rr, rr_time, fs, win_len = 10, n_windows = 100, n_jobs = 1, repeat = 1):
+    '''
+    Compare the float64 and float32 precisions (see `cmda.utils.precision`): the size of the loaded windows
+    (pickled, as sent to the workers), the time of `Pipeline.run`, and the error of the float32 features.
+
+    The error of a feature is the maximum over the windows of |f64 - f32| / max(|f64|), where the maximum of |f64|
+    is taken over all the windows, so that the features close to 0 in some windows do not inflate the error.
+    It is at least 1e-6 of the largest feature of the family, for the features which are 0 up to the rounding
+    in double precision (e.g. the power at 0 Hz of the detrended spectrum).
+
+    Args:
+        csv_files (list): paths of the CSV fixtures.
+        wfdb_records (list): paths of the WFDB fixtures.
+        x (ndarray): signal of the feature error
+        rr (ndarray): RR intervals in ms
+        rr_time (ndarray): time of the RR intervals in seconds
+        fs (float): sampling frequency of the fixtures.
+        win_len (float, optional): window length in seconds. Defaults to 10.
+        n_windows (int, optional): number of windows. Defaults to 100.
+        n_jobs (int, optional): number of jobs of the pipeline. Defaults to 1.
+        repeat (int, optional): number of repetitions of each case. Defaults to 1.
+
+    Returns:
+        list: results of the cases, with `window_bytes` for the importers and `max_rel_error` for the feature families
+    '''
+    res = []
+
+    features = Features()
+    features.add.mean()
+    features.add.std()
+    features.add.skewness()
+    features.add.kurtosis()
+    features.add.mnf()
+    features.add.band_power(low=0.5, high=40)
+    filters = Filters()
+    filters.add.butter_filter(cutoff=20)
+
+    importers = {
+        'RollingWindowCSV': RollingWindowCSV(csv_files, win_len=win_len, channels=['ECG', 'ABP'], fs=fs),
+        'RollingWindowWFDB': RollingWindowWFDB(wfdb_records, None, win_len=win_len),
+        'RollingWindowWFDB[digital]': RollingWindowWFDB(wfdb_records, None, win_len=win_len, digital=True),
+    }
+    for dtype in ('float64', 'float32'):
+        for name, importer in importers.items():
+            itr = [i for i in importer.iterators if importer._group_key(i) == importer._group_key(importer.iterators[0])]
+            with precision(dtype):
+                size = len(pickle.dumps(importer._get_data_batch(itr[:n_windows])))
+            case = _case('precision', f'{name}[{dtype}]', n=len(importer.iterators), repeat=repeat, n_jobs=n_jobs,
+                func=lambda p=Pipeline(importer=importer, features=features, filters=filters): p.run(n_jobs=n_jobs, precision=dtype))
+            case['window_bytes'] = size/min(len(itr), n_windows)
+            res.append(case)
+
+    # error of the float32 features
+    windows = _windows(x.astype('float64'), fs=fs, win_len=win_len, n_windows=n_windows)
+    rr_windows = _windows(rr.astype('float64'), fs=1, win_len=300, n_windows=n_windows)
+    t_windows = _windows(rr_time, fs=1, win_len=300, n_windows=n_windows)
+    t_windows = [t - t[0] for t in t_windows]
+    for family, family_features in _FEATURE_FAMILIES.items():
+        feature_obj = Features()
+        for add in family_features.values():
+            add(feature_obj)
+        case = {'group': 'precision', 'name': f'features.{family}[float32]', 'n': 0}
+        try:
+            out = {}
+            for dtype in ('float64', 'float32'):
+                with precision(dtype):
+                    if family == 'hrv':
+                        out[dtype] = [
+                            _process_data({'x': {'x': w}, 'fs': 4, 'win_len': t[-1], 'time_stamps': t, 'window': None}, feature_obj, None)[1]
+                            for w, t in zip(rr_windows, t_windows)
+                        ]
+                    else:
+                        out[dtype] = [_process_data({'x': {'x': w}, 'fs': fs}, feature_obj, None)[1] for w in windows]
+            a = pd.DataFrame(out['float64']).drop(columns='ID', errors='ignore').astype('float64')
+            b = pd.DataFrame(out['float32']).drop(columns='ID', errors='ignore').astype('float64')
+            scale = a.abs().max()
+            scale = scale.clip(lower=scale.max()*1e-6)
+            err = ((a - b).abs().max()/scale).dropna()
+            case.update(n=len(a), max_rel_error=float(err.max()), worst_feature=str(err.idxmax()), error=None)
+            print(f"{'precision':>10} {case['name']:<45} {case['max_rel_error']:10.2e} ({case['worst_feature']})")
+        except Exception as e:
+            case.update(max_rel_error=None, error=f'{type(e).__name__}: {e}')
+            print(f"{'precision':>10} {case['name']:<45} failed ({case['error']})")
+        res.append(case)
+
+    return res
+
+
+def bench_streaming(x, fs, win_len = 10, step = None, chunk_lens = (0.04, 0.25, 1), n_windows = 100):
+    '''
+    Measure the latency of `StreamingPipeline`: the time between pushing the chunk completing a window
+    and getting its features, for chunks of different lengths (e.g. the packets of a bedside monitor).
+
+    Args:
+        x (ndarray): signal
+        fs (float): sampling frequency of `x`.
+        win_len (float, optional): window length in seconds. Defaults to 10.
+        step (float, optional): window step in seconds. If None, the step is a tenth of the window length. Defaults to None.
+        chunk_lens (tuple, optional): lengths of the pushed chunks in seconds. Defaults to (0.04, 0.25, 1).
+        n_windows (int, optional): number of windows. Defaults to 100.
+
+    Returns:
+        list: results of the cases, with the median, 95th percentile and maximum latency in seconds
+    '''
+    res = []
+    if step is None:
+        step = win_len/10
+
+    features = Features()
+    features.add.mean()
+    features.add.std()
+    features.add.mnf()
+    features.add.band_power(low=0.5, high=40)
+    filters = Filters()
+    filters.add.butter_filter(cutoff=20)
+
+    x = x[:int((win_len + n_windows*step)*fs)]
+    for chunk_len in chunk_lens:
+        chunk = max(int(chunk_len*fs), 1)
+        case = {'group': 'streaming', 'name': f'StreamingPipeline[chunk={chunk_len}s]', 'n': 0, 'chunk_len': chunk_len}
+        try:
+            pipeline = StreamingPipeline(features=features, filters=filters, channels=['ECG'], fs=fs, win_len=win_len, step=step)
+            latency = []
+            t_wall = time.perf_counter()
+            for i in range(0, len(x), chunk):
+                t = time.perf_counter()
+                out = pipeline.push({'ECG': x[i:i+chunk]})
+                if len(out) > 0:
+                    latency.append(time.perf_counter() - t)
+                case['n'] += len(out)
+            wall = time.perf_counter() - t_wall
+            case.update(
+                wall_time=wall,
+                wall_time_per_item=wall/max(case['n'], 1),
+                latency_p50=float(np.percentile(latency, 50)),
+                latency_p95=float(np.percentile(latency, 95)),
+                latency_max=float(np.max(latency)),
+                error=None,
+            )
+            print(f"{'streaming':>10} {case['name']:<45} {case['latency_p50']*1000:8.3f} ms (p95 {case['latency_p95']*1000:.3f} ms)")
+        except Exception as e:
+            case.update(wall_time=None, wall_time_per_item=None, error=f'{type(e).__name__}: {e}')
+            print(f"{'streaming':>10} {case['name']:<45} failed ({case['error']})")
+        res.append(case)
+
+    return res
+
+
+def run_benchmarks(scale = '1h', fs = 125, n_records = 2, win_len = 10, n_windows = 100, n_jobs = 1,
+                   repeat = 1, workdir = None, output = None, suites = ('importers', 'filters', 'features', 'pipeline', 'streaming', 'precision')):
+    '''
+    Run the benchmark suite on synthetic records.
+
+    The synthetic ECG/ABP/RR fixtures are written as CSV and WFDB files in `workdir`
+    and the results are saved in a JSON file, which can be compared across commits.
+
+    Args:
+        scale ({'1h','24h','7d'}, optional): duration of the synthetic records. Defaults to '1h'.
+        fs (float, optional): sampling frequency of the synthetic records. Defaults to 125.
+        n_records (int, optional): number of records of each format. Defaults to 2.
+        win_len (float, optional): window length in seconds. Defaults to 10.
+        n_windows (int, optional): number of windows used by the importer, filter and feature benchmarks. Defaults to 100.
+        n_jobs (int, optional): number of jobs of the pipeline benchmark. Defaults to 1.
+        repeat (int, optional): number of repetitions of each case. Defaults to 1.
+        workdir (str, optional): directory of the fixtures. The existing fixtures are reused.
+            If None, a temporary directory is used. Defaults to None.
+        output (str, optional): path of the JSON output file. Defaults to None.
+        suites (tuple, optional): benchmark suites to run.
+
+    Returns:
+        dict: metadata and results of the benchmarks
+    '''
+    duration = SCALES[scale]
+
+    tmp = None
+    if workdir is None:
+        tmp = tempfile.TemporaryDirectory()
+        workdir = tmp.name
+    fixture_dir = os.path.join(workdir, f'{scale}_{fs}Hz')
+    os.makedirs(fixture_dir, exist_ok=True)
+
+    print(f"Writing the fixtures in {fixture_dir} ...")
+    csv_files, csv_time_files, rr_files, wfdb_records = [], [], [], []
+    for i in range(n_records):
+        for files, name, write in (
+            (csv_files, f'rec{i}.csv', lambda p: write_csv_fixture(p, duration=duration, fs=fs, seed=i)),
+            (csv_time_files, f'rec{i}_time.csv', lambda p: write_csv_fixture(p, duration=duration, fs=fs, seed=i, time_index=True)),
+            (rr_files, f'rr{i}.csv', lambda p: write_rr_fixture(p, duration=duration, seed=i)),
+        ):
+            path = os.path.join(fixture_dir, name)
+            if not os.path.exists(path):
+                write(path)
+            files.append(path)
+
+        record = os.path.join(fixture_dir, f'wfdb{i}')
+        if not os.path.exists(record + '.hea'):
+            write_wfdb_fixture(f'wfdb{i}', write_dir=fixture_dir, duration=duration, fs=fs, seed=i)
+        wfdb_records.append(record)
+
+    # signals of the filter and feature benchmarks
+    n = int(min(n_windows*win_len, duration)*fs)
+    x = pd.read_csv(csv_files[0], usecols=['ECG'], nrows=n)['ECG'].values
+    rr = pd.read_csv(rr_files[0])
+    rr_time = (pd.to_datetime(rr['time']) - pd.to_datetime(rr['time'].iloc[0])).dt.total_seconds().values
+    rr = rr['RR'].values
+
+    results = []
+    if 'importers' in suites:
+        results += bench_importers(csv_files, csv_time_files, wfdb_records, fs=fs, win_len=win_len, n_windows=n_windows, repeat=repeat)
+    if 'filters' in suites:
+        results += bench_filters(x, rr, fs=fs, win_len=win_len, n_windows=n_windows, repeat=repeat)
+    if 'features' in suites:
+        results += bench_features(x, rr, rr_time, fs=fs, win_len=win_len, n_windows=n_windows, repeat=repeat)
+    if 'pipeline' in suites:
+        results += bench_pipeline(csv_files, wfdb_records, fs=fs, win_len=win_len, n_jobs=n_jobs, repeat=repeat)
+    if 'streaming' in suites:
+        results += bench_streaming(x, fs=fs, win_len=win_len, n_windows=n_windows)
+    if 'precision' in suites:
+        results += bench_precision(csv_files, wfdb_records, x, rr, rr_time, fs=fs, win_len=win_len,
+                                   n_windows=n_windows, n_jobs=n_jobs, repeat=repeat)
+
+    res = {
+        'metadata': _metadata(scale=scale, fs=fs, n_records=n_records, win_len=win_len, n_windows=n_windows, n_jobs=n_jobs),
+        'results': results,
+    }
+
+    if output is not None:
+        with open(output, 'w') as f:
+            json.dump(res, f, indent=2, default=str)
+        print(f"Results saved in {output}")
+
+    if tmp is not None:
+        tmp.cleanup()
+
+    return res
+
+
+def _metadata(**params):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'date': datetime.datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        **params,
+    }
@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import pandas as pd
+import wfdb
+
+from .synthetic import generate_ecg, generate_abp, generate_rr
+
+
+
+# the long records are generated and written in chunks of one hour
+_CHUNK_DURATION = 3600
+
+
+def write_csv_fixture(path, duration, fs, seed = 0, time_index = False):
+    '''
+    Write a synthetic ECG/ABP record as a CSV file.
+
+    Args:
+        path (str): path of the CSV file.
+        duration (float): duration of the record in seconds.
+        fs (float): sampling frequency in Hz.
+        seed (int, optional): seed of the random generator. Defaults to 0.
+        time_index (bool, optional): if True, a `time` column with the date-time of each sample is added. Defaults to False.
+
+    Returns:
+        str: path of the CSV file
+    '''
+    start = 0
+    header = True
+    while start < duration:
+        chunk = min(_CHUNK_DURATION, duration - start)
+        df = pd.DataFrame({
+            'ECG': generate_ecg(duration=chunk, fs=fs, start=start, seed=seed),
+            'ABP': generate_abp(duration=chunk, fs=fs, start=start, seed=seed),
+        })
+        if time_index:
+            df['time'] = pd.Timestamp('2020-01-01') + pd.to_timedelta(
+                start + np.arange(len(df))/fs, unit='s'
+            )
+        df.to_csv(path, mode='w' if header else 'a', header=header, index=False, float_format='%.4f')
+        header = False
+        start += chunk
+
+    return path
+
+
+def write_rr_fixture(path, duration, seed = 0):
+    '''
+    Write a synthetic RR-interval series as a CSV file, with the RR intervals in ms
+    and the date-time of each beat in the `time` column.
+
+    Args:
+        path (str): path of the CSV file.
+        duration (float): duration of the series in seconds.
+        seed (int, optional): seed of the random generator. Defaults to 0.
+
+    Returns:
+        str: path of the CSV file
+    '''
+    rr, beats = generate_rr(duration=duration, seed=seed)
+    df = pd.DataFrame({
+        'RR': np.round(rr*1000, 1),
+        'time': pd.Timestamp('2020-01-01') + pd.to_timedelta(beats, unit='s'),
+    })
+    df.to_csv(path, index=False)
+    return path
+
+
+def write_wfdb_fixture(record_name, write_dir, duration, fs, seed = 0):
+    '''
+    Write a synthetic ECG/ABP record in WFDB format (16-bit samples) using `wfdb.wrsamp`.
+
+    Args:
+        record_name (str): name of the record.
+        write_dir (str): directory of the record files.
+        duration (float): duration of the record in seconds.
+        fs (float): sampling frequency in Hz.
+        seed (int, optional): seed of the random generator. Defaults to 0.
+
+    Returns:
+        str: path of the record (without extension)
+    '''
+    # (gain, baseline) of the ECG in mV and the ABP in mmHg
+    adc_gain = [1000.0, 100.0]
+    baseline = [0, -10000]
+
+    # the digital signals are filled in chunks to limit the memory usage
+    n = int(duration*fs)
+    d_signal = np.empty((n, 2), dtype='int16')
+    start = 0
+    while start < duration:
+        chunk = min(_CHUNK_DURATION, duration - start)
+        i = int(start*fs)
+        ecg = generate_ecg(duration=chunk, fs=fs, start=start, seed=seed)
+        abp = generate_abp(duration=chunk, fs=fs, start=start, seed=seed)
+        d_signal[i:i+len(ecg), 0] = np.round(ecg*adc_gain[0] + baseline[0])
+        d_signal[i:i+len(abp), 1] = np.round(abp*adc_gain[1] + baseline[1])
+        start += chunk
+
+    wfdb.wrsamp(
+        record_name=record_name,
+        fs=fs,
+        units=['mV', 'mmHg'],
+        sig_name=['ECG', 'ABP'],
+        d_signal=d_signal,
+        fmt=['16', '16'],
+        adc_gain=adc_gain,
+        baseline=baseline,
+        write_dir=write_dir,
+    )
+    return os.path.join(write_dir, record_name)
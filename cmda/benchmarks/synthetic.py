@@ -0,0 +1,107 @@
+import numpy as np
+
+
+
+# durations of the benchmark records in seconds
+SCALES = {
+    '1h': 3600,
+    '24h': 24*3600,
+    '7d': 7*24*3600,
+}
+
+
+def generate_rr(duration, mean_rr = 0.8, seed = 0):
+    '''
+    Generate a synthetic RR-interval series with respiratory sinus arrhythmia and a low-frequency oscillation.
+
+    Args:
+        duration (float): duration of the series in seconds.
+        mean_rr (float, optional): mean RR interval in seconds. Defaults to 0.8.
+        seed (int, optional): seed of the random generator. Defaults to 0.
+
+    Returns:
+        tuple: RR intervals in seconds and the time of each beat in seconds.
+    '''
+    rng = np.random.default_rng(seed)
+    n_beats = int(np.ceil(duration/mean_rr*1.2)) + 1
+    t = np.arange(n_beats)*mean_rr
+
+    # HF (0.25 Hz) and LF (0.1 Hz) oscillations of the heart rate
+    rr = (
+        mean_rr
+        + 0.03*np.sin(2*np.pi*0.25*t)
+        + 0.04*np.sin(2*np.pi*0.1*t + rng.uniform(0, 2*np.pi))
+        + rng.normal(0, 0.01, n_beats)
+    )
+    rr = np.clip(rr, 0.3, 2.0)
+
+    beats = np.concatenate([[0], np.cumsum(rr)])
+    n_beats = np.searchsorted(beats, duration)
+    return rr[:n_beats], beats[:n_beats]
+
+
+def generate_ecg(duration, fs, start = 0, seed = 0, noise = 0.02, dtype = 'float32'):
+    '''
+    Generate a synthetic ECG as a sum of Gaussian waves (P, Q, R, S, T) for each beat.
+
+    Args:
+        duration (float): duration of the signal in seconds.
+        fs (float): sampling frequency in Hz.
+        start (float, optional): start time of the signal in seconds, for generating long records in chunks. Defaults to 0.
+        seed (int, optional): seed of the random generator. Defaults to 0.
+        noise (float, optional): standard deviation of the additive noise in mV. Defaults to 0.02.
+        dtype (str, optional): data type of the signal. Defaults to 'float32'.
+
+    Returns:
+        ndarray: ECG signal in mV
+    '''
+    # the beats of the whole record up to the end of the chunk
+    rr, beats = generate_rr(duration=start+duration+2, seed=seed)
+    t = start + np.arange(int(duration*fs), dtype='float64')/fs
+
+    # phase of each sample in its beat
+    idx = np.searchsorted(beats, t, side='right') - 1
+    phase = (t - beats[idx])/rr[idx]
+
+    # (amplitude, center, width) of the P, Q, R, S and T waves
+    waves = [(0.15, 0.2, 0.025), (-0.1, 0.36, 0.01), (1.0, 0.4, 0.012), (-0.2, 0.44, 0.01), (0.3, 0.7, 0.04)]
+
+    x = np.zeros(len(t), dtype=dtype)
+    for a, mu, sigma in waves:
+        x += (a*np.exp(-(phase-mu)**2/(2*sigma**2))).astype(dtype)
+
+    rng = np.random.default_rng([seed, int(start*fs)])
+    x += rng.normal(0, noise, len(t)).astype(dtype)
+    return x
+
+
+def generate_abp(duration, fs, start = 0, seed = 0, noise = 0.5, dtype = 'float32'):
+    '''
+    Generate a synthetic arterial blood pressure with a systolic upstroke, a dicrotic notch and a diastolic decay for each beat.
+
+    Args:
+        duration (float): duration of the signal in seconds.
+        fs (float): sampling frequency in Hz.
+        start (float, optional): start time of the signal in seconds, for generating long records in chunks. Defaults to 0.
+        seed (int, optional): seed of the random generator. Defaults to 0.
+        noise (float, optional): standard deviation of the additive noise in mmHg. Defaults to 0.5.
+        dtype (str, optional): data type of the signal. Defaults to 'float32'.
+
+    Returns:
+        ndarray: ABP signal in mmHg
+    '''
+    # the beats of the whole record up to the end of the chunk
+    rr, beats = generate_rr(duration=start+duration+2, seed=seed)
+    t = start + np.arange(int(duration*fs), dtype='float64')/fs
+
+    idx = np.searchsorted(beats, t, side='right') - 1
+    phase = (t - beats[idx])/rr[idx]
+
+    systole = np.exp(-(phase-0.15)**2/(2*0.06**2))
+    notch = 0.25*np.exp(-(phase-0.45)**2/(2*0.04**2))
+    decay = np.exp(-phase/0.6)
+    x = 75 + 40*systole + 10*notch + 10*decay
+
+    rng = np.random.default_rng([seed, int(start*fs)])
+    x += rng.normal(0, noise, len(t))
+    return x.astype(dtype)
@@ -1,5 +1,7 @@
 import pandas as pd
 
+from ..utils.record import Record
+
 
 
 
@@ -11,12 +13,17 @@ def _extract_features(feature_obj, data: dict, fs: int = 1, **kwargs) -> dict:
 
     Args:
         feature_obj (python_object): Feature object
-        data (dict): Dictionary containing multiple arrays
+        data (dict or Record): Dictionary containing multiple arrays, or a record
         fs (int, optional): Sampling frequency of the arrays. Defaults to 1.
 
     Returns:
         dict: Extracted features
     """
+    # the digital samples of all the channels are converted at once,
+    # the channels of the other records are passed as views
+    if isinstance(data, Record) and data.is_digital:
+        data = data.physical()
+
     if isinstance(feature_obj,dict):
         features_keys = set(feature_obj.keys())
         data_keys = set(data.keys())
@@ -33,8 +40,8 @@ def _extract_features(feature_obj, data: dict, fs: int = 1, **kwargs) -> dict:
 
         
         res_key = obj.transform(x = x, fs = fs, **kwargs)
-        res_key = {f'{key}_{k}': v for k, v in res_key.items()}
-        res = {**res,**res_key}
+        # update in place, instead of creating a new dict for each channel
+        res.update((f'{key}_{k}', v) for k, v in res_key.items())
 
     return res
 
@@ -53,7 +60,7 @@ def extract_features(feature_obj, data: (dict,pd.DataFrame), fs: int = 1) -> dic
     '''
 
     if isinstance(data,pd.DataFrame):
-        data = data.to_dict('list')
+        data = Record.from_frame(data, fs=fs)
 
     res = _extract_features(
         feature_obj=feature_obj,
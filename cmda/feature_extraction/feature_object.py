@@ -5,15 +5,16 @@ from scipy import signal
 from inspect import getfullargspec
 
 from ._add_functions import _AddFeatures
-from ..utils.utils import _AddUDF
+from ..utils.utils import _AddUDF, _UDFContainer
 from ..utils.checks import _check_duplicated_key_names
+from ..utils import profiling
 from . import time_domain_features as td
 from . import spectral_features as fd
 from . import wavelet_features as wf
 from . import hrv
 
 
-class Features:
+class Features(_UDFContainer):
 
     _td_list = [
         'mean',
@@ -110,8 +111,13 @@ class Features:
         # pre-define the final result as a dict 
         res_all = {}
 
+        # the active profiler, if the profiling is enabled
+        prof = profiling.get_profiler()
+
         # run a for loop on the added built-in features
         for func_key in self.add._ListOfFunctions:
+            if prof is not None:
+                t = prof.tic()
 
             # get the args of the built-in funtion
             args = self.add._ListOfFunctions[func_key].copy()
@@ -150,19 +156,26 @@ class Features:
                 # check whether the power spectrum exists in the buffer
                 f,pxx = self._check_spectrum(x=x,fs=fs,spectrum=spectrum,**kwargs)
                 res = method_to_call(f = f, pxx = pxx, **method_args)
+
+            if prof is not None:
+                prof.toc(f'features.{func_key}', t)
             
             # handle duplicated function names
-            res_all = {**res_all, **res}
+            res_all.update(res)
 
         for func_key in self.udf._ListOfUDFs:
+            if prof is not None:
+                t = prof.tic()
             args = self.udf._ListOfUDFs[func_key].copy()
             # func = func_key.split('__')
             # func = func[0]
             method_to_call = getattr(self.udf, func_key)
             res = method_to_call(x=x)
+            if prof is not None:
+                prof.toc(f'features.udf.{func_key}', t)
 
             # handle duplicated function names
-            res_all = {**res_all, **res}
+            res_all.update(res)
 
     
         return res_all
@@ -12,6 +12,7 @@ from ..preprocessing.hrv_preprocessing import (
 from .spectral_features import band_power, band_peak
 from .time_domain_features import sample_entropy, perm_entropy
 from ..utils.utils import interpolate
+from ..utils.precision import as_float
 
 
 def hrv_time_domain_features(x, nan_lim_ratio=0.1):
@@ -19,7 +20,7 @@ def hrv_time_domain_features(x, nan_lim_ratio=0.1):
     # rr = rr_rm_outlier(x, low=low, high=high)
     # nn = rr_rm_ectopic(rr,k=k, thershold=ectopic_thershold)
     nn = x.copy()
-    nn = np.asfarray(nn)
+    nn = as_float(nn)
     nnd = np.diff(nn)
 
     num_nan = sum(np.isfinite(nn))
@@ -62,7 +63,7 @@ def hrv_time_domain_features(x, nan_lim_ratio=0.1):
 def hrv_spectral_features(x, fs, win_len, time_stamps, method="cubic"):
 
     nn =x.copy()
-    nn = np.asfarray(nn)
+    nn = as_float(nn)
 
     if np.isfinite(nn).all():
         nn_interpol = interpolate(nn,fs=fs, win_len = win_len, time_stamps=time_stamps, method = method, scale=1000)
@@ -120,7 +121,7 @@ def hrv_nonlinear_features(x,nan_limit_ratio=0.1):
 
     nan_ratio = 1-(sum(np.isfinite(x))/len(x))
     x = x.copy()
-    x = np.asfarray(x)
+    x = as_float(x)
 
     if nan_ratio < nan_limit_ratio:
         nn_0 = np.array(x[:-1])
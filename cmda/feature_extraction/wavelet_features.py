@@ -32,8 +32,7 @@ def swt_coefficients(x, wavelet, level = 1,_dict_out=True):
         coeffs_labels = [f'cA_{level}'] + [f'cD_{l}' for l in np.arange(level,0,-1)]
         res_all = {}
         for c,l in zip(coeffs,coeffs_labels):
-            res = {f'swt_{l}' : c}
-            res_all = {**res_all,**res}
+            res_all[f'swt_{l}'] = c
         coeffs = res_all
 
     return coeffs
@@ -95,8 +94,7 @@ def swt_features(x,features,fs,wavelet, level, start_level = 1, rm_cA = False,**
             else:
                 raise ValueError(f'{f} is not in the list of accepted features: {_available_features}')
 
-            res = {f'swt_{l}_{f}' : res}
-            res_all = {**res_all,**res}
+            res_all[f'swt_{l}_{f}'] = res
 
     return res_all
 
@@ -1,5 +1,17 @@
 from ._pipeline import Pipeline
+from ._streaming import StreamingPipeline
+from ._distributed import DistributedExecutor
+from ._tasks import TaskError, TaskTimeout
+from .sinks import FeatureMatrix, ParquetSink, ArrowSink, SQLiteSink
 
 __all__ = [
-    "Pipeline"
-]
\ No newline at end of file
+    "Pipeline",
+    "StreamingPipeline",
+    "DistributedExecutor",
+    "TaskError",
+    "TaskTimeout",
+    "FeatureMatrix",
+    "ParquetSink",
+    "ArrowSink",
+    "SQLiteSink"
+]
@@ -0,0 +1,176 @@
+import json
+import pickle
+import sqlite3
+import hashlib
+
+import numpy as np
+
+
+
+
+class ResultStore:
+
+    def __init__(self, path, config, commit_every = 100):
+        '''
+        On-disk store of the pipeline results for resuming interrupted runs.
+
+        The results are stored in a SQLite database, keyed on a hash of the pipeline configuration
+        and the iterator of each instance. Running the pipeline again with the same configuration
+        only computes the instances which are not in the store.
+
+        Args:
+            path (str): path of the SQLite database file. It is created if it does not exist.
+            config (dict): configuration of the pipeline, as returned by `pipeline_config`.
+            commit_every (int, optional): number of results to be written before committing them to the disk. Defaults to 100.
+        '''
+        self.path = path
+        self.config = config_hash(config)
+        self.commit_every = commit_every
+        self._n_pending = 0
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "config TEXT, key TEXT, idx BLOB, res BLOB, PRIMARY KEY (config, key))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS configs (config TEXT PRIMARY KEY, description TEXT)"
+        )
+        self._conn.execute(
+            "INSERT OR IGNORE INTO configs VALUES (?, ?)",
+            (self.config, json.dumps(config, sort_keys=True, default=repr))
+        )
+        self._conn.commit()
+
+    def completed(self):
+        '''
+        get the keys of the instances which are already in the store.
+
+        Returns:
+            set: keys of the completed instances
+        '''
+        cur = self._conn.execute("SELECT key FROM results WHERE config = ?", (self.config,))
+        return {row[0] for row in cur}
+
+    def results(self, keys = None):
+        '''
+        iterate over the stored results of the current configuration.
+
+        Args:
+            keys (set, optional): keys of the instances to be returned. If None, all the stored results are returned. Defaults to None.
+
+        Yields:
+            tuple: (index, features) of each stored instance
+        '''
+        cur = self._conn.execute("SELECT key, idx, res FROM results WHERE config = ?", (self.config,))
+        for key, idx, res in cur:
+            if keys is None or key in keys:
+                yield pickle.loads(idx), pickle.loads(res)
+
+    def add(self, iterator, result):
+        '''
+        add the result of an instance to the store.
+
+        Args:
+            iterator: iterator of the instance
+            result (tuple): (index, features) of the instance
+        '''
+        index, res = result
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+            (self.config, iterator_key(iterator), pickle.dumps(index), pickle.dumps(res))
+        )
+        self._n_pending += 1
+        if self._n_pending >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self._conn.commit()
+        self._n_pending = 0
+
+    def close(self):
+        self.commit()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+
+# the parameters of the importers which change their results. The files and records are identified
+# by the keys of the iterators, and the other parameters (e.g. `chunk_size`, `cache_index` or `cache_dir`)
+# only change how the data is read
+_IMPORTER_PARAMS = (
+    'channels', 'fs', 'win_len', 'step', 'time_index_col', 'datetime_format',
+    'group', 'dataset', 'digital', 'segments', 'kwargs',
+)
+
+
+def pipeline_config(importer, features, filters, precision = None):
+    '''
+    get the configuration of a pipeline, which identifies its results.
+
+    Only the parameters of the importer which change the results are part of the configuration,
+    so e.g. the results stored with another `chunk_size` or without a signal cache are reused.
+
+    Args:
+        importer (importer-object): importer instance
+        features (feature-object): feature instance
+        filters (filter-object): filter instance or None
+        precision (str, optional): data type of the signals. Defaults to None (float64).
+
+    Returns:
+        dict: configuration of the importer, features and filters
+    '''
+    importer_params = {k: getattr(importer, k) for k in _IMPORTER_PARAMS if hasattr(importer, k)}
+
+    config = {
+        'importer': type(importer).__name__,
+        'importer_params': importer_params,
+        'features': _object_config(features),
+        'filters': _object_config(filters),
+        'precision': np.dtype('float64' if precision is None else precision).name,
+    }
+    return config
+
+
+def config_hash(config):
+    config = json.dumps(config, sort_keys=True, default=repr)
+    return hashlib.sha1(config.encode()).hexdigest()
+
+
+def iterator_key(iterator):
+    '''
+    create a deterministic key from an importer iterator
+    '''
+    if isinstance(iterator, (tuple, list)):
+        key = [_item_key(i) for i in iterator]
+    else:
+        key = _item_key(iterator)
+    return json.dumps(key, default=repr)
+
+
+def _item_key(item):
+    # arrays of window indices are identified by their length and boundaries
+    if isinstance(item, (np.ndarray, range)):
+        if len(item) == 0:
+            return [0]
+        return [len(item), int(item[0]), int(item[-1])]
+    return repr(item)
+
+
+def _object_config(obj):
+    # features and filters can be given as a dict of objects for each channel
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return {k: _object_config(v) for k, v in obj.items()}
+
+    return {
+        'functions': obj.add._ListOfFunctions,
+        'udfs': list(obj.udf._ListOfUDFs),
+    }
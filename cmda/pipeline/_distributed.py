@@ -0,0 +1,325 @@
+import os
+import time
+import queue
+import logging
+import warnings
+import threading
+import traceback
+import multiprocessing
+from functools import partial
+from itertools import islice
+from collections import deque
+from multiprocessing.connection import Listener, Client
+
+import dill
+
+from ._tasks import _init_worker, _pipeline_spec, _run_worker_task, _compute_worker_task
+
+
+logger = logging.getLogger(__name__)
+
+
+
+class Coordinator:
+
+    def __init__(self, spec, address = ('localhost', 0), authkey = None, task_timeout = None):
+        '''
+        Hand out the shards of the pipeline tasks to the connected workers over TCP and collect their results.
+
+        The configuration of the pipeline is sent once to each worker when it connects.
+        A shard that is not completed because its worker disconnected (or exceeded `task_timeout`)
+        is put back in the queue and sent to another worker.
+
+        Args:
+            spec (dict): configuration of the pipeline sent to the workers
+            address (tuple, optional): (host, port) to listen on. Port 0 means any free port. Defaults to ('localhost', 0).
+            authkey (bytes, optional): key used to authenticate the workers. Defaults to None.
+            task_timeout (float, optional): maximum time in seconds for computing one task before the worker
+                is considered lost. If None, a worker is only lost when its connection breaks. Defaults to None.
+        '''
+        self.task_timeout = task_timeout
+        # the globals used by the functions defined in __main__ are sent as well,
+        # for workers that are not forked from the current process
+        self._spec = dill.dumps(spec, recurse=True)
+        self._authkey = authkey
+        self._listener = Listener(address, authkey=authkey)
+        self.address = self._listener.address
+
+        self._cond = threading.Condition()
+        self._task_lock = threading.Lock()
+        self._results = queue.Queue()
+        self._tasks = iter(())
+        self._chunksize = 1
+        self._retry = deque()
+        self._exhausted = True
+        self._n_shards = 0
+        self._n_done = 0
+        self._n_workers = 0
+        self._closed = False
+
+        self._accept_thread = threading.Thread(target=self._accept, daemon=True)
+        self._accept_thread.start()
+
+    def submit(self, tasks, chunksize = 1):
+        with self._task_lock, self._cond:
+            self._tasks = iter(tasks)
+            self._chunksize = max(chunksize, 1)
+            self._exhausted = False
+            self._cond.notify_all()
+
+    def results(self, ordered = True):
+        '''
+        get the results of the submitted tasks.
+
+        Args:
+            ordered (bool, optional): if True, the results are yielded in the order of the tasks. Defaults to True.
+
+        Yields:
+            the result of each task
+        '''
+        buffer = {}
+        next_shard = 0
+        waiting = False
+        while True:
+            try:
+                shard_id, res = self._results.get(timeout=0.5)
+            except queue.Empty:
+                if self._finished() and self._results.empty():
+                    return
+                if self._n_workers == 0 and not waiting:
+                    host, port = self.address
+                    warnings.warn(f"no worker is connected, waiting for workers to connect to {host}:{port}")
+                waiting = self._n_workers == 0
+                continue
+
+            if isinstance(res, _RemoteError):
+                raise res.exc from _RemoteTraceback(res.tb)
+
+            if not ordered:
+                yield from res
+                continue
+
+            buffer[shard_id] = res
+            while next_shard in buffer:
+                yield from buffer.pop(next_shard)
+                next_shard += 1
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        # wake up the accepting thread
+        try:
+            Client(self.address, authkey=self._authkey).close()
+        except OSError:
+            pass
+        self._accept_thread.join()
+        self._listener.close()
+
+    def _finished(self):
+        with self._cond:
+            return self._exhausted and len(self._retry) == 0 and self._n_done == self._n_shards
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                if self._closed:
+                    return
+                continue
+            if self._closed:
+                conn.close()
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _next_shard(self):
+        # wait for a shard, or return None when all shards are completed
+        while True:
+            with self._cond:
+                if self._closed:
+                    return None
+                if len(self._retry) > 0:
+                    return self._retry.popleft()
+                if self._exhausted:
+                    # the shards in progress can still be put back by a lost worker
+                    self._cond.wait(timeout=1)
+                    continue
+
+            # the tasks can block (e.g. when prefetching), so they are not read under the condition lock
+            with self._task_lock:
+                shard = list(islice(self._tasks, self._chunksize))
+                with self._cond:
+                    if len(shard) > 0:
+                        self._n_shards += 1
+                        return self._n_shards - 1, shard
+                    self._exhausted = True
+                    self._cond.notify_all()
+
+    def _serve(self, conn):
+        with self._cond:
+            self._n_workers += 1
+        try:
+            conn.send_bytes(self._spec)
+            while True:
+                shard = self._next_shard()
+                if shard is None:
+                    conn.send_bytes(dill.dumps(None))
+                    return
+
+                try:
+                    conn.send_bytes(dill.dumps(shard[1]))
+                    if self.task_timeout is not None and not conn.poll(self.task_timeout*len(shard[1])):
+                        raise TimeoutError
+                    res = dill.loads(conn.recv_bytes())
+                except (OSError, EOFError, TimeoutError):
+                    with self._cond:
+                        self._retry.append(shard)
+                        self._cond.notify_all()
+                    warnings.warn(f"a worker was lost, its shard {shard[0]} is reassigned")
+                    return
+
+                self._results.put((shard[0], res))
+                with self._cond:
+                    self._n_done += 1
+                    self._cond.notify_all()
+        except (OSError, EOFError):
+            pass
+        finally:
+            with self._cond:
+                self._n_workers -= 1
+            conn.close()
+
+
+
+class DistributedExecutor:
+
+    def __init__(self, n_jobs = 0, address = ('localhost', 0), authkey = None, task_timeout = None):
+        '''
+        Run the pipeline tasks on workers connected over TCP, which can run on other hosts.
+
+        A coordinator listens on `address` while the pipeline is running. The workers are started with
+
+            python -m cmda.pipeline.worker HOST:PORT --authkey KEY
+
+        and can join or leave at any time. The shards of a lost worker are reassigned to the other workers.
+        With `n_jobs` local workers, the whole setup runs on one machine.
+
+        Args:
+            n_jobs (int, optional): number of workers started on the local host. -1 means using all processors. Defaults to 0.
+            address (tuple, optional): (host, port) of the coordinator. Use ('0.0.0.0', port) to accept remote workers.
+                Defaults to ('localhost', 0), i.e. any free port of the local host.
+            authkey (bytes or str, optional): key shared with the workers. If None, a random key is generated,
+                which is only known by the local workers. Defaults to None.
+            task_timeout (float, optional): maximum time in seconds for computing one task before the worker
+                is considered lost. Defaults to None.
+        '''
+        self.n_jobs = os.cpu_count() if n_jobs is None or n_jobs < 0 else n_jobs
+        self.address = address
+        if authkey is None:
+            authkey = os.urandom(16).hex()
+        if isinstance(authkey, str):
+            authkey = authkey.encode()
+        self.authkey = authkey
+        self.task_timeout = task_timeout
+        self._coordinator = None
+        self._workers = []
+
+    def start(self, importer, features, filters, batch = False, profile = False, staged = False, isolation = None, dtype = None):
+        spec = _pipeline_spec(importer = importer, features = features, filters = filters, dtype = dtype)
+        spec['profile'] = profile
+        spec['batch'] = batch
+        spec['staged'] = staged
+        spec['isolation'] = isolation
+
+        self._coordinator = Coordinator(spec = spec, address = self.address, authkey = self.authkey, task_timeout = self.task_timeout)
+        host, port = self._coordinator.address
+        logger.info(f"coordinator listening on {host}:{port}")
+
+        self._workers = [
+            multiprocessing.Process(target=run_worker, args=(self._coordinator.address, self.authkey), daemon=True)
+            for _ in range(self.n_jobs)
+        ]
+        for w in self._workers:
+            w.start()
+
+    def imap(self, tasks, ordered = True, chunksize = 1):
+        self._coordinator.submit(tasks, chunksize=chunksize)
+        return self._coordinator.results(ordered=ordered)
+
+    def close(self):
+        if self._coordinator is not None:
+            self._coordinator.close()
+            self._coordinator = None
+        for w in self._workers:
+            w.join(timeout=5)
+            if w.is_alive():
+                w.terminate()
+        self._workers = []
+
+
+
+class _RemoteError:
+
+    def __init__(self, exc, tb):
+        # exception raised in a worker, sent back to the coordinator
+        self.exc = exc
+        self.tb = tb
+
+
+class _RemoteTraceback(Exception):
+
+    def __init__(self, tb):
+        # traceback of an exception raised in a worker, shown as the cause of the exception in the coordinator
+        self.tb = tb
+
+    def __str__(self):
+        return f"\n\nin the worker:\n{self.tb}"
+
+
+
+def run_worker(address, authkey, connect_timeout = 60):
+    '''
+    Run a pipeline worker: connect to the coordinator, compute the shards it sends and return the results.
+
+    Args:
+        address (tuple): (host, port) of the coordinator
+        authkey (bytes or str): key shared with the coordinator
+        connect_timeout (float, optional): time in seconds to wait for the coordinator to be reachable. Defaults to 60.
+    '''
+    if isinstance(authkey, str):
+        authkey = authkey.encode()
+
+    t = time.time()
+    while True:
+        try:
+            conn = Client(tuple(address), authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            if time.time() - t > connect_timeout:
+                raise
+            time.sleep(1)
+
+    try:
+        spec = dill.loads(conn.recv_bytes())
+        _init_worker(spec)
+        if spec['staged']:
+            func = _compute_worker_task
+        else:
+            func = partial(_run_worker_task, batch = spec['batch'])
+
+        while True:
+            shard = dill.loads(conn.recv_bytes())
+            if shard is None:
+                return
+            try:
+                res = [func(task) for task in shard]
+            except Exception as e:
+                res = _RemoteError(e, traceback.format_exc())
+                logger.error(f"a shard failed in the worker:\n{res.tb}")
+            conn.send_bytes(dill.dumps(res))
+    except (OSError, EOFError):
+        # the coordinator is gone
+        pass
+    finally:
+        conn.close()
@@ -0,0 +1,218 @@
+import os
+import warnings
+import threading
+from collections import deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from pathos.pools import _ProcessPool, _ThreadPool
+
+from ._distributed import DistributedExecutor
+from ._tasks import (
+    _run_task, _run_worker_task, _init_worker, _pipeline_spec,
+    _load_task, _compute_task, _compute_worker_task, _thread_task
+)
+
+
+
+
+class SerialExecutor:
+
+    def __init__(self, n_jobs = 1):
+        '''
+        Run the pipeline tasks one after another in the current process.
+        '''
+        self.n_jobs = 1
+        self._func = None
+
+    def start(self, importer, features, filters, batch = False, profile = False, staged = False, isolation = None, dtype = None):
+        if staged:
+            # the data are loaded by the prefetching threads, the executor only computes
+            self._func = partial(_compute_task, features = features, filters = filters, isolation = isolation)
+        else:
+            self._func = partial(_run_task, importer = importer, features = features, filters = filters, batch = batch, isolation = isolation)
+        # the data type is only set in the threads while they run the tasks, and each thread profiles its own tasks
+        self._func = partial(_thread_task, func = self._func, dtype = dtype, profile = profile)
+
+    def imap(self, tasks, ordered = True, chunksize = 1):
+        return map(self._func, tasks)
+
+    def close(self):
+        self._func = None
+
+
+
+class ThreadExecutor(SerialExecutor):
+
+    def __init__(self, n_jobs = -1):
+        '''
+        Run the pipeline tasks in a pool of threads of the current process.
+
+        The threads share the importer, features and filters, so nothing is serialized.
+        It is useful when the tasks are dominated by I/O or by functions releasing the GIL.
+
+        Args:
+            n_jobs (int, optional): number of threads. -1 means using all processors. Defaults to -1.
+        '''
+        self.n_jobs = _get_n_jobs(n_jobs)
+        self._func = None
+        self._pool = None
+
+    def start(self, importer, features, filters, batch = False, profile = False, staged = False, isolation = None, dtype = None):
+        if isolation is not None and isolation['timeout'] is not None:
+            warnings.warn("the timeout of the tasks is not applied in the 'thread' executor")
+        super().start(importer=importer, features=features, filters=filters, batch=batch, profile=profile, staged=staged, isolation=isolation, dtype=dtype)
+        self._pool = _ThreadPool(self.n_jobs)
+
+    def imap(self, tasks, ordered = True, chunksize = 1):
+        if ordered:
+            return self._pool.imap(self._func, tasks, chunksize)
+        return self._pool.imap_unordered(self._func, tasks, chunksize)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+        self._func = None
+
+
+
+class ProcessExecutor(ThreadExecutor):
+
+    def __init__(self, n_jobs = -1):
+        '''
+        Run the pipeline tasks in a pool of worker processes.
+
+        The importer (without its iterators) and a compact spec of the features and filters
+        are sent once to each worker, so that the tasks only contain the iterators.
+
+        Args:
+            n_jobs (int, optional): number of worker processes. -1 means using all processors. Defaults to -1.
+        '''
+        super().__init__(n_jobs=n_jobs)
+
+    def start(self, importer, features, filters, batch = False, profile = False, staged = False, isolation = None, dtype = None):
+        spec = _pipeline_spec(importer = importer, features = features, filters = filters, dtype = dtype)
+        spec['profile'] = profile
+        spec['isolation'] = isolation
+        if staged:
+            self._func = _compute_worker_task
+        else:
+            self._func = partial(_run_worker_task, batch = batch)
+        self._pool = _ProcessPool(self.n_jobs, initializer = _init_worker, initargs = (spec,))
+
+
+
+class Prefetcher:
+
+    def __init__(self, importer, prefetch = 4, io_threads = 2, batch = False, profile = False, isolation = None, dtype = None):
+        '''
+        Load the data of the pipeline tasks ahead of the computation in a pool of I/O threads.
+
+        At most `prefetch` tasks are loaded and not yet consumed at the same time,
+        so the memory usage stays bounded when the computation is slower than the I/O.
+
+        Args:
+            importer (importer-object): importer instance
+            prefetch (int, optional): maximum number of loaded tasks waiting to be consumed. Defaults to 4.
+            io_threads (int, optional): number of I/O threads. Defaults to 2.
+            batch (bool, optional): if True, the tasks are groups of windows read at once. Defaults to False.
+            profile (bool, optional): if True, the loading time of each task is returned with its data. Defaults to False.
+            isolation (dict, optional): retries and timeout of the instances (the timeout is not applied in the I/O threads).
+                If None, the errors are raised. Defaults to None.
+            dtype ({'float64','float32'}, optional): data type of the loaded signals. If None, the data type of the process is used.
+                Defaults to None.
+        '''
+        self.prefetch = prefetch
+        self.io_threads = io_threads
+        self._load = partial(
+            _thread_task, func = partial(_load_task, importer = importer, batch = batch, profile = profile, isolation = isolation),
+            dtype = dtype
+        )
+        self._slots = threading.Semaphore(prefetch)
+        self._closed = False
+
+    def load(self, tasks):
+        '''
+        load the tasks in order.
+
+        Args:
+            tasks (iterable): tasks of the pipeline
+
+        Yields:
+            tuple: (task_id, data_list, stats) of each task
+        '''
+        tasks = iter(tasks)
+        pending = deque()
+        exhausted = False
+        with ThreadPoolExecutor(self.io_threads) as io:
+            while True:
+                # fill the free slots without blocking, so that a consumer running
+                # in the same thread can always get the already loaded tasks
+                while not exhausted:
+                    if len(pending) > 0:
+                        if not self._slots.acquire(blocking=False):
+                            break
+                    else:
+                        self._slots.acquire()
+                    if self._closed:
+                        return
+                    task = next(tasks, None)
+                    if task is None:
+                        self._slots.release()
+                        exhausted = True
+                    else:
+                        pending.append(io.submit(self._load, task))
+
+                if len(pending) == 0:
+                    return
+                yield pending.popleft().result()
+
+    def done(self):
+        '''
+        release the slot of a consumed task.
+        '''
+        self._slots.release()
+
+    def close(self):
+        # unblock the loading, e.g. in the task handler of a pool being terminated
+        self._closed = True
+        # `Semaphore.release(n)` requires Python 3.9
+        for _ in range(self.prefetch + 1):
+            self._slots.release()
+
+
+
+_EXECUTORS = {
+    'serial': SerialExecutor,
+    'thread': ThreadExecutor,
+    'process': ProcessExecutor,
+    'distributed': DistributedExecutor,
+}
+
+
+def get_executor(executor = None, n_jobs = 1):
+    '''
+    get an executor instance.
+
+    Args:
+        executor ({'serial','thread','process','distributed'} or executor-object, optional): type of the executor.
+            If None, 'serial' is used for `n_jobs=1` and 'process' otherwise. Defaults to None.
+        n_jobs (int, optional): number of jobs. -1 means using all processors. Defaults to 1.
+
+    Returns:
+        executor-object: the executor
+    '''
+    if executor is None:
+        executor = 'serial' if n_jobs == 1 else 'process'
+    if isinstance(executor, str):
+        if executor not in _EXECUTORS:
+            raise ValueError(f"executor must be one of {list(_EXECUTORS)} or an executor object")
+        executor = _EXECUTORS[executor](n_jobs=n_jobs)
+    return executor
+
+
+def _get_n_jobs(n_jobs):
+    if n_jobs is None or n_jobs < 0:
+        return os.cpu_count()
+    return n_jobs
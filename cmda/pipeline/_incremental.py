@@ -0,0 +1,167 @@
+import os
+import json
+import datetime
+from collections import deque
+
+import pandas as pd
+
+from ._checkpoint import config_hash, iterator_key
+
+
+
+
+class WatermarkStore:
+
+    def __init__(self, path, config, save_every = 100):
+        '''
+        Watermarks of the records processed by the previous runs of the pipeline, for incremental runs.
+
+        For each record, the start of the last processed window and the size and modification time
+        of its files are stored in a JSON file, keyed on a hash of the pipeline configuration.
+        The next run only computes the windows after the watermark (rolling window importers)
+        or the records whose files changed (other importers).
+
+        Args:
+            path (str): path of the JSON file. It is created if it does not exist.
+            config (dict): configuration of the pipeline, as returned by `pipeline_config`.
+            save_every (int, optional): number of processed instances after which the watermarks are saved. Defaults to 100.
+        '''
+        self.path = path
+        self.config = config_hash(config)
+        self.save_every = save_every
+
+        self._all = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self._all = json.load(f)
+        self.records = self._all.setdefault(self.config, {})
+
+        self._key = None
+        self._window_start = None
+        self._pending = {}
+        self._done = {}
+        self._files = {}
+        self._n_unsaved = 0
+
+    def select(self, importer, iterators):
+        '''
+        select the iterators which were not processed by the previous runs.
+
+        The incomplete windows at the end of a growing record are held back until the record is complete.
+
+        Args:
+            importer (importer-object): importer instance
+            iterators (list): iterators of the importer
+
+        Returns:
+            list: the iterators to be processed
+        '''
+        rolling = hasattr(importer, '_window_start')
+        if rolling:
+            self._key = lambda i: iterator_key(importer._group_key(i))
+            self._window_start = lambda i: _position(importer._window_start(i))
+        else:
+            self._key = iterator_key
+            self._window_start = None
+
+        records = {}
+        for itr in iterators:
+            records.setdefault(self._key(itr), []).append(itr)
+
+        res = []
+        for key, record in records.items():
+            files = _file_stats(importer._record_files(importer._group_key(record[0]) if rolling else record[0]))
+            prev = self.records.get(key)
+
+            # a file smaller than before has been rewritten, so the record is processed again
+            if prev is not None and any(
+                size < p[0] for (size, _), p in zip(files, prev['files'])
+            ):
+                print(f"The record {key} has been rewritten and is processed again")
+                prev = None
+            self._files[key] = files
+
+            if not rolling:
+                if prev is None or prev['files'] != files:
+                    res.extend(record)
+                    self._pending[key] = deque([None]*len(record))
+                continue
+
+            watermark = None if prev is None else prev['window']
+            new = []
+            for itr in sorted(record, key=self._window_start):
+                if watermark is not None and self._window_start(itr) <= watermark:
+                    continue
+                if not importer._window_complete(itr):
+                    break
+                new.append(itr)
+            res.extend(new)
+            self._pending[key] = deque(self._window_start(itr) for itr in new)
+            self._done[key] = set()
+            if prev is None and len(new) == 0:
+                self.records[key] = {'window': None, 'files': files}
+
+        return res
+
+    def done(self, iterator):
+        '''
+        mark an instance as processed and move the watermark of its record.
+
+        Args:
+            iterator: iterator of the processed instance
+        '''
+        key = self._key(iterator)
+        pending = self._pending[key]
+
+        if self._window_start is None:
+            pending.pop()
+            if len(pending) == 0:
+                self.records[key] = {'window': None, 'files': self._files[key]}
+        else:
+            # the watermark only moves over the consecutive windows which are all processed,
+            # since the results may come in any order
+            done = self._done[key]
+            done.add(self._window_start(iterator))
+            watermark = None
+            while len(pending) > 0 and pending[0] in done:
+                watermark = pending.popleft()
+                done.discard(watermark)
+            if watermark is not None:
+                self.records[key] = {'window': watermark, 'files': self._files[key]}
+
+        self._n_unsaved += 1
+        if self._n_unsaved >= self.save_every:
+            self.save()
+
+    def save(self):
+        # write into a temporary file first, so that an interruption can not corrupt the watermarks
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self._all, f)
+        os.replace(tmp, self.path)
+        self._n_unsaved = 0
+
+    def close(self):
+        self.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+
+def _file_stats(files):
+    # (size, modification time) of the existing files of a record
+    return [
+        [os.path.getsize(f), os.path.getmtime(f)]
+        for f in files if os.path.exists(f)
+    ]
+
+
+def _position(start):
+    # window starts are sample indices or date-times, compared as integers
+    if isinstance(start, (pd.Timestamp, datetime.datetime)):
+        return int(pd.Timestamp(start).value)
+    return int(start)
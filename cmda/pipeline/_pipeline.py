@@ -1,13 +1,20 @@
+import warnings
+
 import numpy as np
 import pandas as pd
 
-from functools import partial
+from itertools import groupby
 from tqdm import tqdm
-from pathos.multiprocessing import ProcessingPool as Pool
 
 
-from ..feature_extraction.feature_extraction import _extract_features
-from ..preprocessing.filter_object import apply_filters
+from ..utils import profiling
+from ..utils import precision as _precision
+from ._checkpoint import ResultStore, pipeline_config, iterator_key
+from ._executors import get_executor, Prefetcher
+from ._incremental import WatermarkStore
+from .sinks import FeatureMatrix
+from ._tasks import _process_data, _TaskError, TaskError
+from ..utils.record import Record
 
 
 
@@ -18,7 +25,7 @@ class Pipeline:
     def __init__(self,importer,features, filters = None):
         '''
         genearte a pipeline for reading, filtering and extracting features from multiple temporal data files
-        
+
         Args:
             importer (importer-object): created importer instance
             features (feature-object): created feature instance containg added feature functions
@@ -27,63 +34,274 @@ class Pipeline:
         self.importer = importer
         self.features = features
         self.filters = filters
+        self.profile = None
+        self.errors = []
 
 
-    def run(self, n_jobs = 1, dataframe_output = False):
+    def run(self, n_jobs = 1, dataframe_output = False, sink = None, array_output = False, dtype = 'float64', **kwargs):
         '''
         run the pipeline
 
         Args:
                        n_jobs (int,optional): Number of jobs to run in parallel. -1 means using all processors. Defaults to 1.
                        dataframe_output (True or False, optional): if True return the output in a dataframe format. Else the output is a dictionary. Defaults to True.
+                       sink (sink-object, optional): created sink instance (e.g. `ParquetSink`, `SQLiteSink`), to which the results are
+                            written as they are computed instead of being collected in memory. If given, the path of the sink is returned. Defaults to None.
+                       array_output (bool, optional): if True, the results are written into the rows of a preallocated matrix
+                            instead of a dict per instance, and a `FeatureMatrix` is returned (with the `values`, `index` and `ids` arrays),
+                            or its dataframe if `dataframe_output` is True. Defaults to False.
+                       dtype (str, optional): data type of the matrix with `array_output`, 'float64' or 'float32'. Defaults to 'float64'.
+                       **kwargs: other arguments of `iter_run`, e.g. `group_by_record`, `checkpoint`, `profile` or `on_error`.
         '''
 
-        # generate the iterators
-        iterators = self.importer.iterators
+        print(f"Running the pipeline on {len(self.importer.iterators)} instances...\n")
 
-        pip_func = partial(_pipeline, importer = self.importer, features = self.features, filters = self.filters)
+        res_iter = self.iter_run(n_jobs = n_jobs, **kwargs)
 
-        print(f"Running the pipeline on {len(iterators)} instances...\n")
-        if n_jobs == 1:
-            iterator_progress = tqdm(iterators)
-            res = map(pip_func, iterator_progress)
-        else:
-            p = Pool()
-            res = tqdm(p.map(pip_func, iterators),total=len(iterators))
+        if array_output:
+            sink = FeatureMatrix(n_rows = len(self.importer.iterators), dtype = dtype)
 
-        # create a dict from the result output and remove None values
-        res = {i[0]:i[1] for i in res if i is not None}
+        if sink is not None and sink.columns is None:
+            # the schema is fixed by the feature configuration, not by the first result
+            sink.columns = self._feature_columns()
+
+        if sink is not None:
+            with sink:
+                for index,features in res_iter:
+                    sink.write(index = index, res = features)
+            if self.profile is not None:
+                print(self.profile.report())
+            self._print_errors()
+            print("finished!")
+            if array_output:
+                return sink.to_dataframe() if dataframe_output else sink
+            return sink.path
+
+        # create a dict from the result output
+        res = {index:features for index,features in res_iter}
 
         if dataframe_output:
             res = pd.DataFrame(res).T
 
+        if self.profile is not None:
+            print(self.profile.report())
+
+        self._print_errors()
         print("finished!")
         return res
 
 
+    def error_report(self):
+        '''
+        get the instances which failed in the last run with `on_error='report'`.
+
+        Returns:
+            pd.DataFrame: the iterator, error type, message, number of attempts and traceback of each failed instance
+        '''
+        return pd.DataFrame(self.errors, columns=['iterator', 'error', 'message', 'attempts', 'traceback'])
+
 
-def _pipeline(path,importer,features,filters):
+    def _feature_columns(self):
+        # names of the features computed by the pipeline, from a probe window with the channels, sampling frequency
+        # and length of the first instance, whose samples are replaced by noise so that every feature has a value
+        if len(self.importer.iterators) == 0:
+            return None
+        try:
+            data = dict(self.importer._get_data(self.importer.iterators[0]))
+            rec_name = list(data.keys())[0]
+            rec = data[rec_name]
+            channels = list(rec.channels) if isinstance(rec, Record) else list(rec.keys())
+            fs = data['fs']
+            n = max(int(fs*data.get('win_len', 0) or 0), max(len(rec[c]) for c in channels), 1024)
+            noise = 1 + np.abs(np.random.default_rng(0).normal(size=(len(channels), n)))
+            data[rec_name] = Record(noise, channels, fs=fs)
+            if data.get('time_stamps') is not None:
+                data['time_stamps'] = np.arange(n)/fs
+            _, res = _process_data(data=data, features=self.features, filters=self.filters)
+        except Exception as e:
+            warnings.warn(f"the feature names could not be computed ({e!r}), the features of the first result are used")
+            return None
+        return [k for k in res if k != 'ID']
 
-    data = importer._get_data(iterator = path)
+    def _print_errors(self):
+        if len(self.errors) > 0:
+            print(f"{len(self.errors)} instances failed, see `error_report()`")
 
-    keys = list(data.keys())
-    rec_name = keys[0]
-    fs = data['fs']
-    data_val = data[rec_name]
 
-    if filters is not None:
-        data_val = apply_filters(filter_obj=filters,data=data_val,fs=fs)
-    
-    # in case of rolling window the length of data is 5
-    # otherwise it's 2
-    if len(data)>2:
-        res = _extract_features(feature_obj=features,data=data_val,fs=fs, win_len=data['win_len'], time_stamps=data['time_stamps'])
-        index = data['window']
-        res = {'ID':rec_name, **res}
-    else:
-        res = _extract_features(feature_obj=features,data=data_val,fs=fs)
-        index = rec_name
+    def iter_run(self, n_jobs = 1, ordered = True, group_by_record = False, checkpoint = None, profile = False,
+                 executor = None, chunksize = 1, longest_first = False, prefetch = 0, io_threads = 2,
+                 on_error = 'raise', retries = 0, timeout = None, incremental = None, precision = None):
+        '''
+        run the pipeline lazily and yield the results as soon as they are computed.
+
+        In contrast to `run`, the results are not collected in memory,
+        so the memory usage stays constant regardless of the number of instances.
+
+        Args:
+            n_jobs (int,optional): Number of jobs to run in parallel. -1 means using all processors. Defaults to 1.
+            ordered (bool, optional): if True the results are yielded in the order of the tasks.
+                Else they are yielded as soon as any worker finishes. Defaults to True.
+            group_by_record (bool or int, optional): if True, the windows of a rolling window importer are grouped by record,
+                so that each record is read once and all of its windows are computed from memory.
+                If an int is given, each group contains at most this number of windows. Defaults to False.
+            checkpoint (str, optional): path of a SQLite file for storing the results. If the run is interrupted,
+                running the pipeline again with the same configuration only computes the missing instances.
+                The stored results are yielded first. Defaults to None.
+            profile (bool, optional): if True, the wall time, CPU time and number of calls of each stage
+                (import, filters, features) and each added filter/feature function are collected from all the workers.
+                The report is stored in the `profile` attribute of the pipeline (see `Profiler.report`). Defaults to False.
+            executor ({'serial','thread','process','distributed'} or executor-object, optional): how the tasks are executed:
+                in the current process, in a pool of `n_jobs` threads, in a pool of `n_jobs` worker processes
+                or by workers connected over TCP (see `DistributedExecutor`, with `n_jobs` local workers).
+                If None, 'serial' is used for `n_jobs=1` and 'process' otherwise. Defaults to None.
+            chunksize (int, optional): number of tasks sent to a worker at once. Defaults to 1.
+            longest_first (bool, optional): if True, the longest tasks (largest records or groups of windows) are scheduled first,
+                which reduces the time spent waiting for the last tasks when the record lengths are uneven. Defaults to False.
+            prefetch (int, optional): if greater than 0, the data are read by `io_threads` I/O threads ahead of the computation,
+                so that reading and computing overlap. At most `prefetch` loaded tasks wait to be computed,
+                which bounds the memory usage. With the 'process' executor the loaded data are sent to the workers.
+                If 0, each task reads its data before computing it. Defaults to 0.
+            io_threads (int, optional): number of I/O threads used with `prefetch`. Defaults to 2.
+            on_error ({'raise','report'}, optional): if 'raise', the first failing instance stops the run.
+                If 'report', each instance is isolated: the failing instances are skipped and collected
+                in the `errors` attribute of the pipeline (see `error_report`), and the run goes on. Defaults to 'raise'.
+            retries (int, optional): number of times a failing instance is tried again. Defaults to 0.
+            timeout (float, optional): maximum time in seconds for reading and computing one instance,
+                after which it fails with `TaskTimeout`. It relies on the SIGALRM signal, so it is only applied
+                on Unix with the 'serial', 'process' and 'distributed' executors. Defaults to None.
+            incremental (str, optional): path of a JSON file storing a watermark for each record (the last processed window
+                and the size and modification time of its files). Only the new windows of the records, or the changed records
+                for importers without windows, are computed, so that the results can be appended to the output of the previous runs.
+                Defaults to None.
+            precision ({'float64','float32'}, optional): data type of the signals, from the importer to the features
+                (see `cmda.utils.precision`). 'float32' halves the memory usage and the data sent to the workers.
+                If None, the data type of the current process is used (float64 by default). Defaults to None.
+
+        Yields:
+            tuple: (index, features) of each instance, where `features` is a dictionary of the extracted features.
+        '''
 
-    return index,res
+        if on_error not in ('raise', 'report'):
+            raise ValueError("on_error must be 'raise' or 'report'")
+
+        # generate the iterators
+        iterators = self.importer.iterators
+        self.errors = []
+
+        dtype = _precision.get_dtype() if precision is None else _precision._check_dtype(precision)
+        config = pipeline_config(importer=self.importer, features=self.features, filters=self.filters, precision=dtype)
+
+        # the state of the run is released in `finally`, also if it fails to start
+        # or if the consumer stops iterating over the results
+        watermarks = None
+        store = None
+        progress = None
+        task_executor = None
+        prefetcher = None
+        try:
+            if incremental is not None:
+                watermarks = WatermarkStore(path = incremental, config = config)
+                iterators = watermarks.select(importer=self.importer, iterators=iterators)
+
+            progress = tqdm(total=len(iterators))
+
+            if checkpoint is not None:
+                store = ResultStore(path = checkpoint, config = config)
+                # skip the instances which are already computed
+                completed = store.completed()
+                keys = None
+                if watermarks is not None:
+                    # only the stored results of the new instances belong to this incremental run
+                    keys = {iterator_key(i) for i in iterators} & completed
+                    for i in iterators:
+                        if iterator_key(i) in keys:
+                            watermarks.done(i)
+                iterators = [i for i in iterators if iterator_key(i) not in completed]
+                for i in store.results(keys=keys):
+                    progress.update(1)
+                    yield i
+
+            batch = group_by_record and hasattr(self.importer, '_get_data_batch')
+            if batch:
+                group_size = None if group_by_record is True else int(group_by_record)
+                tasks = _group_iterators(iterators, group_key=self.importer._group_key, group_size=group_size)
+            else:
+                tasks = [[i] for i in iterators]
+
+            if longest_first:
+                size = getattr(self.importer, '_iterator_size', lambda i: 1)
+                tasks.sort(key=lambda task: sum(size(i) for i in task), reverse=True)
+
+            # the stats of the tasks, collected by the profilers of the threads or of the worker processes
+            self.profile = profiling.Profiler() if profile else None
+
+            isolation = None
+            if on_error == 'report' or retries > 0 or timeout is not None:
+                isolation = {'retries': retries, 'timeout': timeout}
+
+            staged = prefetch > 0
+            task_executor = get_executor(executor=executor, n_jobs=n_jobs)
+            task_executor.start(
+                importer = self.importer, features = self.features, filters = self.filters,
+                batch = batch, profile = profile, staged = staged, isolation = isolation, dtype = dtype
+            )
+            if staged:
+                prefetcher = Prefetcher(
+                    importer = self.importer, prefetch = prefetch, io_threads = io_threads,
+                    batch = batch, profile = profile, isolation = isolation, dtype = dtype
+                )
+                res = task_executor.imap(prefetcher.load(enumerate(tasks)), ordered = ordered, chunksize = chunksize)
+            else:
+                res = task_executor.imap(enumerate(tasks), ordered = ordered, chunksize = chunksize)
+
+            for task_id, task_res, stats in res:
+                if stats is not None:
+                    self.profile.merge(stats)
+                progress.update(len(task_res))
+                for itr, i in zip(tasks[task_id], task_res):
+                    if isinstance(i, _TaskError):
+                        if on_error == 'raise':
+                            raise TaskError(f"the instance {iterator_key(itr)} failed after {i.attempts} attempts:\n{i.traceback}")
+                        # the failed instances are not stored, so they are computed again when resuming
+                        self.errors.append({
+                            'iterator': iterator_key(itr), 'error': i.error, 'message': i.message,
+                            'attempts': i.attempts, 'traceback': i.traceback,
+                        })
+                        continue
+                    if store is not None:
+                        store.add(iterator=itr, result=i)
+                    # the watermark does not move over the failed instances, so they are computed again in the next run
+                    if watermarks is not None:
+                        watermarks.done(itr)
+                    # remove None values
+                    if i is not None:
+                        yield i
+                if staged:
+                    prefetcher.done()
+        finally:
+            if prefetcher is not None:
+                prefetcher.close()
+            if progress is not None:
+                progress.close()
+            if store is not None:
+                store.close()
+            if watermarks is not None:
+                watermarks.close()
+            # the workers hold the configuration of this run and can not be reused
+            if task_executor is not None:
+                task_executor.close()
+
+
+
+def _group_iterators(iterators, group_key, group_size = None):
+    # group the consecutive iterators belonging to the same record
+    groups = []
+    for _, group in groupby(iterators, key=group_key):
+        group = list(group)
+        if group_size is None:
+            groups.append(group)
+        else:
+            groups.extend(group[i:i+group_size] for i in range(0, len(group), group_size))
+    return groups
 
 
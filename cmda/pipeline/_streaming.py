@@ -0,0 +1,227 @@
+import numpy as np
+
+from ._tasks import _process_data
+
+
+
+
+class RingBuffer:
+
+    def __init__(self, capacity, dtype = 'float64'):
+        '''
+        Fixed-size buffer of the last `capacity` samples of a channel.
+
+        The samples are stored twice (mirrored), so that any window of the buffer
+        is a contiguous slice, returned as a view without copying the buffer.
+
+        Args:
+            capacity (int): number of samples kept in the buffer.
+            dtype (str, optional): data type of the samples. Defaults to 'float64'.
+        '''
+        self.capacity = capacity
+        self.total = 0
+        self._data = np.zeros(2*capacity, dtype=dtype)
+
+    def extend(self, x):
+        '''
+        append samples to the buffer, overwriting the oldest ones.
+
+        Args:
+            x (array-like): samples, at most `capacity`
+        '''
+        x = np.asarray(x, dtype=self._data.dtype)
+        n = len(x)
+        if n > self.capacity:
+            raise ValueError(f"can not append {n} samples to a buffer of {self.capacity} samples")
+
+        cap = self.capacity
+        i = self.total % cap
+        head = min(n, cap - i)
+        self._data[i:i+head] = x[:head]
+        self._data[cap+i:cap+i+head] = x[:head]
+        if head < n:
+            self._data[:n-head] = x[head:]
+            self._data[cap:cap+n-head] = x[head:]
+        self.total += n
+
+    def view(self, start, stop):
+        '''
+        get the samples between two absolute positions.
+
+        Args:
+            start (int): position of the first sample, counted from the first sample appended to the buffer.
+            stop (int): position after the last sample.
+
+        Returns:
+            ndarray: read-only view of the samples
+        '''
+        if start < self.total - self.capacity or stop > self.total:
+            raise IndexError(f"the samples {start}-{stop} are not in the buffer")
+        i = start % self.capacity
+        res = self._data[i:i+stop-start]
+        res.flags.writeable = False
+        return res
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+
+
+class StreamingPipeline:
+
+    def __init__(self, features, channels, fs, win_len, step = None, filters = None,
+                 buffer_len = None, name = 'stream', callback = None, dtype = 'float64'):
+        '''
+        Extract features from live signals, e.g. of a bedside monitor, in a rolling window manner.
+
+        The samples are pushed in chunks of any size and kept in a ring buffer per channel.
+        As soon as all channels contain a complete window of `win_len` seconds (every `step` seconds),
+        the filters and features are computed on it and the result is returned (and passed to `callback`).
+        The windows are views of the buffers, so the buffers are not copied at each step
+        (only the windows given to the filters are copied, since some filters modify their input).
+
+        Args:
+            features (feature-object): created feature instance containg added feature functions
+            channels (list): names of the channels
+            fs (float): sampling frequency of the channels
+            win_len (float): length of the windows in seconds.
+            step (float, optional): length of the window steps in seconds. If None, the step is equal to the window length. Defaults to None.
+            filters (filter-object, optional): created filter instance containg added filter functions. Defaults to None.
+            buffer_len (float, optional): length of the ring buffers in seconds, at least `win_len`.
+                If None, twice the window length is used. Defaults to None.
+            name (str, optional): name of the stream, used as the `ID` of the results. Defaults to 'stream'.
+            callback (callable, optional): function called with (index, features) of each window. Defaults to None.
+            dtype (str, optional): data type of the buffers. Defaults to 'float64'.
+        '''
+        self.features = features
+        self.filters = filters
+        self.channels = list(channels)
+        self.fs = fs
+        self.win_len = win_len
+        self.step = win_len if step is None else step
+        self.name = name
+        self.callback = callback
+
+        self._win = int(win_len*fs)
+        self._step = int(self.step*fs)
+        if buffer_len is None:
+            buffer_len = 2*win_len
+        self._capacity = max(int(buffer_len*fs), self._win)
+        self._dtype = dtype
+        self.reset()
+
+    def reset(self):
+        '''
+        clear the buffers and restart the windows from the next pushed sample.
+        '''
+        self._buffers = {c: RingBuffer(self._capacity, dtype=self._dtype) for c in self.channels}
+        self._next_start = 0
+
+    def push(self, chunk):
+        '''
+        append a chunk of samples and compute the completed windows.
+
+        Args:
+            chunk (dict or array-like): new samples, either a dict of arrays for some or all channels
+                (the channels may be pushed separately), or an array of shape (n_samples, n_channels)
+                in the order of `channels` (or (n_samples,) with a single channel).
+
+        Returns:
+            list: (index, features) of each completed window, where the index is the (start, stop) sample of the window.
+        '''
+        chunk = self._to_dict(chunk)
+        offsets = dict.fromkeys(chunk, 0)
+
+        res = []
+        while True:
+            moved = False
+            for c, x in chunk.items():
+                buf = self._buffers[c]
+                # the samples of the next window must not be overwritten before it is computed
+                free = self._capacity - max(buf.total - self._next_start, 0)
+                n = min(len(x) - offsets[c], free)
+                if n > 0:
+                    buf.extend(x[offsets[c]:offsets[c]+n])
+                    offsets[c] += n
+                    moved = True
+
+            res.extend(self._compute_windows())
+
+            if all(offsets[c] == len(x) for c, x in chunk.items()):
+                return res
+            if not moved:
+                ahead = [c for c, x in chunk.items() if offsets[c] < len(x)]
+                raise ValueError(
+                    f"the channels {ahead} are ahead of the other channels by more than the buffer length"
+                )
+
+    def stream(self, source):
+        '''
+        compute the windows of the chunks of an iterable, e.g. a generator reading a device.
+
+        Args:
+            source (iterable): chunks of samples (see `push`)
+
+        Yields:
+            tuple: (index, features) of each completed window
+        '''
+        for chunk in source:
+            yield from self.push(chunk)
+
+    async def astream(self, source):
+        '''
+        compute the windows of the chunks of an async iterable, e.g. a network stream.
+
+        Args:
+            source (async iterable or iterable): chunks of samples (see `push`)
+
+        Yields:
+            tuple: (index, features) of each completed window
+        '''
+        if hasattr(source, '__aiter__'):
+            async for chunk in source:
+                for res in self.push(chunk):
+                    yield res
+        else:
+            for chunk in source:
+                for res in self.push(chunk):
+                    yield res
+
+    def _compute_windows(self):
+        res = []
+        ready = min(buf.total for buf in self._buffers.values())
+        while self._next_start + self._win <= ready:
+            start = self._next_start
+            stop = start + self._win
+
+            data = {c: self._buffers[c].view(start, stop) for c in self.channels}
+            if self.filters is not None:
+                data = {c: x.copy() for c, x in data.items()}
+            data = {
+                self.name: data,
+                'fs': self.fs,
+                'win_len': self.win_len,
+                'time_stamps': None,
+                'window': (start, stop),
+            }
+            out = _process_data(data=data, features=self.features, filters=self.filters)
+
+            if self.callback is not None:
+                self.callback(*out)
+            res.append(out)
+            self._next_start += self._step
+        return res
+
+    def _to_dict(self, chunk):
+        if isinstance(chunk, dict):
+            unknown = set(chunk).difference(self.channels)
+            if len(unknown) > 0:
+                raise ValueError(f"unknown channels {unknown}")
+            return {c: np.asarray(x) for c, x in chunk.items()}
+
+        chunk = np.asarray(chunk)
+        if chunk.ndim == 1:
+            chunk = chunk.reshape(-1, 1)
+        if chunk.shape[1] != len(self.channels):
+            raise ValueError(f"the chunk must have {len(self.channels)} columns, one for each channel")
+        return {c: chunk[:, i] for i, c in enumerate(self.channels)}
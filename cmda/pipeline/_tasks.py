@@ -0,0 +1,335 @@
+import copy
+import time
+import signal
+import threading
+import traceback
+from contextlib import contextmanager
+
+import numpy as np
+
+from ..feature_extraction.feature_extraction import _extract_features
+from ..preprocessing.filter_object import apply_filters
+from ..utils import profiling
+from ..utils import precision
+from ..utils.record import Record
+
+
+
+
+# configuration of the pipeline in a worker process
+_worker_config = {}
+
+
+def _pipeline_spec(importer,features,filters,dtype=None):
+    # the importer is copied without its iterators
+    importer = copy.copy(importer)
+    for attr in ('iterators', 'iterator'):
+        if hasattr(importer, attr):
+            setattr(importer, attr, None)
+
+    return {
+        'importer': importer,
+        'features': _object_spec(features),
+        'filters': _object_spec(filters),
+        'precision': (precision.get_dtype() if dtype is None else np.dtype(dtype)).name,
+    }
+
+
+def _object_spec(obj):
+    # features and filters can be given as a dict of objects for each channel
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return {k: _object_spec(v) for k, v in obj.items()}
+    return (type(obj), obj._get_spec())
+
+
+def _object_from_spec(spec):
+    if spec is None:
+        return None
+    if isinstance(spec, dict):
+        return {k: _object_from_spec(v) for k, v in spec.items()}
+    cls, spec = spec
+    return cls._from_spec(spec)
+
+
+def _init_worker(spec):
+    _worker_config['importer'] = spec['importer']
+    _worker_config['features'] = _object_from_spec(spec['features'])
+    _worker_config['filters'] = _object_from_spec(spec['filters'])
+    _worker_config['isolation'] = spec.get('isolation')
+    precision.set_dtype(spec.get('precision', 'float64'))
+    if spec['profile']:
+        profiling.enable()
+
+
+def _thread_task(task,func,dtype=None,profile=False):
+    # run a task in a thread of the current process with the data type of the run and,
+    # if the profiling is enabled, its own profiler whose stats are returned with the results
+    with precision._scoped(dtype):
+        if not profile:
+            return func(task)
+        with profiling.profiler():
+            return func(task)
+
+
+def _run_worker_task(task,batch=False):
+    return _run_task(task=task, batch=batch, **_worker_config)
+
+
+def _compute_worker_task(loaded):
+    return _compute_task(
+        loaded=loaded, features=_worker_config['features'], filters=_worker_config['filters'],
+        isolation=_worker_config.get('isolation')
+    )
+
+
+def _run_task(task,importer,features,filters,batch=False,isolation=None):
+    task_id, paths = task
+
+    # the active profiler, if the profiling is enabled
+    prof = profiling.get_profiler()
+
+    if batch:
+        res = _run_batch(paths=paths, importer=importer, features=features, filters=filters, isolation=isolation)
+    else:
+        res = [
+            _guarded(_pipeline, isolation, path=path, importer=importer, features=features, filters=filters)
+            for path in paths
+        ]
+
+    stats = prof.pop_stats() if prof is not None else None
+    return task_id, res, stats
+
+
+def _load_task(task,importer,batch=False,profile=False,isolation=None):
+    # I/O stage of a task, run in the prefetching threads
+    task_id, paths = task
+
+    if profile:
+        t = time.perf_counter(), time.thread_time()
+
+    # timed here and not by the profiler of the process, which is not updated from the I/O threads
+    if batch:
+        data_list = _read_batch(paths=paths, importer=importer, isolation=isolation)
+    else:
+        data_list = [_guarded(importer._get_data, isolation, iterator=path) for path in paths]
+
+    stats = None
+    if profile:
+        stats = {'import': [time.perf_counter() - t[0], time.thread_time() - t[1], 1]}
+    return task_id, data_list, stats
+
+
+def _compute_task(loaded,features,filters,isolation=None):
+    # compute stage of a task, run by the executor
+    task_id, data_list, load_stats = loaded
+
+    prof = profiling.get_profiler()
+
+    res = [_compute(data=data, features=features, filters=filters, isolation=isolation) for data in data_list]
+
+    stats = prof.pop_stats() if prof is not None else None
+    if load_stats is not None:
+        # the stages timed in both the I/O thread and the computation (e.g. the windows of a group read lazily) are summed
+        total = profiling.Profiler()
+        total.merge(stats or {})
+        total.merge(load_stats)
+        stats = total.stats
+    return task_id, res, stats
+
+
+def _run_batch(paths,importer,features,filters,isolation=None):
+    # compute the windows of a group as they are read, if the importer reads them lazily,
+    # so that the data of the whole group is not kept in memory
+    if not hasattr(importer, '_iter_data_batch'):
+        data_list = _load_batch(paths=paths, importer=importer, isolation=isolation)
+        return [_compute(data=data, features=features, filters=filters, isolation=isolation) for data in data_list]
+
+    prof = profiling.get_profiler()
+
+    res = []
+    windows = importer._iter_data_batch(iterators = paths)
+    while len(res) < len(paths):
+        if prof is not None:
+            t = prof.tic()
+        try:
+            data = next(windows)
+        except Exception:
+            if isolation is None:
+                raise
+            # read the remaining windows one by one, so that only the failing ones are lost
+            data = None
+        if prof is not None:
+            prof.toc('import', t)
+
+        if data is None:
+            res.extend(
+                _compute(data=_guarded(importer._get_data, isolation, iterator=path), features=features, filters=filters, isolation=isolation)
+                for path in paths[len(res):]
+            )
+            break
+        res.append(_compute(data=data, features=features, filters=filters, isolation=isolation))
+    windows.close()
+    return res
+
+
+def _load_batch(paths,importer,isolation=None):
+    # read the windows of a group at once
+
+    prof = profiling.get_profiler()
+    if prof is not None:
+        t = prof.tic()
+
+    data_list = _read_batch(paths=paths, importer=importer, isolation=isolation)
+
+    if prof is not None:
+        prof.toc('import', t)
+    return data_list
+
+
+def _read_batch(paths,importer,isolation=None):
+    timeout = None if isolation is None or isolation['timeout'] is None else isolation['timeout']*len(paths)
+    try:
+        with _time_limit(timeout):
+            data_list = importer._get_data_batch(iterators = paths)
+    except Exception:
+        if isolation is None:
+            raise
+        # read the windows one by one, so that only the failing ones are lost
+        data_list = [_guarded(importer._get_data, isolation, iterator=path) for path in paths]
+    return data_list
+
+
+def _compute(data,features,filters,isolation=None):
+    # the instances which could not be read are passed on
+    if isinstance(data, _TaskError):
+        return data
+    return _guarded(_process_data, isolation, data=data, features=features, filters=filters)
+
+
+
+class TaskError(RuntimeError):
+    '''
+    raised when an instance of the pipeline fails after all its retries.
+    '''
+
+
+
+class TaskTimeout(Exception):
+    '''
+    raised in a task running longer than the timeout of the pipeline.
+    '''
+
+
+
+class _TaskError:
+
+    def __init__(self, exc, attempts):
+        # failure of an instance, returned instead of its result
+        self.error = type(exc).__name__
+        self.message = str(exc)
+        self.traceback = traceback.format_exc()
+        self.attempts = attempts
+
+
+def _guarded(func,isolation,**kwargs):
+    # run func with the retries and timeout of the isolation settings,
+    # and return a _TaskError instead of raising
+    if isolation is None:
+        return func(**kwargs)
+
+    for attempt in range(1, isolation['retries'] + 2):
+        try:
+            with _time_limit(isolation['timeout']):
+                return func(**kwargs)
+        except Exception as e:
+            err = _TaskError(e, attempts=attempt)
+    return err
+
+
+@contextmanager
+def _time_limit(timeout):
+    # the timer signal is only available on Unix and in the main thread,
+    # e.g. in the serial executor or in the worker processes
+    if timeout is None or not hasattr(signal, 'SIGALRM') or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def _raise_timeout(signum, frame):
+        raise TaskTimeout(f"the task exceeded the timeout of {timeout} s")
+
+    prev = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, prev)
+
+
+def _pipeline(path,importer,features,filters):
+
+    prof = profiling.get_profiler()
+    if prof is not None:
+        t = prof.tic()
+
+    data = importer._get_data(iterator = path)
+
+    if prof is not None:
+        prof.toc('import', t)
+
+    return _process_data(data=data, features=features, filters=filters)
+
+
+def _process_data(data,features,filters):
+
+    keys = list(data.keys())
+    rec_name = keys[0]
+    fs = data['fs']
+    data_val = data[rec_name]
+
+    # the lazily converted signals (e.g. the digital samples of WFDB records)
+    # are converted once here, instead of in each filter and feature
+    if isinstance(data_val, Record):
+        if data_val.is_digital:
+            data_val = data_val.physical()
+        if precision.is_single():
+            data_val = data_val.astype(precision.get_dtype())
+    else:
+        if any(_is_lazy(x) for x in data_val.values()):
+            data_val = {k: np.asarray(x) if _is_lazy(x) else x for k, x in data_val.items()}
+        if precision.is_single():
+            data_val = {k: precision.to_policy(x) for k, x in data_val.items()}
+
+    prof = profiling.get_profiler()
+
+    if filters is not None:
+        if prof is not None:
+            t = prof.tic()
+        data_val = apply_filters(filter_obj=filters,data=data_val,fs=fs)
+        if prof is not None:
+            prof.toc('filters', t)
+
+    if prof is not None:
+        t = prof.tic()
+
+    # in case of rolling window the length of data is 5
+    # otherwise it's 2
+    if len(data)>2:
+        res = _extract_features(feature_obj=features,data=data_val,fs=fs, win_len=data['win_len'], time_stamps=data['time_stamps'])
+        index = data['window']
+        res = {'ID':rec_name, **res}
+    else:
+        res = _extract_features(feature_obj=features,data=data_val,fs=fs)
+        index = rec_name
+
+    if prof is not None:
+        prof.toc('features', t)
+
+    return index,res
+
+
+def _is_lazy(x):
+    # array-like objects which are converted by np.asarray, but are not arrays nor lists
+    return hasattr(x, '__array__') and not isinstance(x, np.ndarray)
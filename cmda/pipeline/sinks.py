@@ -0,0 +1,411 @@
+import os
+import sqlite3
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+
+
+class _Sink:
+
+    def __init__(self, path, columns = None, row_group_size = 10000, dtype = 'float32'):
+        self.path = path
+        self.columns = columns
+        self.row_group_size = row_group_size
+        self.dtype = np.dtype(dtype)
+        self._buffers = OrderedDict()
+        self._n_buffered = 0
+        self._warned = False
+
+    def write(self, index, res):
+        '''
+        add the result of an instance to the sink.
+
+        Args:
+            index: index of the instance
+            res (dict): extracted features of the instance
+        '''
+        res = dict(res)
+        rec_name = res.pop('ID', index)
+
+        # the schema is fixed by the first result, if it is not given nor set by the pipeline
+        if self.columns is None:
+            self.columns = list(res.keys())
+        elif not self._warned and len(res.keys() - set(self.columns)) > 0:
+            warnings.warn(
+                f"features {sorted(res.keys() - set(self.columns))} are not in the sink schema and are dropped"
+            )
+            self._warned = True
+
+        row = [res.get(c, np.nan) for c in self.columns]
+        self._buffers.setdefault(rec_name, []).append((index, row))
+        self._n_buffered += 1
+
+        if len(self._buffers[rec_name]) >= self.row_group_size:
+            self._flush(rec_name)
+        elif self._n_buffered >= self.row_group_size:
+            # write the largest buffer to keep the memory bounded
+            self._flush(max(self._buffers, key=lambda k: len(self._buffers[k])))
+
+    def close(self):
+        '''
+        write the buffered results and close the sink.
+        '''
+        for rec_name in list(self._buffers):
+            self._flush(rec_name)
+
+    def _flush(self, rec_name):
+        rows = self._buffers.pop(rec_name)
+        self._n_buffered -= len(rows)
+        index = [i[0] for i in rows]
+        values = np.array([i[1] for i in rows], dtype=self.dtype).reshape(len(rows), len(self.columns))
+        self._write_rows(rec_name=rec_name, index=index, values=values)
+
+    def _write_rows(self, rec_name, index, values):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+
+class FeatureMatrix:
+
+    def __init__(self, n_rows = None, columns = None, dtype = 'float64'):
+        '''
+        Collect the pipeline results into a preallocated matrix, with one row per instance and one column per feature.
+
+        The feature names are fixed when the matrix is created by `Pipeline.run` (if `columns` is not given),
+        from the configuration of the pipeline, and the index and record name
+        of each row are stored in separate arrays, so no dict is kept for each instance.
+
+        Args:
+            n_rows (int, optional): expected number of instances, for allocating the matrix once.
+                The matrix grows if more results are written. If None, 1024 rows are allocated first. Defaults to None.
+            columns (list, optional): list of the feature names. If None, the features of the configuration of the pipeline
+                are set by `Pipeline.run`, or the features of the first result are used. Defaults to None.
+            dtype (str, optional): data type of the matrix, e.g. 'float64' or 'float32'. Defaults to 'float64'.
+        '''
+        self.columns = columns
+        self.dtype = np.dtype(dtype)
+        self.n = 0
+        self._n_rows = n_rows if n_rows else 1024
+        self._values = None
+        self._index = None
+        self._ids = None
+        self._warned = False
+
+    def write(self, index, res):
+        '''
+        write the result of an instance into the next row.
+
+        Args:
+            index: index of the instance
+            res (dict): extracted features of the instance
+        '''
+        if self._values is None:
+            if self.columns is None:
+                self.columns = [k for k in res if k != 'ID']
+            self._positions = {c: i for i, c in enumerate(self.columns)}
+            self._values = np.empty((self._n_rows, len(self.columns)), dtype=self.dtype)
+            self._index = np.empty(self._n_rows, dtype=object)
+        elif self.n == len(self._values):
+            self._grow()
+
+        row = self._values[self.n]
+        row[:] = np.nan
+        for k, v in res.items():
+            if k == 'ID':
+                if self._ids is None:
+                    self._ids = np.empty(len(self._values), dtype=object)
+                self._ids[self.n] = v
+                continue
+            pos = self._positions.get(k)
+            if pos is not None:
+                row[pos] = v
+            elif not self._warned:
+                warnings.warn(f"feature {k} is not in the schema of the matrix and is dropped")
+                self._warned = True
+
+        self._index[self.n] = index
+        self.n += 1
+
+    @property
+    def values(self):
+        '''
+        ndarray: the feature matrix, of shape (number of instances, number of features)
+        '''
+        if self._values is None:
+            return np.empty((0, 0 if self.columns is None else len(self.columns)), dtype=self.dtype)
+        return self._values[:self.n]
+
+    @property
+    def index(self):
+        '''
+        ndarray: the index of each row
+        '''
+        if self._index is None:
+            return np.empty(0, dtype=object)
+        return self._index[:self.n]
+
+    @property
+    def ids(self):
+        '''
+        ndarray: the record name of each row (rolling window importers), or None
+        '''
+        if self._ids is None:
+            return None
+        return self._ids[:self.n]
+
+    def to_dataframe(self):
+        '''
+        get the results as a dataframe, without copying the feature matrix.
+
+        Returns:
+            pd.DataFrame: results, with the record names in the `ID` column (rolling window importers)
+        '''
+        res = pd.DataFrame(self.values, index=pd.Index(list(self.index)), columns=self.columns, copy=False)
+        if self._ids is not None:
+            res.insert(0, 'ID', self.ids)
+        return res
+
+    def close(self):
+        pass
+
+    def _grow(self):
+        n_rows = 2*len(self._values)
+        values = np.empty((n_rows, len(self.columns)), dtype=self.dtype)
+        values[:self.n] = self._values[:self.n]
+        self._values = values
+        self._index = np.concatenate([self._index, np.empty(n_rows - self.n, dtype=object)])
+        if self._ids is not None:
+            self._ids = np.concatenate([self._ids, np.empty(n_rows - self.n, dtype=object)])
+
+    def __len__(self):
+        return self.n
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+
+class ParquetSink(_Sink):
+
+    _extension = '.parquet'
+
+    def __init__(self, path, columns = None, row_group_size = 10000, dtype = 'float32', shard_by_record = True, max_open_files = 64):
+        '''
+        Write the pipeline results into Parquet files as they are computed.
+
+        The results are written in row groups with a fixed schema, where the features are downcasted to `dtype`
+        and the record names are stored as a dictionary-encoded `ID` column.
+        Requires `pyarrow`.
+
+        Args:
+            path (str): If `shard_by_record` is True, the directory of the output files (one file per record).
+                Else, path of the output file.
+            columns (list, optional): list of the feature names (schema of the output).
+                If None, `Pipeline.run` sets the features of its configuration, or the features of the first result are used.
+                Defaults to None.
+            row_group_size (int, optional): number of rows buffered before writing a row group. Defaults to 10000.
+            dtype (str, optional): data type of the features. Defaults to 'float32'.
+            shard_by_record (bool, optional): if True, write the results of each record in a separate file. Defaults to True.
+            max_open_files (int, optional): maximum number of files kept open at the same time. Defaults to 64.
+        '''
+        super().__init__(path=path, columns=columns, row_group_size=row_group_size, dtype=dtype)
+        self.shard_by_record = shard_by_record
+        self.max_open_files = max_open_files
+        self._writers = OrderedDict()
+        self._n_parts = {}
+        self._schema = None
+
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError(f"pyarrow is required for {type(self).__name__}")
+
+    def close(self):
+        super().close()
+        for key in list(self._writers):
+            self._writers.pop(key).close()
+
+    def read(self):
+        '''
+        read the written results.
+
+        Returns:
+            pd.DataFrame: results
+        '''
+        return pd.read_parquet(self.path)
+
+    def _write_rows(self, rec_name, index, values):
+        import pyarrow as pa
+
+        # tuple indices (e.g. the record name and sample range of a window) are stored as strings, as in `SQLiteSink`
+        index = [str(i) if isinstance(i, tuple) else i for i in index]
+        table = {
+            'index': pa.array(index),
+            'ID': pa.array([str(rec_name)]*len(index)).dictionary_encode(),
+        }
+        for n, c in enumerate(self.columns):
+            table[c] = pa.array(values[:, n])
+        table = pa.table(table)
+
+        if self._schema is None:
+            self._schema = table.schema
+        table = table.cast(self._schema)
+
+        writer = self._get_writer(key=rec_name if self.shard_by_record else None)
+        writer.write_table(table)
+
+    def _get_writer(self, key):
+        if key in self._writers:
+            self._writers.move_to_end(key)
+            return self._writers[key]
+
+        # close the least recently used file
+        if len(self._writers) >= self.max_open_files:
+            _, writer = self._writers.popitem(last=False)
+            writer.close()
+
+        if key is None:
+            file = self.path
+        else:
+            # a record written again after its file is closed goes into a new part,
+            # and the parts of previous runs (e.g. incremental runs) are kept
+            os.makedirs(self.path, exist_ok=True)
+            part = self._n_parts.get(key, 0)
+            file = os.path.join(self.path, f'{key}-part{part}{self._extension}')
+            while os.path.exists(file):
+                part += 1
+                file = os.path.join(self.path, f'{key}-part{part}{self._extension}')
+            self._n_parts[key] = part + 1
+
+        self._writers[key] = self._open_writer(file)
+        return self._writers[key]
+
+    def _open_writer(self, file):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(file, self._schema)
+
+
+
+class ArrowSink(ParquetSink):
+
+    _extension = '.arrow'
+
+    def __init__(self, path, columns = None, row_group_size = 10000, dtype = 'float32', shard_by_record = True, max_open_files = 64):
+        '''
+        Write the pipeline results into Arrow IPC (feather) files as they are computed.
+
+        The results are written in record batches with a fixed schema, where the features are downcasted to `dtype`
+        and the record names are stored as a dictionary-encoded `ID` column.
+        Requires `pyarrow`.
+
+        Args:
+            path (str): If `shard_by_record` is True, the directory of the output files (one file per record).
+                Else, path of the output file.
+            columns (list, optional): list of the feature names (schema of the output).
+                If None, `Pipeline.run` sets the features of its configuration, or the features of the first result are used.
+                Defaults to None.
+            row_group_size (int, optional): number of rows buffered before writing a record batch. Defaults to 10000.
+            dtype (str, optional): data type of the features. Defaults to 'float32'.
+            shard_by_record (bool, optional): if True, write the results of each record in a separate file. Defaults to True.
+            max_open_files (int, optional): maximum number of files kept open at the same time. Defaults to 64.
+        '''
+        super().__init__(
+            path=path, columns=columns, row_group_size=row_group_size, dtype=dtype,
+            shard_by_record=shard_by_record, max_open_files=max_open_files
+        )
+
+    def read(self):
+        import pyarrow.dataset as ds
+        return ds.dataset(self.path, format='arrow').to_table().to_pandas()
+
+    def _open_writer(self, file):
+        import pyarrow as pa
+        return pa.ipc.new_file(file, self._schema)
+
+
+
+class SQLiteSink(_Sink):
+
+    def __init__(self, path, table = 'features', columns = None, row_group_size = 10000):
+        '''
+        Write the pipeline results into a table of a SQLite database as they are computed.
+
+        The record names are stored in a separate `records` table and referenced by their integer `ID`.
+
+        Args:
+            path (str): path of the SQLite database file.
+            table (str, optional): name of the results table. Defaults to 'features'.
+            columns (list, optional): list of the feature names (schema of the table).
+                If None, `Pipeline.run` sets the features of its configuration, or the features of the first result are used.
+                Defaults to None.
+            row_group_size (int, optional): number of rows buffered before writing them into the table. Defaults to 10000.
+        '''
+        super().__init__(path=path, columns=columns, row_group_size=row_group_size, dtype='float64')
+        self.table = table
+        self._conn = None
+        self._record_ids = {}
+
+    def close(self):
+        super().close()
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def read(self):
+        '''
+        read the written results.
+
+        Returns:
+            pd.DataFrame: results
+        '''
+        with sqlite3.connect(self.path) as conn:
+            res = pd.read_sql(
+                f'SELECT r.name AS ID, f.* FROM "{self.table}" f JOIN records r ON f.record_id = r.id',
+                conn
+            )
+        return res.drop(columns=['record_id'])
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS records (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+        columns = ', '.join(f'"{c}" REAL' for c in self.columns)
+        self._conn.execute(
+            f'CREATE TABLE IF NOT EXISTS "{self.table}" ("index" TEXT, record_id INTEGER, {columns})'
+        )
+        self._record_ids = dict(
+            (name, i) for i, name in self._conn.execute("SELECT id, name FROM records")
+        )
+
+    def _record_id(self, rec_name):
+        rec_name = str(rec_name)
+        if rec_name not in self._record_ids:
+            cur = self._conn.execute("INSERT INTO records (name) VALUES (?)", (rec_name,))
+            self._record_ids[rec_name] = cur.lastrowid
+        return self._record_ids[rec_name]
+
+    def _write_rows(self, rec_name, index, values):
+        if self._conn is None:
+            self._connect()
+
+        rec_id = self._record_id(rec_name)
+        placeholders = ', '.join(['?']*(len(self.columns)+2))
+        rows = (
+            (str(i), rec_id, *[None if np.isnan(v) else float(v) for v in row])
+            for i, row in zip(index, values)
+        )
+        self._conn.executemany(f'INSERT INTO "{self.table}" VALUES ({placeholders})', rows)
+        self._conn.commit()
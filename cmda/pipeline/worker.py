@@ -0,0 +1,35 @@
+import logging
+import argparse
+import multiprocessing
+
+from ._distributed import run_worker
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m cmda.pipeline.worker',
+        description='Run CMDA pipeline workers connected to a coordinator started with executor=DistributedExecutor(...).'
+    )
+    parser.add_argument('address', help='HOST:PORT of the coordinator')
+    parser.add_argument('--authkey', required=True, help='key shared with the coordinator')
+    parser.add_argument('--n-jobs', type=int, default=1, help='number of worker processes. -1 means using all processors')
+    parser.add_argument('--connect-timeout', type=float, default=60, help='time to wait for the coordinator [s]')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s: %(message)s')
+
+    host, port = args.address.rsplit(':', 1)
+    address = (host, int(port))
+
+    n_jobs = multiprocessing.cpu_count() if args.n_jobs < 0 else args.n_jobs
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(address, args.authkey, args.connect_timeout))
+        for _ in range(n_jobs)
+    ]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -4,12 +4,15 @@ from scipy import signal
 from inspect import getfullargspec
 
 from ._add_filters import _AddFilters
-from ..utils.utils import _AddUDF
+from ..utils.utils import _AddUDF, _UDFContainer
+from ..utils import profiling
+from ..utils import precision
+from ..utils.record import Record
 from . import filter_functions as ff
 from . import hrv_preprocessing as hrvp
 
 
-class Filters:
+class Filters(_UDFContainer):
 
     _ff_list = [
         'butter_filter',
@@ -57,7 +60,12 @@ class Filters:
     def transform(self,x,fs):
         res_all = {}
 
+        # the active profiler, if the profiling is enabled
+        prof = profiling.get_profiler()
+
         for func_key in self.add._ListOfFunctions:
+            if prof is not None:
+                t = prof.tic()
             args = self.add._ListOfFunctions[func_key]
             func = func_key.split('__')
             counter = func[1]
@@ -72,27 +80,37 @@ class Filters:
                 # func_name = "_Features" + func
                 method_to_call = getattr(self, func_key)
                 x = method_to_call(x=x)
+            # the filters computed in double precision (e.g. by scipy) return float32 with the float32 precision
+            x = precision.to_policy(x)
+            if prof is not None:
+                prof.toc(f'filters.{func_key}', t)
 
         for func_key in self.udf._ListOfUDFs:
+            if prof is not None:
+                t = prof.tic()
             args = self.udf._ListOfUDFs[func_key].copy()
             method_to_call = getattr(self.udf, func_key)
             x = method_to_call(x=x)
+            x = precision.to_policy(x)
+            if prof is not None:
+                prof.toc(f'filters.udf.{func_key}', t)
 
 
         return x
 
 
+
 def apply_filters(filter_obj, data: dict, fs: int = 1) -> dict:
     """
     Apply filters to a dictionary containing multiple arrays.
 
     Args:
         filter_obj (python_object): Filter object
-        data (dict): Dictionary containing multiple arrays
+        data (dict or Record): Dictionary containing multiple arrays, or a record
         fs (int, optional): Sampling frequency of the arrays. Defaults to 1.
 
     Returns:
-        dict: Filtered data.
+        dict or Record: Filtered data. A record is returned for a record, unless the filters changed the lengths of the signals.
     """
     # if isinstance(filter_obj,dict):
     #     filters_keys = set(filter_obj.keys())
@@ -100,6 +118,9 @@ def apply_filters(filter_obj, data: dict, fs: int = 1) -> dict:
     #     if len(data_keys.difference(filters_keys)) != 0:
     #         raise ValueError('The feature object keys are not as same as the data keys')
 
+    if isinstance(data, Record):
+        return _apply_filters_record(filter_obj=filter_obj, data=data, fs=fs)
+
     res = {}
     for key, x in data.items():
         
@@ -117,6 +138,29 @@ def apply_filters(filter_obj, data: dict, fs: int = 1) -> dict:
     return data
 
 
+def _apply_filters_record(filter_obj, data, fs):
+    # the channels are filtered as views of the record, and the filtered signals stacked into a new record.
+    # If a filter changed the length of a signal (e.g. removing the outliers), a dict of the signals is returned
+    if data.is_digital:
+        data = data.physical()
+    elif not data._owner:
+        # the windows of a group read at once are views of the same array, which are copied
+        # since some filters modify their input in place
+        data = data.copy()
+
+    res = {}
+    for key, x in data.items():
+        if isinstance(filter_obj,dict):
+            obj = filter_obj.get(key)
+        else:
+            obj = filter_obj
+        res[key] = x if obj is None else obj.transform(x = x, fs = fs)
+
+    if all(np.ndim(x) == 1 and len(x) == data.n_samples for x in res.values()):
+        return Record.from_columns(res, fs=data.fs, time_stamps=data.time_stamps)
+    return res
+
+
 
 
 
@@ -1,9 +1,21 @@
 from .import_wfdb import ReadWFDB, RollingWindowWFDB
 from .import_local import ReadCSV, RollingWindowCSV
+from .import_hdf5 import ReadHDF5, RollingWindowHDF5, ReadZarr, RollingWindowZarr
+from .import_parquet import ReadParquet, RollingWindowParquet
+from ._catalog import HeaderCatalog
+from ..utils.record import Record
 
 __all__ = [
     "ReadWFDB",
     "ReadCSV",
     "RollingWindowWFDB",
-    "RollingWindowCSV"
+    "RollingWindowCSV",
+    "ReadHDF5",
+    "RollingWindowHDF5",
+    "ReadZarr",
+    "RollingWindowZarr",
+    "ReadParquet",
+    "RollingWindowParquet",
+    "HeaderCatalog",
+    "Record"
 ]
\ No newline at end of file
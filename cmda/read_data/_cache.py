@@ -0,0 +1,241 @@
+import os
+import json
+import uuid
+import shutil
+import hashlib
+
+import numpy as np
+
+from ..utils.record import Record
+
+
+
+
+class SignalCache:
+
+    def __init__(self, cache_dir):
+        '''
+        On-disk cache of the records in a memory-mapped columnar binary format.
+
+        On the first access, each record is converted into a `.npy` file of shape (channels, samples)
+        (and an int64 `.npy` file of its date-times, if any), with a `meta.json` sidecar
+        containing the sampling frequency, channel names, length and the size and modification time
+        of the source files. The channels requested later are added in another `.npy` file.
+        The later reads memory-map the `.npy` files, so the windows are sliced without parsing the data,
+        and `CachedRecord.window` returns views of the memory map (see its conditions).
+        An entry is rebuilt when its source files change.
+
+        Args:
+            cache_dir (str): directory of the cache. It is created if it does not exist.
+        '''
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._records = {}
+
+    def get(self, source, files, channels, reader, fs, name, time = False):
+        '''
+        get a cached record, converting it on the first access.
+
+        Only the channels which are not cached yet are read from the source.
+
+        Args:
+            source: identifier of the record, e.g. its path.
+            files (list): source files of the record, whose size and modification time invalidate the cache.
+            channels (list): channels of the record to be cached.
+            reader (callable): function called with the list of the missing channels and `time`,
+                yielding chunks of the record as dicts of arrays, with the int64 date-times under `'__time__'`.
+            fs (float): sampling frequency of the record.
+            name (str): name of the record.
+            time (bool, optional): if True, the date-times of the record are cached as well. Defaults to False.
+
+        Returns:
+            CachedRecord: the cached record
+        '''
+        path = os.path.join(self.cache_dir, _key(source))
+        stats = _file_stats(files)
+
+        record = self._records.get(path)
+        if record is None or record.stats != stats:
+            record = CachedRecord.open(path)
+            if record is not None and record.stats != stats:
+                # the source files changed
+                shutil.rmtree(path, ignore_errors=True)
+                record = None
+
+        missing = [c for c in channels if record is None or c not in record.channels]
+        missing_time = time and (record is None or record.meta['time'] is None)
+        if len(missing) > 0 or missing_time:
+            meta = record.meta if record is not None else {
+                'source': repr(source), 'stats': stats, 'fs': fs, 'name': name,
+                'length': None, 'channels': {}, 'time': None,
+            }
+            record = _build(path=path, meta=meta, chunks=reader(missing, missing_time), channels=missing, time=missing_time)
+
+        self._records[path] = record
+        return record
+
+    def __getstate__(self):
+        # the memory maps are opened again in each process
+        state = self.__dict__.copy()
+        state['_records'] = {}
+        return state
+
+
+
+class CachedRecord:
+
+    def __init__(self, path, meta):
+        '''
+        A record of the `SignalCache`, whose channels are memory-mapped from their `.npy` files.
+
+        The channels are the rows of 2-D `.npy` files, or 1-D `.npy` files in the entries written by older versions.
+        '''
+        self.path = path
+        self.meta = meta
+        self.fs = meta['fs']
+        self.name = meta['name']
+        self.length = meta['length']
+        self.channels = list(meta['channels'])
+        self.stats = meta['stats']
+        self._arrays = {}
+
+    @classmethod
+    def open(cls, path):
+        meta_file = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_file):
+            return None
+        with open(meta_file) as f:
+            return cls(path, json.load(f))
+
+    def __getitem__(self, channel):
+        if self.length == 0:
+            # an empty file can not be memory-mapped
+            return np.empty(0)
+        file, row = self._location(channel)
+        x = self._map(file)
+        return x if row is None else x[row]
+
+    def window(self, channels, idx, fs = None, time_stamps = None, dtype = None):
+        '''
+        get samples of some channels as a `Record`.
+
+        If the channels are consecutive rows of one `.npy` file (e.g. the channels with which the entry was built,
+        in the same order), `idx` is a slice and `dtype` is float64, the record is a view of the memory map,
+        without copying the samples. Else, the samples are copied into a new record.
+
+        Args:
+            channels (list): channels of the record
+            idx (slice or array-like): samples of the record
+            fs (float, optional): sampling frequency of the record. If None, the one of the cache entry. Defaults to None.
+            time_stamps (ndarray, optional): time stamps of the samples. Defaults to None.
+            dtype (optional): data type of the record. If None, float64. Defaults to None.
+
+        Returns:
+            Record: the samples of the channels
+        '''
+        fs = self.fs if fs is None else fs
+        dtype = np.dtype('float64' if dtype is None else dtype)
+        if self.length > 0 and len(channels) > 0 and isinstance(idx, slice) and dtype == np.float64:
+            locations = [self._location(c) for c in channels]
+            rows = [row for _, row in locations]
+            if len({file for file, _ in locations}) == 1 and None not in rows and rows == list(range(rows[0], rows[0] + len(rows))):
+                array = self._map(locations[0][0])[rows[0]:rows[-1] + 1, idx]
+                return Record(array, channels, fs=fs, time_stamps=time_stamps)
+        return Record.from_columns({c: self[c][idx] for c in channels}, fs=fs, time_stamps=time_stamps, dtype=dtype)
+
+    def _location(self, channel):
+        # file of a channel, and its row in the file (None for the 1-D files of older versions)
+        location = self.meta['channels'][channel]
+        if isinstance(location, str):
+            return location, None
+        return location[0], location[1]
+
+    def _map(self, file):
+        # copy-on-write memory map, so the filters modifying their input do not change the cache.
+        # It is returned as a plain array (a view of the map), which can be pickled like any array
+        if file not in self._arrays:
+            self._arrays[file] = np.asarray(np.load(os.path.join(self.path, file), mmap_mode='c'))
+        return self._arrays[file]
+
+    @property
+    def time(self):
+        '''
+        ndarray: date-times of the samples as int64 nanoseconds since the epoch, or None
+        '''
+        if self.meta['time'] is None:
+            return None
+        if self.length == 0:
+            return np.empty(0, dtype='int64')
+        if '__time__' not in self._arrays:
+            self._arrays['__time__'] = np.asarray(np.load(os.path.join(self.path, self.meta['time']), mmap_mode='r'))
+        return self._arrays['__time__']
+
+
+
+def _build(path, meta, chunks, channels, time):
+    # the chunks are appended to raw files, which are converted into .npy files once the length is known:
+    # the channels into one file of shape (channels, samples), whose rows are the raw files one after the other.
+    # The files are written under temporary names and renamed, so that the concurrent readers
+    # (e.g. the workers of a pipeline) never see a partial file
+    os.makedirs(path, exist_ok=True)
+    tag = uuid.uuid4().hex[:8]
+    keys = list(channels) + (['__time__'] if time else [])
+    dtypes = {k: np.dtype('int64') if k == '__time__' else np.dtype('float64') for k in keys}
+    raw = {k: os.path.join(path, f'.{tag}-{n}.raw') for n, k in enumerate(keys)}
+
+    length = 0
+    handles = {k: open(f, 'wb') for k, f in raw.items()}
+    try:
+        for chunk in chunks:
+            for k in keys:
+                handles[k].write(np.ascontiguousarray(chunk[k], dtype=dtypes[k]).tobytes())
+            length += len(chunk[keys[0]])
+    finally:
+        for f in handles.values():
+            f.close()
+
+    if meta['length'] is None:
+        meta['length'] = length
+    elif meta['length'] != length:
+        raise ValueError(f"the cached record {meta['source']} has {meta['length']} samples, but {length} were read")
+
+    files = []
+    if len(channels) > 0:
+        files.append((f'{_key(tuple(channels))}-{tag}.npy', list(channels), (len(channels), length)))
+    if time:
+        files.append(('time.npy', ['__time__'], (length,)))
+    for file, file_keys, shape in files:
+        tmp = os.path.join(path, f'.{tag}-{file}')
+        with open(tmp, 'wb') as f:
+            np.lib.format.write_array_header_1_0(
+                f, {'descr': np.lib.format.dtype_to_descr(dtypes[file_keys[0]]), 'fortran_order': False, 'shape': shape}
+            )
+            for k in file_keys:
+                with open(raw[k], 'rb') as r:
+                    shutil.copyfileobj(r, f, 16*1024*1024)
+                os.remove(raw[k])
+        os.replace(tmp, os.path.join(path, file))
+        for row, k in enumerate(file_keys):
+            if k == '__time__':
+                meta['time'] = file
+            else:
+                meta['channels'][k] = [file, row]
+
+    tmp = os.path.join(path, f'.{tag}-meta.json')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, 'meta.json'))
+
+    return CachedRecord(path, meta)
+
+
+def _key(name):
+    return hashlib.sha1(repr(name).encode()).hexdigest()[:16]
+
+
+def _file_stats(files):
+    # (size, modification time) of the existing source files
+    return [
+        [os.path.getsize(f), os.path.getmtime(f)]
+        for f in files if os.path.exists(f)
+    ]
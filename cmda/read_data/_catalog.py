@@ -0,0 +1,210 @@
+import os
+import json
+import sqlite3
+import concurrent.futures
+from tqdm import tqdm
+
+import wfdb
+
+
+
+
+class HeaderCatalog:
+
+    def __init__(self, path = None, n_jobs = 8):
+        '''
+        Catalog of the headers of WFDB records, stored in a SQLite database.
+
+        The headers of the records which are not in the catalog are read in parallel
+        (in processes for the local records, in threads for the records of the Physionet server),
+        and stored with their name, sampling frequency, length, channel names, units and segments.
+        The next scans only read the headers of the new records and of the local records whose
+        header file changed, so the windows of large databases are planned without reading all the headers again.
+
+        Args:
+            path (str, optional): path of the SQLite database file. If None, the headers are only kept in memory. Defaults to None.
+            n_jobs (int, optional): number of parallel header reads. Defaults to 8.
+        '''
+        self.path = path
+        self.n_jobs = n_jobs
+        self._headers = {}
+
+    def scan(self, records):
+        '''
+        get the headers of records, reading the ones which are not in the catalog.
+
+        Args:
+            records (list): list of (record_path, pn_dir) of the records.
+
+        Returns:
+            dict: header of each (record_path, pn_dir), as a dict with the keys `record_name`, `fs`, `sig_len`,
+                `sig_name`, `units`, `seg_name` and `seg_len` (None for single segment records).
+        '''
+        records = list(dict.fromkeys(tuple(r) for r in records))
+        stored = self._load(records)
+
+        missing = []
+        for rec in records:
+            if rec in self._headers:
+                continue
+            if rec in stored and stored[rec][1] == _header_stats(*rec):
+                self._headers[rec] = stored[rec][0]
+            else:
+                missing.append(rec)
+
+        if len(missing) > 0:
+            print(f"Reading the headers of {len(missing)} records ...")
+            headers = self._read(missing)
+            self._headers.update(zip(missing, headers))
+            self._store(missing)
+
+        return {rec: self._headers[rec] for rec in records}
+
+    def get(self, record_path, pn_dir = None):
+        '''
+        get the header of a record, reading it if it is not in the catalog.
+
+        Args:
+            record_path (str): record name or path
+            pn_dir (str, optional): public directory of the record on the Physionet server. Defaults to None.
+
+        Returns:
+            dict: header of the record (see `scan`)
+        '''
+        rec = (record_path, pn_dir)
+        if rec not in self._headers:
+            self.scan([rec])
+        return self._headers[rec]
+
+    def _read(self, records):
+        local = [rec for rec in records if rec[1] is None]
+        remote = [rec for rec in records if rec[1] is not None]
+        res = {}
+
+        # parsing the local headers is bound by the CPU, downloading the remote ones by the network.
+        # Starting the processes takes longer than reading a few hundred local headers
+        n_proc = min(self.n_jobs, os.cpu_count() or 1)
+        if n_proc == 1 or len(local) < 500:
+            res.update(zip(local, map(_read_header, local)))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=n_proc) as executer:
+                chunksize = max(len(local)//(4*n_proc), 1)
+                headers = executer.map(_read_header, local, chunksize=chunksize)
+                res.update(zip(local, tqdm(headers, total=len(local))))
+
+        if len(remote) > 0:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.n_jobs) as executer:
+                headers = executer.map(_read_header, remote)
+                res.update(zip(remote, tqdm(headers, total=len(remote))))
+
+        return [res[rec] for rec in records]
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS headers ("
+            "record_path TEXT, pn_dir TEXT, record_name TEXT, fs, sig_len INTEGER, "
+            "sig_name TEXT, units TEXT, seg_name TEXT, seg_len TEXT, size INTEGER, mtime REAL, "
+            "PRIMARY KEY (record_path, pn_dir))"
+        )
+        return conn
+
+    def _load(self, records):
+        # stored headers of the records, with the (size, modification time) of their header file
+        if self.path is None:
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM headers").fetchall()
+        conn.close()
+
+        records = set(records)
+        res = {}
+        for row in rows:
+            rec = (row[0], row[1] or None)
+            if rec not in records:
+                continue
+            header = {
+                'record_name': row[2],
+                'fs': row[3],
+                'sig_len': row[4],
+                'sig_name': json.loads(row[5]),
+                'units': json.loads(row[6]),
+                'seg_name': json.loads(row[7]),
+                'seg_len': json.loads(row[8]),
+            }
+            res[rec] = (header, None if row[9] is None else (row[9], row[10]))
+        return res
+
+    def _store(self, records):
+        if self.path is None:
+            return
+        rows = []
+        for rec in records:
+            h = self._headers[rec]
+            stats = _header_stats(*rec) or (None, None)
+            rows.append((
+                rec[0], rec[1] or '', h['record_name'], h['fs'], h['sig_len'],
+                json.dumps(h['sig_name']), json.dumps(h['units']),
+                json.dumps(h['seg_name']), json.dumps(h['seg_len']), *stats,
+            ))
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO headers VALUES (?,?,?,?,?,?,?,?,?,?,?)", rows)
+        conn.close()
+
+
+
+def _read_header(record):
+    record_path, pn_dir = record
+    h = wfdb.rdheader(record_name=record_path, pn_dir=pn_dir)
+    seg_len = getattr(h, 'seg_len', None)
+    sig_name = getattr(h, 'sig_name', None)
+    units = getattr(h, 'units', None)
+    if seg_len is not None and sig_name is None:
+        # the channels of a multi-segment record are in its layout header
+        layout = _layout_header(record_path, pn_dir, h.seg_name, seg_len)
+        # a record made of gaps only has no channels
+        sig_name, units = ([], []) if layout is None else (layout.sig_name, layout.units)
+    return {
+        'record_name': h.record_name,
+        'fs': h.fs,
+        'sig_len': int(h.sig_len),
+        'sig_name': None if sig_name is None else list(sig_name),
+        'units': None if units is None else list(units),
+        'seg_name': None if getattr(h, 'seg_name', None) is None else list(h.seg_name),
+        'seg_len': None if seg_len is None else [int(n) for n in seg_len],
+    }
+
+
+def _segments(seg_name, seg_len):
+    # (name, first sample, length) of the segments of a multi-segment record, without its layout segment.
+    # The gaps are the segments named '~'
+    segments = []
+    start = 0
+    for i, (name, n) in enumerate(zip(seg_name, seg_len)):
+        if i == 0 and int(n) == 0:
+            continue
+        segments.append((name, start, int(n)))
+        start += int(n)
+    return segments
+
+
+def _layout_header(record_path, pn_dir, seg_name, seg_len):
+    # header with the channels of a multi-segment record: its layout segment (variable layout),
+    # or its first segment which is not a gap (fixed layout)
+    if int(seg_len[0]) == 0:
+        name = seg_name[0]
+    else:
+        name = next((n for n in seg_name if n != '~'), None)
+    if name is None:
+        return None
+    return wfdb.rdheader(record_name=os.path.join(os.path.dirname(record_path), name), pn_dir=pn_dir)
+
+
+def _header_stats(record_path, pn_dir):
+    # (size, modification time) of a local header file, None for the remote records
+    if pn_dir is not None:
+        return None
+    file = record_path + '.hea'
+    if not os.path.exists(file):
+        return None
+    return (os.path.getsize(file), os.path.getmtime(file))
@@ -0,0 +1,521 @@
+import os
+import concurrent
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from tqdm import tqdm
+
+import numpy as np
+
+from ..utils.utils import get_bins
+from ..utils import precision
+from ..utils.record import Record
+
+
+# number of files kept open in each process
+_MAX_OPEN = 16
+
+
+class _HDF5Files:
+    # opening and reading the files, shared by the HDF5 and Zarr importers
+
+    _extensions = ('.h5', '.hdf5', '.hdf')
+
+    def _list_files(self, files_list):
+        if isinstance(files_list, list):
+            res = files_list
+        elif isinstance(files_list, str) and os.path.isdir(files_list) and not files_list.rstrip('/').endswith(self._extensions):
+            res = [
+                os.path.join(files_list, f)
+                for f in sorted(os.listdir(files_list))
+                if f.endswith(self._extensions)
+            ]
+        else:
+            raise TypeError(
+                f"files_list must be either a list of {self._extensions} files or a directory path of {self._extensions} files"
+            )
+        return res
+
+    def _open(self, path):
+        try:
+            import h5py
+        except ImportError:
+            raise ImportError(f"h5py is required for {type(self).__name__}")
+        return h5py.File(path, 'r')
+
+    @contextmanager
+    def _root(self, path):
+        # the files are kept open in each process, so the chunks cached by the library are reused by the next windows.
+        # At most `_MAX_OPEN` files stay open: the least recently used ones which are not being read are closed.
+        # The handles are not shared with the forked processes
+        if self._pid != os.getpid():
+            self._files = OrderedDict()
+            self._readers = {}
+            self._files_lock = threading.Lock()
+            self._pid = os.getpid()
+        with self._files_lock:
+            if path not in self._files:
+                self._files[path] = self._open(path)
+            self._files.move_to_end(path)
+            self._readers[path] = self._readers.get(path, 0) + 1
+            root = self._files[path]
+        try:
+            yield root
+        finally:
+            with self._files_lock:
+                self._readers[path] -= 1
+                evicted = [p for p in self._files if self._readers.get(p, 0) == 0][:max(len(self._files) - _MAX_OPEN, 0)]
+                for p in evicted:
+                    _close(self._files.pop(p))
+
+    def _node(self, root):
+        if self.group in (None, '', '/'):
+            return root
+        return root[self.group]
+
+    def _layout(self, path):
+        # channels, length, chunk length and sampling frequency of a file,
+        # from the shape and the attributes of the datasets only
+        if path not in self._layouts:
+            with self._root(path) as root:
+                self._layouts[path] = _layout(
+                    node=self._node(root), root=root, channels=self.channels, dataset=self.dataset, fs=self.fs
+                )
+        return self._layouts[path]
+
+    def _read(self, path, sampfrom, sampto):
+        layout = self._layout(path)
+        with self._root(path) as root:
+            return _read_hyperslab(node=self._node(root), layout=layout, sampfrom=sampfrom, sampto=sampto)
+
+    def close(self):
+        '''
+        close the files kept open by the importer in this process.
+        '''
+        if self._pid != os.getpid():
+            return
+        with self._files_lock:
+            for p in [p for p in self._files if self._readers.get(p, 0) == 0]:
+                _close(self._files.pop(p))
+
+    def __del__(self):
+        if getattr(self, '_pid', None) == os.getpid():
+            self.close()
+
+    def __getstate__(self):
+        # the open files are not sent to the worker processes
+        state = self.__dict__.copy()
+        state['_files'] = OrderedDict()
+        state['_readers'] = {}
+        state['_files_lock'] = None
+        state['_pid'] = None
+        return state
+
+
+
+class ReadHDF5(_HDF5Files):
+
+    def __init__(self, files_list, channels = None, fs = None, group = None, dataset = None):
+        '''
+        Read multiple files in `HDF5` format.
+
+        The signals of a file are either stored as one 1-D dataset per channel in `group`,
+        or as a 2-D `dataset` of shape (samples, channels), whose attribute `channels` contains the channel names.
+        The datasets are read directly into the arrays of the records, without intermediate copies.
+
+        Args:
+            files_list ({str} or {list}): list of HDF5 files' paths or the path
+                to the directory containg the HDF5 files.
+            channels (list, optional): list of the channels (datasets, or columns of `dataset`) to import.
+                If None, all the channels are imported. Defaults to None.
+            fs (float, optional): sampling frequency of the data. If None, the attribute `fs` of the dataset
+                (or of the group or file) is used, or 1 if there is none. Defaults to None.
+            group (str, optional): path of the group containing the datasets. If None, the root group. Defaults to None.
+            dataset (str, optional): name of a 2-D dataset of shape (samples, channels) in `group`.
+                If None, the channels are the 1-D datasets of `group`. Defaults to None.
+        '''
+        self.channels = channels
+        self.fs = fs
+        self.group = group
+        self.dataset = dataset
+        self._layouts = {}
+        self._files = OrderedDict()
+        self._readers = {}
+        self._files_lock = None
+        self._pid = None
+
+        # generate the iterators using the given files_list
+        self.iterators = self._generate_iterators(files_list=files_list)
+
+    def load(self,n_jobs=None):
+        '''
+        load the data.
+
+        Args:
+            n_jobs (int, optional): The number of OpenMP processes to use for reading the data.
+            ```None``` means using all processors. Defaults to None.
+
+        Returns:
+            dict: imported data as a dictionary, where the keys are the record names and the values their `Record`.
+        '''
+        iterators = self.iterators
+        if n_jobs == 1:
+            iterator_progress = tqdm(iterators)
+            res = map(self._get_data, iterator_progress)
+        else:
+            executer = concurrent.futures.ProcessPoolExecutor(max_workers= n_jobs)
+            res = tqdm(executer.map(self._get_data, iterators), total=len(iterators))
+
+        return list(res)
+
+    def _get_data(self, iterator):
+        layout = self._layout(iterator)
+        res = self._read(iterator, 0, layout['length'])
+        return {_record_name(iterator): res, "fs": layout['fs']}
+
+    def _iterator_size(self, iterator):
+        return self._layout(iterator)['length']
+
+    def _record_files(self, iterator):
+        # files of a record, whose changes are tracked in incremental runs
+        return [iterator]
+
+    def _generate_iterators(self, files_list):
+        return self._list_files(files_list)
+
+
+
+class RollingWindowHDF5(_HDF5Files):
+
+    def __init__(
+        self,
+        files_list = None,
+        win_len = None,
+        step = None,
+        channels = None,
+        fs = None,
+        group = None,
+        dataset = None,
+        iterator = None,
+    ):
+        '''
+        Read multiple files in `HDF5` format with segmentation.
+
+        The signals are stored as in `ReadHDF5`. The windows are planned from the shapes and the attributes
+        of the datasets only, and each window is read as a hyperslab of the datasets, so reading a window
+        only touches the chunks of the file which contain it. The windows of a record read together
+        (e.g. with `group_by_record` in the pipeline) are sliced from one read of the chunks covering them.
+
+        Args:
+            files_list ({str} or {list}): list of HDF5 files' paths or the path
+                to the directory containg the HDF5 files.
+            win_len (float): length of rolling window in seconds.
+            step (float, optional): length of rolling window steps in seconds.
+                If None, the step length is equalt to the window length. Defaults to None.
+            channels (list, optional): list of the channels (datasets, or columns of `dataset`) to import.
+                If None, all the channels are imported. Defaults to None.
+            fs (float, optional): sampling frequency of the data. If None, the attribute `fs` of the dataset
+                (or of the group or file) is used, or 1 if there is none. Defaults to None.
+            group (str, optional): path of the group containing the datasets. If None, the root group. Defaults to None.
+            dataset (str, optional): name of a 2-D dataset of shape (samples, channels) in `group`.
+                If None, the channels are the 1-D datasets of `group`. Defaults to None.
+            iterator (list,optional): list of iterators for importing the files. if given, `files_list` will be ignored. Defaults to None.
+        '''
+        self.channels = channels
+        self.win_len = win_len
+        if step:
+            self.step = step
+        else:
+            self.step = win_len
+        self.fs = fs
+        self.iswin = True
+        self.group = group
+        self.dataset = dataset
+        self._layouts = {}
+        self._files = OrderedDict()
+        self._readers = {}
+        self._files_lock = None
+        self._pid = None
+
+        if iterator is None:
+            self.iterators = self._generate_iterators(files_list=files_list)
+        else:
+            self.iterators = iterator
+
+    def load(self,n_jobs=None):
+        '''
+        load the data
+
+        Args:
+            n_jobs (int, optional): The number of OpenMP processes to use for reading the data.
+            ```None``` means using all processors. Defaults to None.
+
+        Returns:
+            dict: imported data as a dictionary, where the keys are the record names and the values their `Record`.
+        '''
+        iterators = self.iterators
+        if n_jobs == 1:
+            iterator_progress = tqdm(iterators)
+            res = map(self._get_data, iterator_progress)
+        else:
+            executer = concurrent.futures.ProcessPoolExecutor(max_workers= n_jobs)
+            res = tqdm(executer.map(self._get_data, iterators), total=len(iterators))
+
+        return list(res)
+
+    def _get_data(self, iterator):
+        path, sampfrom, sampto = iterator
+        res = self._read(path, sampfrom, sampto)
+        return self._window_dict(iterator=iterator, res=res)
+
+    def _get_data_batch(self, iterators):
+        # read the chunks covering the given windows of a record at once, and slice the windows as views.
+        # The span is aligned to the chunks, which the library then reads without its chunk cache
+        path = iterators[0][0]
+        layout = self._layout(path)
+        chunk = layout['chunk']
+        sampfrom = min(itr[1] for itr in iterators)
+        sampto = max(itr[2] for itr in iterators)
+        sampfrom = sampfrom - sampfrom % chunk
+        sampto = min(-(-sampto//chunk)*chunk, layout['length'])
+
+        rec = self._read(path, sampfrom, sampto)
+        return [
+            self._window_dict(iterator=itr, res=rec.window(itr[1] - sampfrom, itr[2] - sampfrom))
+            for itr in iterators
+        ]
+
+    def _window_dict(self, iterator, res):
+        path, sampfrom, sampto = iterator
+        return {
+            _record_name(path): res,
+            "fs": res.fs,
+            "win_len": self.win_len,
+            "time_stamps": None,
+            "window": (sampfrom, sampto),
+        }
+
+    def _group_key(self, iterator):
+        return iterator[0]
+
+    def _iterator_size(self, iterator):
+        return iterator[2] - iterator[1]
+
+    def _record_files(self, key):
+        return [key]
+
+    def _window_start(self, iterator):
+        # first sample of the window, used as the watermark of incremental runs
+        return iterator[1]
+
+    def _window_complete(self, iterator):
+        return True
+
+    def _generate_iterators(self, files_list):
+        files = self._list_files(files_list)
+
+        iterators = []
+        for file in files:
+            layout = self._layout(file)
+            bins = get_bins(n=layout['length'], win_len=self.win_len, step=self.step, fs=layout['fs'])
+            for t_l, t_h, win in bins:
+                iterators.append((file, t_l, t_h))
+
+        return iterators
+
+
+
+class ReadZarr(ReadHDF5):
+
+    _extensions = ('.zarr',)
+
+    def __init__(self, files_list, channels = None, fs = None, group = None, dataset = None):
+        '''
+        Read multiple `Zarr` stores (requires `zarr`).
+
+        The stores have the same layout as the files of `ReadHDF5`: one 1-D array per channel in `group`,
+        or a 2-D `dataset` of shape (samples, channels) with the channel names in its attribute `channels`.
+
+        Args:
+            files_list ({str} or {list}): list of the paths of Zarr stores or the path
+                to the directory containg the `.zarr` stores.
+            channels (list, optional): list of the channels (arrays, or columns of `dataset`) to import.
+                If None, all the channels are imported. Defaults to None.
+            fs (float, optional): sampling frequency of the data. If None, the attribute `fs` of the array
+                (or of the group) is used, or 1 if there is none. Defaults to None.
+            group (str, optional): path of the group containing the arrays. If None, the root group. Defaults to None.
+            dataset (str, optional): name of a 2-D array of shape (samples, channels) in `group`.
+                If None, the channels are the 1-D arrays of `group`. Defaults to None.
+        '''
+        super().__init__(files_list=files_list, channels=channels, fs=fs, group=group, dataset=dataset)
+
+    def _open(self, path):
+        return _open_zarr(self, path)
+
+    def _record_files(self, iterator):
+        return _zarr_files(self, iterator)
+
+
+
+class RollingWindowZarr(RollingWindowHDF5):
+
+    _extensions = ReadZarr._extensions
+
+    def __init__(
+        self,
+        files_list = None,
+        win_len = None,
+        step = None,
+        channels = None,
+        fs = None,
+        group = None,
+        dataset = None,
+        iterator = None,
+    ):
+        '''
+        Read multiple `Zarr` stores with segmentation (requires `zarr`).
+
+        The stores have the same layout as in `ReadZarr`, and the windows are read as in `RollingWindowHDF5`.
+
+        Args:
+            files_list ({str} or {list}): list of the paths of Zarr stores or the path
+                to the directory containg the `.zarr` stores.
+            win_len (float): length of rolling window in seconds.
+            step (float, optional): length of rolling window steps in seconds.
+                If None, the step length is equalt to the window length. Defaults to None.
+            channels (list, optional): list of the channels (arrays, or columns of `dataset`) to import.
+                If None, all the channels are imported. Defaults to None.
+            fs (float, optional): sampling frequency of the data. If None, the attribute `fs` of the array
+                (or of the group) is used, or 1 if there is none. Defaults to None.
+            group (str, optional): path of the group containing the arrays. If None, the root group. Defaults to None.
+            dataset (str, optional): name of a 2-D array of shape (samples, channels) in `group`.
+                If None, the channels are the 1-D arrays of `group`. Defaults to None.
+            iterator (list,optional): list of iterators for importing the stores. if given, `files_list` will be ignored. Defaults to None.
+        '''
+        super().__init__(
+            files_list=files_list, win_len=win_len, step=step, channels=channels,
+            fs=fs, group=group, dataset=dataset, iterator=iterator
+        )
+
+    def _open(self, path):
+        return _open_zarr(self, path)
+
+    def _record_files(self, key):
+        return _zarr_files(self, key)
+
+
+
+def _open_zarr(importer, path):
+    try:
+        import zarr
+    except ImportError:
+        raise ImportError(f"zarr is required for {type(importer).__name__}")
+    return zarr.open_group(path, mode='r')
+
+
+def _close(root):
+    # the Zarr groups of the local stores have nothing to close
+    close = getattr(root, 'close', None)
+    if close is not None:
+        close()
+
+
+def _zarr_files(importer, path):
+    # metadata files of the arrays, which change when the arrays are resized
+    names = [importer.dataset] if importer.dataset is not None else importer._layout(path)['channels']
+    group = '' if importer.group is None else importer.group.strip('/')
+    files = []
+    for name in names:
+        for meta in ('zarr.json', '.zarray'):
+            file = os.path.join(path, group, name, meta)
+            if os.path.exists(file):
+                files.append(file)
+    return files
+
+
+def _record_name(path):
+    return os.path.splitext(os.path.basename(path.rstrip('/')))[0]
+
+
+def _attr(nodes, name):
+    # first attribute `name` of the given datasets or groups
+    for node in nodes:
+        if name in node.attrs:
+            return node.attrs[name]
+    return None
+
+
+def _names(names):
+    # channel names stored as an attribute, possibly as bytes
+    return [n.decode() if isinstance(n, bytes) else str(n) for n in names]
+
+
+def _layout(node, root, channels, dataset, fs):
+    if dataset is not None:
+        ds = node[dataset]
+        if len(ds.shape) != 2:
+            raise ValueError(f"the dataset {dataset} must be of shape (samples, channels), got {ds.shape}")
+        names = _attr([ds], 'channels')
+        names = _names(names) if names is not None else [str(i) for i in range(ds.shape[1])]
+        if channels is None:
+            channels = names
+        missing = [c for c in channels if c not in names]
+        if len(missing) > 0:
+            raise ValueError(f"the channels {missing} are not in the dataset {dataset}")
+        columns = [names.index(c) for c in channels]
+        datasets = [ds]
+    else:
+        if channels is None:
+            channels = [k for k in node.keys() if len(getattr(node[k], 'shape', ())) == 1]
+        datasets = [node[c] for c in channels]
+        columns = None
+        lengths = {ds.shape[0] for ds in datasets}
+        if len(lengths) > 1:
+            raise ValueError(f"the channels {channels} must have the same length, got {sorted(lengths)}")
+
+    length = datasets[0].shape[0] if len(datasets) > 0 else 0
+    chunks = [ds.chunks[0] for ds in datasets if ds.chunks is not None]
+    if fs is None:
+        fs = _attr(datasets + [node, root], 'fs')
+        fs = 1 if fs is None else float(fs)
+
+    return {
+        'channels': list(channels),
+        'dataset': dataset,
+        'columns': columns,
+        'length': int(length),
+        # contiguous datasets are read as a single chunk
+        'chunk': int(max(chunks)) if len(chunks) > 0 else max(int(length), 1),
+        'fs': fs,
+    }
+
+
+def _read_hyperslab(node, layout, sampfrom, sampto):
+    # read the samples [sampfrom, sampto) of the channels into the rows of a record
+    channels = layout['channels']
+    n = max(sampto - sampfrom, 0)
+    out = np.empty((len(channels), n), dtype=precision.get_dtype())
+
+    if n > 0 and layout['columns'] is not None:
+        ds = node[layout['dataset']]
+        columns = layout['columns']
+        cols = sorted(set(columns))
+        if cols == list(range(cols[0], cols[-1] + 1)):
+            block = ds[sampfrom:sampto, cols[0]:cols[-1] + 1]
+        elif hasattr(ds, 'oindex'):
+            block = ds.oindex[sampfrom:sampto, cols]
+        else:
+            block = ds[sampfrom:sampto, cols]
+        out[:] = block.T[[cols.index(c) for c in columns]]
+    elif n > 0:
+        for i, c in enumerate(channels):
+            ds = node[c]
+            if hasattr(ds, 'read_direct'):
+                # HDF5 converts the samples into the data type of the row
+                ds.read_direct(out[i], source_sel=np.s_[sampfrom:sampto])
+            else:
+                out[i] = ds[sampfrom:sampto]
+
+    rec = Record(out, channels, fs=layout['fs'])
+    rec._owner = True
+    return rec
@@ -1,24 +1,30 @@
 import os
+import io
+import itertools
+import threading
 from functools import partial
 from tqdm import tqdm
 import concurrent
 
 import numpy as np
 import pandas as pd
-import datetime
-from typing import Optional
 
-from ..utils.utils import get_bins
+from ..utils.utils import get_bins, _as_ns
+from ..utils import precision
+from ._cache import SignalCache
+from ..utils.record import Record
 
 class ReadCSV:
     def __init__(
-        self, files_list, channels = None, fs: int = 1, **kwargs
+        self, files_list, channels = None, fs: int = 1, cache_dir = None, **kwargs
     ):
         '''
         Read multiple files in `csv` formats.
 
         The module imports signals (time-series) database in `csv` format, 
         where each CSV files columns represent the signals and rows the time instances.
+        The files may be compressed (`.csv.gz`, `.csv.bz2`, `.csv.xz` or `.csv.zst`),
+        in which case they are decompressed while they are parsed.
 
         Args:
             files_list ({str} or {list}): list of CSV files' paths or the path
@@ -26,10 +32,13 @@ class ReadCSV:
             channels (list, optional): list of the column names (signals) to import. 
                 If None, all the columns are imported. Defaults to None.
             fs (int, optional): Sampling frequency of the data. Defaults to 1.
+            cache_dir (str, optional): directory of a signal cache. If given, each file is converted once
+                into memory-mapped `.npy` files, which are read instead of the CSV file until it changes. Defaults to None.
         '''    
         self.channels = channels
         self.kwargs = kwargs
         self.fs = fs
+        self._cache = SignalCache(cache_dir) if cache_dir is not None else None
 
         # generate the iterators using the given files_list
         self.iterators = self._generate_iterators(files_list=files_list)
@@ -43,7 +52,7 @@ class ReadCSV:
             ```None``` means using all processors. Defaults to None.
 
         Returns:
-            dict: imported data as a dictionary, where the keys are the record names.
+            dict: imported data as a dictionary, where the keys are the record names and the values their `Record`.
         '''        
         iterators = self.iterators
         if n_jobs == 1:
@@ -57,13 +66,26 @@ class ReadCSV:
 
 
     def _get_data(self, iterator):
-        res = pd.read_csv(iterator, usecols=self.channels, **self.kwargs)
-        res = res.to_dict("list")
+        if self._cache is not None:
+            channels = _csv_channels(iterator, self.channels, self.kwargs)
+            rec = _cached_csv(self._cache, iterator, channels=channels, fs=self.fs, kwargs=self.kwargs)
+            res = rec.window(channels, slice(None), fs=self.fs, dtype=precision.get_dtype())
+        else:
+            res = pd.read_csv(iterator, usecols=self.channels, **self.kwargs)
+            res = Record.from_frame(res, fs=self.fs, dtype=precision.get_dtype())
 
-        record_name = os.path.basename(iterator)[:-4]
+        record_name = _record_name(iterator)
         res = {record_name: res, "fs": self.fs}
         return res
 
+    def _iterator_size(self, iterator):
+        # size of the file, used for scheduling the longest records first
+        return os.path.getsize(iterator)
+
+    def _record_files(self, iterator):
+        # files of a record, whose changes are tracked in incremental runs
+        return [iterator]
+
     def _generate_iterators(self, files_list):
         # create the iterator list of csv files
         
@@ -76,7 +98,7 @@ class ReadCSV:
                 res = [
                     os.path.join(files_list, f)
                     for f in os.listdir(files_list)
-                    if f.endswith("csv")
+                    if _is_csv(f)
                 ]
             else:
                 raise TypeError(
@@ -96,6 +118,9 @@ class RollingWindowCSV:
         time_index_col= None,
         datetime_format= None,
         iterator = None,
+        chunk_size = 100000,
+        cache_index = False,
+        cache_dir = None,
         **kwargs
     ):
         '''
@@ -105,6 +130,15 @@ class RollingWindowCSV:
         segments them in a rolling window manner.
         where each CSV files columns represent the signals and rows the time instances.
 
+        Compressed files (`.csv.gz`, `.csv.bz2`, `.csv.xz` or `.csv.zst`) are decompressed as a stream:
+        their rows are counted in one decompression pass, and the windows are read from a decompression
+        stream kept open in each process, which only moves forward over the windows read in order
+        instead of decompressing the file again from its start for every window. The least recently used
+        idle streams are closed so that at most 8 stay open, and `close` closes the remaining ones.
+        The byte offsets of every `chunk_size`-th row of the uncompressed files are found while counting their rows
+        (or on the first window read in a process, with a `time_index_col`), so each window is parsed from
+        the closest offset before it instead of scanning the file from its start.
+
         Args:
             files_list ({str} or {list}): list of CSV files' paths or the path
                 to the directory containg the CSV files.
@@ -117,6 +151,16 @@ class RollingWindowCSV:
             time_index_col (str,optional): name of date_time column in the raw CSV files. Defaults to None.
             datetime_format (str,optional): format of the date_time if time_index_col is given. Defaults to None.
             iterator (list,optional): list of iterators for importing the CSV files. if given, `files_list` will be ignored. Defaults to None.
+            chunk_size (int, optional): number of rows parsed at once when reading the windows of a file,
+                and number of rows between the byte offsets kept for the uncompressed files. Defaults to 100000.
+            cache_index (bool, optional): if True and `time_index_col` is given, the date-times of each file (int64 nanoseconds)
+                are kept in memory after generating the windows, and used for the time stamps of the windows
+                instead of parsing the date-times again. The index of every file is kept for the life of the importer
+                and is not sent to the worker processes, which parse the date-times of their windows. Defaults to False.
+            cache_dir (str, optional): directory of a signal cache. If given, each file is converted once
+                into memory-mapped `.npy` files (including the date-times), from which the windows are sliced
+                without parsing the CSV file again until it changes. In double precision, the windows are views
+                of the memory-mapped file, and copies otherwise (see `CachedRecord.window`). Defaults to None.
         '''    
         self.channels = channels
         self.kwargs = kwargs
@@ -129,6 +173,16 @@ class RollingWindowCSV:
         self.iswin = True
         self.time_index_col = time_index_col
         self.datetime_format = datetime_format
+        self.chunk_size = chunk_size
+        self.cache_index = cache_index
+        self._headers = {}
+        self._time_index = {}
+        self._offsets = {}
+        self._tz = None
+        self._cache = SignalCache(cache_dir) if cache_dir is not None else None
+        self._streams = []
+        self._streams_lock = None
+        self._pid = None
 
         if iterator is None:
             self.iterators = self._generate_iterators(files_list=files_list)
@@ -136,42 +190,259 @@ class RollingWindowCSV:
             self.iterators = iterator
 
     def _get_data(self, iterator):
-        # file path
-        path = iterator[0]
+        return next(self._iter_data_batch(iterators=[iterator]))
+
+    def _get_data_batch(self, iterators):
+        return list(self._iter_data_batch(iterators=iterators))
+
+    def _iter_data_batch(self, iterators):
+        # parse the rows of the given windows of a record once, in chunks of `chunk_size` rows,
+        # and slice the windows from the parsed rows. Only the rows of the windows which are not
+        # yielded yet are kept, so the memory usage is bounded by the chunk and window sizes.
+        if self._cache is not None:
+            yield from self._iter_cached(iterators=iterators)
+            return
+
+        path = iterators[0][0]
+        spans = [(itr[1][0], itr[1][-1]+1) if len(itr[1]) > 0 else None for itr in iterators]
+        starts = [span[0] for span in spans if span is not None]
+
+        if len(starts) == 0:
+            for itr in iterators:
+                yield self._window_data(iterator=itr, res=None)
+            return
+
+        # first row needed after each window
+        keep_from = []
+        next_start = None
+        for span in reversed(spans):
+            keep_from.append(next_start)
+            if span is not None:
+                next_start = span[0] if next_start is None else min(next_start, span[0])
+        keep_from.reverse()
+
+        row_l = min(starts)
+        row_h = max(span[1] for span in spans if span is not None)
+
+        with self._rows(path, row_l, row_h) as reader:
+            buffer = None
+            buffer_start = row_l
+            needed = row_l
+            for itr, span, keep in zip(iterators, spans, keep_from):
+                if span is None:
+                    yield self._window_data(iterator=itr, res=None)
+                    continue
+
+                # read the chunks until the window is in the buffer,
+                # dropping the rows which are not needed by the remaining windows
+                while buffer is None or buffer_start + len(buffer) < span[1]:
+                    chunk = next(reader, None)
+                    if chunk is None:
+                        # fewer rows than counted (e.g. rows dropped by the parser): the windows are cut short
+                        break
+                    if buffer is None:
+                        buffer = chunk
+                    else:
+                        buffer = pd.concat([buffer.iloc[needed-buffer_start:], chunk], ignore_index=True)
+                        buffer_start = needed
+
+                win = np.asarray(itr[1]) - buffer_start
+                win = win[win < (0 if buffer is None else len(buffer))]
+                if len(win) == 0:
+                    yield self._window_data(iterator=itr, res=None)
+                else:
+                    yield self._window_data(iterator=itr, res=buffer.iloc[win].reset_index(drop=True))
+
+                if keep is not None:
+                    needed = max(needed, keep)
+
+    def _iter_cached(self, iterators):
+        # slice the windows from the memory-mapped channels of the signal cache
+        path = iterators[0][0]
+        channels = self._channels(path)
+        rec = self._cached(path)
+        for itr in iterators:
+            if len(itr[1]) == 0:
+                yield self._window_data(iterator=itr, res=None)
+                continue
+
+            win = _window_index(itr[1])
+            time_stamps = None
+            if self.time_index_col:
+                t = rec.time[win]
+                time_stamps = (t - t[0])/1e9
+            res = rec.window(channels, win, fs=self.fs, time_stamps=time_stamps, dtype=precision.get_dtype())
+            yield self._window_dict(iterator=itr, res=res, time_stamps=time_stamps)
+
+    def _rows(self, path, row_l, row_h):
+        # reader of the rows [row_l, row_h) of a file in chunks of `chunk_size` rows
+        if _compression(path) is not None:
+            stream = self._checkout(path, row_l)
+            return stream.rows(row_l, row_h, release=partial(self._release, path, stream))
+        # the rows are parsed from the closest known offset before `row_l`. The rows before `row_l` are dropped
+        # after parsing them (instead of skipping lines), since the blank lines are not counted as rows
+        offsets = self._row_offsets(path)
+        k = min(row_l//self.chunk_size, len(offsets) - 1)
+        f = open(path, 'rb')
+        f.seek(offsets[k])
+        reader = pd.read_csv(
+            f,
+            header=None,
+            names=self._header(path),
+            nrows=row_h - k*self.chunk_size,
+            usecols=self._usecols(path),
+            chunksize=self.chunk_size,
+            **self.kwargs
+        )
+
+        def release():
+            reader.close()
+            f.close()
+
+        return _Chunks(_skip_rows(reader, row_l - k*self.chunk_size), release=release)
+
+    def _row_offsets(self, path):
+        # byte offset of every `chunk_size`-th row of an uncompressed file, found once per file in each process
+        # if they were not found while counting the rows of the file
+        if path not in self._offsets:
+            self._offsets[path], _ = _line_offsets(path, self.chunk_size)
+        return self._offsets[path]
+
+    def _count_rows(self, path):
+        # number of rows of a file, keeping the offsets of the uncompressed files
+        if _compression(path) is not None:
+            return _count_rows(path)
+        self._offsets[path], n_rows = _line_offsets(path, self.chunk_size)
+        return n_rows
+
+    def _checkout(self, path, row):
+        # an idle decompression stream of a file, preferably the closest one before `row`, so that the next windows
+        # of a file continue from the last row read. The idle streams are kept open in each process, and each of them
+        # is used by one reader at a time, so the threads of a process (e.g. of the prefetching) never share one.
+        # They are not shared with the forked processes
+        if self._pid != os.getpid():
+            self._streams = []
+            self._streams_lock = threading.Lock()
+            self._pid = os.getpid()
+        with self._streams_lock:
+            idle = [stream for stream in self._streams if stream.path == path]
+            if len(idle) > 0:
+                before = [stream for stream in idle if stream.row is not None and stream.row <= row]
+                stream = max(before, key=lambda stream: stream.row) if len(before) > 0 else idle[0]
+                self._streams.remove(stream)
+                return stream
+        return _CompressedCSV(
+            path, names=self._header(path), usecols=self._usecols(path), chunk_size=self.chunk_size, kwargs=self.kwargs
+        )
+
+    def _release(self, path, stream):
+        # the stream is idle again once its reader is closed. At most `_MAX_STREAMS` idle streams are kept,
+        # the least recently used ones are closed, so reading many files does not exhaust the file descriptors
+        with self._streams_lock:
+            self._streams.append(stream)
+            evicted = self._streams[:-_MAX_STREAMS]
+            del self._streams[:-_MAX_STREAMS]
+        for stream in evicted:
+            stream.close()
+
+    def close(self):
+        '''
+        close the decompression streams kept open by the importer in this process.
+        '''
+        if self._streams_lock is None:
+            return
+        with self._streams_lock:
+            streams, self._streams = self._streams, []
+        for stream in streams:
+            stream.close()
+
+    def __del__(self):
+        if getattr(self, '_pid', None) == os.getpid():
+            self.close()
+
+    def __getstate__(self):
+        # the open streams and the date-times of the files are not sent to the worker processes
+        state = self.__dict__.copy()
+        state['_time_index'] = {}
+        state['_streams'] = []
+        state['_streams_lock'] = None
+        state['_pid'] = None
+        return state
+
+    def _cached(self, path):
+        return _cached_csv(
+            self._cache,
+            path,
+            channels=self._channels(path),
+            fs=self.fs,
+            kwargs=self.kwargs,
+            time_index_col=self.time_index_col,
+            datetime_format=self.datetime_format,
+            chunk_size=self.chunk_size,
+        )
+
+    def _channels(self, path):
+        if self.channels is not None:
+            return list(self.channels)
+        return [c for c in self._header(path) if c != self.time_index_col]
+
+    def _header(self, path):
+        # column names of a file, for reading its rows without the header line
+        if path not in self._headers:
+            self._headers[path] = list(pd.read_csv(path, nrows=0, **self.kwargs).columns)
+        return self._headers[path]
+
+    def _group_key(self, iterator):
+        return iterator[0]
+
+    def _iterator_size(self, iterator):
+        return len(iterator[1])
+
+    def _record_files(self, key):
+        return [key]
+
+    def _window_start(self, iterator):
+        # first sample or date-time of the window, used as the watermark of incremental runs
+        return iterator[3]
+
+    def _window_complete(self, iterator):
+        # with a time index, a window containing the last row may still grow
+        if self.time_index_col:
+            return len(iterator[1]) == 0 or iterator[1][-1] < iterator[2] - 1
+        return True
+
+    def _usecols(self, path = None):
+        # the date-times of the files with a cached time index are not read again
+        if self.time_index_col and path not in self._time_index:
+            usecols = self.channels.copy()
+            usecols.append(self.time_index_col)
+        else:
+            usecols = self.channels
+        return usecols
 
+    def _window_data(self, iterator, res):
         # pre-define the timestamps
         time_stamps = None
 
-        # iterator[1] is the win indices
-        if iterator[1].size > 0:
-
-            # find the roes to be skipped in loading the csv file
-            bin_win = np.array(iterator[1])+1
-            bin_win = set(bin_win)
-            len_data = set(range(1, iterator[2]+1))
-            skip_rows = len_data.difference(bin_win)
-
-
-            if self.time_index_col:
-                usecols = self.channels.copy()
-                usecols.append(self.time_index_col)
-                res = pd.read_csv(path, skiprows=skip_rows, usecols=usecols, **self.kwargs)
+        if res is not None:
+            if self.time_index_col and iterator[0] in self._time_index:
+                # time stamps in seconds from the cached time index
+                t = self._time_index[iterator[0]][np.asarray(iterator[1])[:len(res)]]
+                time_stamps = (t - t[0])/1e9
+            elif self.time_index_col:
                 time_idx = pd.to_datetime(res[self.time_index_col], format=self.datetime_format)
 
                 time_idx = time_idx -time_idx.iloc[0]
-                time_stamps = np.array([i.total_seconds() for i in time_idx])
-                res.drop(columns=[self.time_index_col], inplace=True)
-                
-            else:
-                res = pd.read_csv(path, skiprows=skip_rows, usecols=self.channels, **self.kwargs)
-
+                time_stamps = time_idx.dt.total_seconds().values
+                res = res.drop(columns=[self.time_index_col])
         else:
             temp = np.repeat(np.nan,len(self.channels))
             res = pd.DataFrame(temp.reshape(-1,len(temp)),columns=self.channels)
-        res = res.astype('float')
-        res = res.to_dict("list")
+        res = Record.from_frame(res, fs=self.fs, time_stamps=time_stamps, dtype=precision.get_dtype())
+        return self._window_dict(iterator=iterator, res=res, time_stamps=time_stamps)
 
-        record_name = os.path.basename(path)[:-4]
+    def _window_dict(self, iterator, res, time_stamps):
+        record_name = _record_name(iterator[0])
         res = {
             record_name: res,
             "fs": self.fs,
@@ -190,7 +461,7 @@ class RollingWindowCSV:
             ```None``` means using all processors. Defaults to None.
 
         Returns:
-            dict: imported data as a dictionary, where the keys are the record names.
+            dict: imported data as a dictionary, where the keys are the record names and the values their `Record`.
         '''        
         iterators = self.iterators
         if n_jobs == 1:
@@ -210,7 +481,7 @@ class RollingWindowCSV:
                 itr = [
                     os.path.join(files_list, f)
                     for f in os.listdir(files_list)
-                    if f.endswith("csv")
+                    if _is_csv(f)
                 ]
             else:
                 raise TypeError(
@@ -219,19 +490,22 @@ class RollingWindowCSV:
 
         iterators = []
         for file in itr:
-            if self.time_index_col:
-                time_idx = pd.read_csv(file,usecols=[self.time_index_col], **self.kwargs)
-                time_idx = pd.to_datetime(time_idx[self.time_index_col], format=self.datetime_format)
-                n_lines = len(time_idx)
-                t_l = time_idx.iloc[0]
-                bins = []
-                while t_l < time_idx.iloc[-1]:
-                    t_h = t_l +datetime.timedelta(seconds=self.win_len)
-                    win = np.array(time_idx[(time_idx>=t_l) & (time_idx<t_h)].index)
-                    bins.append((t_l,t_h,win))
-                    t_l = t_l +datetime.timedelta(seconds=self.step)
+            if self._cache is not None:
+                rec = self._cached(file)
+                if self.time_index_col:
+                    t = rec.time
+                    self._tz = self._time_zone(file)
+                    n_lines = len(t)
+                    bins = self._time_bins(t)
+                else:
+                    n_lines = rec.length
+                    bins = get_bins(n=n_lines, win_len=self.win_len, step=self.step, fs=self.fs)
+            elif self.time_index_col:
+                t = self._build_time_index(file)
+                n_lines = len(t)
+                bins = self._time_bins(t)
             else:
-                n_lines = sum(1 for line in open(file)) - 1
+                n_lines = self._count_rows(file)
                 bins = get_bins(n=n_lines, win_len=self.win_len, step=self.step, fs=self.fs)
             
             for t_l,t_h,win in bins:
@@ -239,9 +513,286 @@ class RollingWindowCSV:
 
         return iterators
 
-
-
-
-
-
-
+    def _build_time_index(self, file):
+        # parse the date-times of a file once, as int64 nanoseconds since the epoch.
+        # The index is cached and reused for the time stamps of the windows at load time
+        time_idx = pd.read_csv(file, usecols=[self.time_index_col], **self.kwargs)
+        time_idx = pd.DatetimeIndex(pd.to_datetime(time_idx[self.time_index_col], format=self.datetime_format))
+        self._tz = time_idx.tz
+        t = _as_ns(time_idx)
+        if self.cache_index:
+            self._time_index[file] = t
+        return t
+
+    def _time_zone(self, file):
+        # time zone of the date-times of a file, from its first row
+        t = pd.read_csv(file, usecols=[self.time_index_col], nrows=1, **self.kwargs)
+        return pd.DatetimeIndex(pd.to_datetime(t[self.time_index_col], format=self.datetime_format)).tz
+
+    def _time_bins(self, t):
+        # windows of [t_l, t_h) starting at the first date-time every `step` seconds,
+        # with the rows of each window found by binary search in the sorted date-times
+        if len(t) == 0:
+            return []
+        win_len = int(round(self.win_len*1e9))
+        step = int(round(self.step*1e9))
+        n_bins = max(-(-(int(t[-1]) - int(t[0]))//step), 0)
+        t_l = int(t[0]) + np.arange(n_bins, dtype='int64')*step
+        t_h = t_l + win_len
+
+        # the rows of unsorted files are sorted first
+        order = None
+        if np.any(t[1:] < t[:-1]):
+            order = np.argsort(t, kind='stable')
+            t = t[order]
+
+        lo = np.searchsorted(t, t_l, side='left')
+        hi = np.searchsorted(t, t_h, side='left')
+
+        t_l = pd.DatetimeIndex(t_l.astype('datetime64[ns]'))
+        t_h = pd.DatetimeIndex(t_h.astype('datetime64[ns]'))
+        if self._tz is not None:
+            t_l = t_l.tz_localize('UTC').tz_convert(self._tz)
+            t_h = t_h.tz_localize('UTC').tz_convert(self._tz)
+
+        bins = []
+        for l, h, i, j in zip(t_l, t_h, lo, hi):
+            win = range(i, j) if order is None else np.sort(order[i:j])
+            bins.append((l, h, win))
+        return bins
+
+
+def _window_index(win):
+    # consecutive rows are sliced as a view, the rows of unsorted files are gathered
+    if isinstance(win, range) and win.step == 1:
+        return slice(win.start, win.stop)
+    return np.asarray(win)
+
+
+def _csv_channels(path, channels, kwargs, time_index_col = None):
+    # channels of a file, all the columns but the date-times if not given
+    if channels is not None:
+        return list(channels)
+    columns = pd.read_csv(path, nrows=0, **kwargs).columns
+    return [c for c in columns if c != time_index_col]
+
+
+def _cached_csv(cache, path, channels, fs, kwargs, time_index_col = None, datetime_format = None, chunk_size = 100000):
+    # get a file from the signal cache, parsing only its channels which are not cached yet
+    def reader(missing, time):
+        usecols = missing + ([time_index_col] if time else [])
+        with pd.read_csv(path, usecols=usecols, chunksize=chunk_size, **kwargs) as chunks:
+            for chunk in chunks:
+                res = {c: chunk[c].to_numpy(dtype='float64') for c in missing}
+                if time:
+                    t = pd.DatetimeIndex(pd.to_datetime(chunk[time_index_col], format=datetime_format))
+                    res['__time__'] = _as_ns(t)
+                yield res
+
+    return cache.get(
+        source=os.path.abspath(path),
+        files=[path],
+        channels=channels,
+        reader=reader,
+        fs=fs,
+        name=_record_name(path),
+        time=time_index_col is not None,
+    )
+
+
+# compression of the files from their extension, as named by pandas
+# number of idle decompression streams kept open in each process
+_MAX_STREAMS = 8
+
+_COMPRESSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zst': 'zstd'}
+
+
+def _compression(path):
+    return _COMPRESSIONS.get(os.path.splitext(path)[1])
+
+
+def _is_csv(name):
+    # csv files, compressed or not
+    if _compression(name) is not None:
+        name = os.path.splitext(name)[0]
+    return name.endswith("csv")
+
+
+def _record_name(path):
+    name = os.path.basename(path)
+    if _compression(name) is not None:
+        name = os.path.splitext(name)[0]
+    return name[:-4]
+
+
+def _open_csv(path):
+    # binary stream of the decompressed content of a file
+    compression = _compression(path)
+    if compression == 'gzip':
+        import gzip
+        return gzip.open(path, 'rb')
+    if compression == 'bz2':
+        import bz2
+        return bz2.open(path, 'rb')
+    if compression == 'xz':
+        import lzma
+        return lzma.open(path, 'rb')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(f"zstandard is required for reading {path}")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+    return open(path, 'rb')
+
+
+def _count_rows(path, block_size = 1 << 20):
+    # number of rows of a file (without the header line), counted while decompressing it once
+    with _open_csv(path) as f:
+        return _scan_rows(f, stride=None, block_size=block_size)[1]
+
+
+def _line_offsets(path, stride, block_size = 1 << 20):
+    # byte offsets of the rows 0, `stride`, 2*`stride`, ... of an uncompressed file (without the header line),
+    # and its number of rows, in one pass over the file
+    with open(path, 'rb') as f:
+        return _scan_rows(f, stride=stride, block_size=block_size)
+
+
+def _scan_rows(f, stride = None, block_size = 1 << 20):
+    # rows of a binary stream as counted by the parser, which skips the blank lines: the offsets just after
+    # the line break of the header and of the rows `stride`-1, 2*`stride`-1, ... (the parsing from an offset
+    # starts at the next row), and the number of rows
+    offsets = []
+    n = 0
+    pos = 0
+    # length and first byte of the line continuing in the next block
+    line_len = 0
+    line_first = None
+    for block in iter(partial(f.read, block_size), b''):
+        data = np.frombuffer(block, dtype=np.uint8)
+        breaks = np.flatnonzero(data == ord('\n'))
+        if len(breaks) > 0:
+            starts = np.concatenate([[0], breaks[:-1] + 1])
+            lengths = breaks - starts
+            first = data[np.minimum(starts, len(data) - 1)]
+            lengths[0] += line_len
+            if line_len > 0:
+                first[0] = line_first
+            # the blank lines are empty or contain a carriage return only
+            rows = breaks[(lengths > 1) | ((lengths == 1) & (first != ord('\r')))]
+            if stride is not None:
+                offsets.extend((pos + rows[-n % stride::stride] + 1).tolist())
+            n += len(rows)
+            line_len = len(data) - breaks[-1] - 1
+            line_first = data[breaks[-1] + 1] if line_len > 0 else None
+        else:
+            if line_len == 0:
+                line_first = data[0]
+            line_len += len(data)
+        pos += len(block)
+    # the last line may not end with a line break
+    if line_len > 1 or (line_len == 1 and line_first != ord('\r')):
+        n += 1
+    return np.asarray(offsets, dtype='int64'), max(n - 1, 0)
+
+
+class _CompressedCSV:
+    # forward-only reader of the rows of a compressed file. The stream stays after the last row read,
+    # so reading the windows of a file in order decompresses it only once. It is opened again
+    # from the start only if an earlier row is requested. It is not thread-safe, see `RollingWindowCSV._checkout`
+
+    def __init__(self, path, names, usecols, chunk_size, kwargs):
+        self.path = path
+        self.names = names
+        self.usecols = usecols
+        self.chunk_size = chunk_size
+        self.kwargs = kwargs
+        self._f = None
+        self._row = None
+
+    def _seek(self, row):
+        if self._f is None or row < self._row:
+            self.close()
+            self._f = _open_csv(self.path)
+            # skip the header line
+            self._f.readline()
+            self._row = 0
+        # skip the rows before `row` without parsing them (the blank lines are not rows, as for the parser)
+        while self._row < row:
+            k = min(row - self._row, self.chunk_size)
+            lines = list(itertools.islice(self._f, k))
+            self._row += _n_rows(lines)
+            if len(lines) < k:
+                break
+
+    def _chunks(self, row_l, row_h):
+        self._seek(row_l)
+        while self._row < row_h:
+            lines = list(itertools.islice(self._f, min(self.chunk_size, row_h - self._row)))
+            if len(lines) == 0:
+                return
+            self._row += _n_rows(lines)
+            yield pd.read_csv(
+                io.BytesIO(b''.join(lines)),
+                header=None,
+                names=self.names,
+                usecols=self.usecols,
+                **self.kwargs
+            )
+
+    @property
+    def row(self):
+        # next row of the stream, None if it is not open
+        return self._row if self._f is not None else None
+
+    def rows(self, row_l, row_h, release = None):
+        # the rows [row_l, row_h) in chunks of `chunk_size` rows, as the chunked reader of pandas.
+        # `release` is called when the reader is closed
+        return _Chunks(self._chunks(row_l, row_h), release=release)
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def __del__(self):
+        self.close()
+
+
+def _n_rows(lines):
+    # number of lines which are not blank
+    return sum(1 for line in lines if line.strip(b'\r\n'))
+
+
+def _skip_rows(chunks, n):
+    # the chunks without their first `n` rows
+    for chunk in chunks:
+        if n >= len(chunk):
+            n -= len(chunk)
+            continue
+        yield chunk.iloc[n:].reset_index(drop=True) if n > 0 else chunk
+        n = 0
+
+
+class _Chunks:
+    # iterator of chunks which is also a context manager, as the chunked reader of pandas
+
+    def __init__(self, chunks, release = None):
+        self._chunks = chunks
+        self._release = release
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._chunks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._chunks.close()
+        if self._release is not None:
+            self._release()
+            self._release = None
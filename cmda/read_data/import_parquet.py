@@ -0,0 +1,400 @@
+import os
+import concurrent
+from contextlib import contextmanager
+from tqdm import tqdm
+
+import numpy as np
+import pandas as pd
+
+from ..utils.utils import get_bins, _to_ns
+from ..utils import precision
+from ..utils.record import Record
+
+
+
+class _ParquetFiles:
+    # opening the files and reading their metadata, shared by the Parquet importers
+
+    def _list_files(self, files_list):
+        if isinstance(files_list, list):
+            res = files_list
+        elif isinstance(files_list, str) and os.path.isdir(files_list):
+            res = [
+                os.path.join(files_list, f)
+                for f in sorted(os.listdir(files_list))
+                if f.endswith(".parquet")
+            ]
+        else:
+            raise TypeError(
+                "files_list must be either a list of 'parquet' files or a directory path of 'parquet' files"
+            )
+        return res
+
+    def _pq(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError(f"pyarrow is required for {type(self).__name__}")
+        return pq
+
+    def _metadata(self, path):
+        # the footer of each file is parsed once in each process. Only the parsed footer is kept,
+        # not the open file, so the number of files is not limited by the file descriptors
+        if self._pid != os.getpid():
+            self._footers = {}
+            self._pid = os.getpid()
+        if path not in self._footers:
+            with self._pq().ParquetFile(path) as pf:
+                self._footers[path] = pf.metadata
+        return self._footers[path]
+
+    @contextmanager
+    def _file(self, path):
+        # the file is opened with its parsed footer for one read, and closed after it
+        with self._pq().ParquetFile(path, metadata=self._metadata(path)) as pf:
+            yield pf
+
+    def _channels(self, path):
+        if self.channels is not None:
+            return list(self.channels)
+        time_index_col = getattr(self, 'time_index_col', None)
+        schema = self._metadata(path).schema.to_arrow_schema()
+        # the index columns written by pandas are not channels
+        index = schema.pandas_metadata or {}
+        index = [c for c in index.get('index_columns', []) if isinstance(c, str)]
+        return [c for c in schema.names if c != time_index_col and c not in index]
+
+    def _read_rows(self, path, row_groups, columns):
+        # read only the given row groups and columns of a file
+        with self._file(path) as pf:
+            table = pf.read_row_groups(list(row_groups), columns=columns)
+        return {c: table.column(c).to_numpy() for c in columns}
+
+    def __getstate__(self):
+        # the footers are parsed again in the worker processes
+        state = self.__dict__.copy()
+        state['_footers'] = {}
+        state['_pid'] = None
+        return state
+
+
+
+class ReadParquet(_ParquetFiles):
+
+    def __init__(self, files_list, channels = None, fs = 1):
+        '''
+        Read multiple files in `parquet` format (requires `pyarrow`).
+
+        The columns of the files represent the signals and the rows the time instances.
+        Only the columns of the given `channels` are read from the files.
+
+        Args:
+            files_list ({str} or {list}): list of parquet files' paths or the path
+                to the directory containg the parquet files.
+            channels (list, optional): list of the column names (signals) to import.
+                If None, all the columns are imported. Defaults to None.
+            fs (int, optional): Sampling frequency of the data. Defaults to 1.
+        '''
+        self.channels = channels
+        self.fs = fs
+        self._footers = {}
+        self._pid = None
+
+        # generate the iterators using the given files_list
+        self.iterators = self._generate_iterators(files_list=files_list)
+
+    def load(self,n_jobs=None):
+        '''
+        load the data.
+
+        Args:
+            n_jobs (int, optional): The number of OpenMP processes to use for reading the data.
+            ```None``` means using all processors. Defaults to None.
+
+        Returns:
+            dict: imported data as a dictionary, where the keys are the record names and the values their `Record`.
+        '''
+        iterators = self.iterators
+        if n_jobs == 1:
+            iterator_progress = tqdm(iterators)
+            res = map(self._get_data, iterator_progress)
+        else:
+            executer = concurrent.futures.ProcessPoolExecutor(max_workers= n_jobs)
+            res = tqdm(executer.map(self._get_data, iterators), total=len(iterators))
+
+        return list(res)
+
+    def _get_data(self, iterator):
+        channels = self._channels(iterator)
+        row_groups = range(self._metadata(iterator).num_row_groups)
+        res = self._read_rows(iterator, row_groups, channels)
+        res = Record.from_columns(res, fs=self.fs, dtype=precision.get_dtype())
+        return {_record_name(iterator): res, "fs": self.fs}
+
+    def _iterator_size(self, iterator):
+        return os.path.getsize(iterator)
+
+    def _record_files(self, iterator):
+        # files of a record, whose changes are tracked in incremental runs
+        return [iterator]
+
+    def _generate_iterators(self, files_list):
+        return self._list_files(files_list)
+
+
+
+class RollingWindowParquet(_ParquetFiles):
+
+    def __init__(
+        self,
+        files_list = None,
+        win_len = None,
+        step = None,
+        channels = None,
+        fs = 1,
+        time_index_col = None,
+        datetime_format = None,
+        iterator = None,
+    ):
+        '''
+        Read multiple files in `parquet` format with segmentation (requires `pyarrow`).
+
+        The windows are planned from the metadata of the files only: the number of rows of the row groups, or,
+        with a `time_index_col`, the minimum and maximum date-time of each row group (the statistics written
+        in the files, or the parsed date-times of the columns of strings). Each window then reads only the row groups which overlap it, and only the columns
+        of the `channels` (and the date-times), so the amount of data read does not depend on the size of the files.
+
+        Args:
+            files_list ({str} or {list}): list of parquet files' paths or the path
+                to the directory containg the parquet files.
+            win_len (float): length of rolling window in seconds.
+            step (float, optional): length of rolling window steps in seconds.
+                If None, the step length is equalt to the window length. Defaults to None.
+            channels (list, optional): list of the column names (signals) to import.
+                If None, all the columns are imported. Defaults to None.
+            fs (int, optional): sampling frequency of the data. Defaults to 1.
+            time_index_col (str,optional): name of the date-time column. If given, the windows are
+                `win_len` seconds of date-times instead of `win_len*fs` rows. Defaults to None.
+            datetime_format (str,optional): format of the date-times if they are stored as strings. Defaults to None.
+            iterator (list,optional): list of iterators for importing the files. if given, `files_list` will be ignored. Defaults to None.
+        '''
+        self.channels = channels
+        self.win_len = win_len
+        if step:
+            self.step = step
+        else:
+            self.step = win_len
+        self.fs = fs
+        self.iswin = True
+        self.time_index_col = time_index_col
+        self.datetime_format = datetime_format
+        self._offsets = {}
+        self._footers = {}
+        self._pid = None
+
+        if iterator is None:
+            self.iterators = self._generate_iterators(files_list=files_list)
+        else:
+            self.iterators = iterator
+
+    def load(self,n_jobs=None):
+        '''
+        load the data
+
+        Args:
+            n_jobs (int, optional): The number of OpenMP processes to use for reading the data.
+            ```None``` means using all processors. Defaults to None.
+
+        Returns:
+            dict: imported data as a dictionary, where the keys are the record names and the values their `Record`.
+        '''
+        iterators = self.iterators
+        if n_jobs == 1:
+            iterator_progress = tqdm(iterators)
+            res = map(self._get_data, iterator_progress)
+        else:
+            executer = concurrent.futures.ProcessPoolExecutor(max_workers= n_jobs)
+            res = tqdm(executer.map(self._get_data, iterators), total=len(iterators))
+
+        return list(res)
+
+    def _get_data(self, iterator):
+        return self._get_data_batch([iterator])[0]
+
+    def _get_data_batch(self, iterators):
+        # read the row groups of the given windows of a record once, and select the rows of each window
+        path = iterators[0][0]
+        channels = self._channels(path)
+        row_groups = sorted(set(rg for itr in iterators for rg in itr[1]))
+        if len(row_groups) == 0:
+            return [self._window_data(iterator=itr, res=None) for itr in iterators]
+
+        columns = channels + ([self.time_index_col] if self.time_index_col else [])
+        data = self._read_rows(path, row_groups, columns)
+        rec = Record.from_columns({c: data[c] for c in channels}, fs=self.fs, dtype=precision.get_dtype())
+
+        if self.time_index_col:
+            t = _to_ns(data[self.time_index_col], self.datetime_format)
+            ordered = len(t) < 2 or bool(np.all(t[1:] >= t[:-1]))
+        else:
+            # first row of each row group in the read rows
+            first = dict(zip(row_groups, np.cumsum([0] + [self._group_rows(path, rg) for rg in row_groups[:-1]])))
+            offsets = self._row_offsets(path)
+
+        res = []
+        for itr in iterators:
+            if len(itr[1]) == 0:
+                res.append(self._window_data(iterator=itr, res=None))
+                continue
+
+            time_stamps = None
+            if self.time_index_col:
+                t_l, t_h = itr[3].value, itr[4].value
+                if ordered:
+                    idx = slice(*np.searchsorted(t, [t_l, t_h], side='left'))
+                else:
+                    idx = np.flatnonzero((t >= t_l) & (t < t_h))
+                t_win = t[idx]
+                if len(t_win) == 0:
+                    res.append(self._window_data(iterator=itr, res=None))
+                    continue
+                time_stamps = (t_win - t_win[0])/1e9
+            else:
+                start = first[itr[1][0]] + itr[3] - offsets[itr[1][0]]
+                idx = slice(start, start + itr[4] - itr[3])
+
+            res.append(self._window_data(iterator=itr, res=rec.take(idx, time_stamps=time_stamps)))
+        return res
+
+    def _window_data(self, iterator, res):
+        if res is None:
+            # the windows without rows are returned as one row of NaN, as in `RollingWindowCSV`
+            channels = self._channels(iterator[0])
+            res = Record(np.full((len(channels), 1), np.nan, dtype=precision.get_dtype()), channels, fs=self.fs)
+        record_name = _record_name(iterator[0])
+        return {
+            record_name: res,
+            "fs": self.fs,
+            "win_len": self.win_len,
+            "time_stamps": res.time_stamps,
+            "window": iterator[4],
+        }
+
+    def _row_offsets(self, path):
+        # first row of each row group (and the number of rows), from the metadata of the file
+        if path not in self._offsets:
+            md = self._metadata(path)
+            n_rows = [md.row_group(i).num_rows for i in range(md.num_row_groups)]
+            self._offsets[path] = np.cumsum([0] + n_rows)
+        return self._offsets[path]
+
+    def _group_rows(self, path, row_group):
+        offsets = self._row_offsets(path)
+        return offsets[row_group + 1] - offsets[row_group]
+
+    def _group_key(self, iterator):
+        return iterator[0]
+
+    def _iterator_size(self, iterator):
+        # number of rows read for the window
+        return sum(self._group_rows(iterator[0], rg) for rg in iterator[1])
+
+    def _record_files(self, key):
+        return [key]
+
+    def _window_start(self, iterator):
+        # first row or date-time of the window, used as the watermark of incremental runs
+        return iterator[3]
+
+    def _window_complete(self, iterator):
+        # with a time index, the window containing the last date-time may still grow
+        if self.time_index_col:
+            return iterator[4].value <= iterator[2]
+        return True
+
+    def _generate_iterators(self, files_list):
+        files = self._list_files(files_list)
+
+        iterators = []
+        for file in files:
+            offsets = self._row_offsets(file)
+
+            if self.time_index_col:
+                t_min, t_max, tz = self._time_statistics(file)
+                bins = self._time_bins(t_min, t_max, tz)
+                # the last date-time, for the windows which may still grow
+                last = int(t_max.max()) if len(t_max) > 0 else None
+                for t_l, t_h, row_groups in bins:
+                    iterators.append((file, row_groups, last, t_l, t_h))
+            else:
+                bins = get_bins(n=int(offsets[-1]), win_len=self.win_len, step=self.step, fs=self.fs)
+                for t_l, t_h, win in bins:
+                    # row groups containing the rows [t_l, t_h)
+                    g_l = int(np.searchsorted(offsets, t_l, side='right')) - 1
+                    g_h = int(np.searchsorted(offsets, t_h - 1, side='right')) - 1
+                    iterators.append((file, tuple(range(g_l, g_h + 1)), int(offsets[-1]), t_l, t_h))
+
+        return iterators
+
+    def _time_statistics(self, file):
+        # minimum and maximum date-time (int64 nanoseconds) of each row group, from the statistics
+        # of the time column. The statistics of the date-times stored as strings are compared as strings,
+        # which is not the order of the date-times (e.g. with a `datetime_format` as '%d/%m/%Y'), so only the ones
+        # of the timestamp, date and integer columns are used. The other date-times are read and parsed
+        import pyarrow as pa
+
+        md = self._metadata(file)
+        col = md.schema.names.index(self.time_index_col)
+        field = md.schema.to_arrow_schema().field(self.time_index_col)
+        tz = getattr(field.type, 'tz', None)
+        ordered = pa.types.is_timestamp(field.type) or pa.types.is_date(field.type) or pa.types.is_integer(field.type)
+
+        t_min = np.empty(md.num_row_groups, dtype='int64')
+        t_max = np.empty(md.num_row_groups, dtype='int64')
+        for i in range(md.num_row_groups):
+            stats = md.row_group(i).column(col).statistics
+            if ordered and stats is not None and stats.has_min_max:
+                t_min[i], t_max[i] = _to_ns([stats.min, stats.max], self.datetime_format)
+                continue
+            t = self._read_rows(file, [i], [self.time_index_col])[self.time_index_col]
+            if not ordered and tz is None and len(t) > 0:
+                # the time zone of the date-times stored as strings
+                tz = pd.DatetimeIndex(pd.to_datetime(t[:1], format=self.datetime_format)).tz
+            t = _to_ns(t, self.datetime_format)
+            if len(t) == 0:
+                # an empty row group overlaps none of the windows
+                t_min[i], t_max[i] = np.iinfo('int64').max, np.iinfo('int64').min
+            else:
+                t_min[i], t_max[i] = t.min(), t.max()
+        return t_min, t_max, tz
+
+    def _time_bins(self, t_min, t_max, tz):
+        # windows of [t_l, t_h) starting at the first date-time every `step` seconds,
+        # with the row groups whose date-times overlap each window
+        if len(t_min) == 0:
+            return []
+        win_len = int(round(self.win_len*1e9))
+        step = int(round(self.step*1e9))
+        t0 = int(t_min.min())
+        n_bins = max(-(-(int(t_max.max()) - t0)//step), 0)
+
+        row_groups = [[] for _ in range(n_bins)]
+        for i, (lo, hi) in enumerate(zip(t_min, t_max)):
+            # windows k with t0 + k*step < hi + 1 and t0 + k*step + win_len > lo
+            k_l = max((int(lo) - win_len - t0)//step + 1, 0)
+            k_h = min((int(hi) - t0)//step, n_bins - 1)
+            for k in range(k_l, k_h + 1):
+                row_groups[k].append(i)
+
+        t_l = pd.DatetimeIndex((t0 + np.arange(n_bins, dtype='int64')*step).astype('datetime64[ns]'))
+        t_h = pd.DatetimeIndex((t0 + np.arange(n_bins, dtype='int64')*step + win_len).astype('datetime64[ns]'))
+        if tz is not None:
+            t_l = t_l.tz_localize('UTC').tz_convert(tz)
+            t_h = t_h.tz_localize('UTC').tz_convert(tz)
+
+        return [(l, h, tuple(rg)) for l, h, rg in zip(t_l, t_h, row_groups)]
+
+
+
+def _record_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
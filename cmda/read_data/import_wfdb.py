@@ -5,19 +5,30 @@ import numpy as np
 import pandas as pd
 from typing import Optional
 import wfdb
+from wfdb.io._signal import _digi_nan
 
+from ..utils import precision
+from ._cache import SignalCache
+from ._catalog import HeaderCatalog, _read_header, _segments
+from ..utils.record import Record, DigitalSignal
 
 
+# message of the error raised by wfdb when the digital samples do not fit in the requested integer type
+_LOWER_DTYPE_ERROR = 'Cannot convert digital samples to lower dtype'
+
 
 class ReadWFDB:
 
-    def __init__(self, record_names, pn_dir=None, channels=None):
+    def __init__(self, record_names, pn_dir=None, channels=None, cache_dir=None, catalog=None, digital=False):
         '''
         Read multiple records of a WFDB [(Physionet waveform database)].
 
         The module imports multiple records of a WFDB [(Physionet waveform database)] (https://physionet.org/about/database/)
         from either a local disk or Physionet server.
 
+        The multi-segment records are read segment by segment, as one contiguous record
+        where the samples of the gaps (and of the channels missing in a segment) are NaN.
+
         Args:
             record_names (list): list of record names or records paths.
             pn_dir ({str} or {list}, optional): in case of importing the data from Physionet server,
@@ -25,9 +36,23 @@ class ReadWFDB:
                 For importing from a local disk, must be set to None. Defaults to None.
             channels (list, optional): list of the channel names (signals) to import. 
                 If None, all the channels are imported. Defaults to None.
+            cache_dir (str, optional): directory of a signal cache. If given, each record is converted once
+                into memory-mapped `.npy` files, which are read instead of the WFDB files until they change. Defaults to None.
+            catalog ({str} or {HeaderCatalog}, optional): path of a SQLite header catalog, or a catalog instance.
+                If given, the headers of all the records are read in parallel (or taken from the catalog) at the initialization,
+                instead of reading the header of each record when it is loaded. Defaults to None.
+            digital (bool, optional): if True, the digital samples (e.g. int16) are loaded with their gain and baseline
+                in a digital `Record`, which is converted into physical units only when it is used (e.g. by the pipeline).
+                It reduces the memory usage and the size of the data sent to the workers. Defaults to False.
         '''   
         self.channels = channels
+        self.digital = digital
+        self._cache = SignalCache(cache_dir) if cache_dir is not None else None
+        self._rec_info = {}
         self.iterators = self._generate_iterators(rec_path_list=record_names, pn_dir=pn_dir) 
+        if catalog is not None:
+            headers = _get_catalog(catalog).scan(self.iterators)
+            self._rec_info = {rec: _header_info(h) for rec, h in headers.items()}
 
     def load(self,n_jobs=None):
         '''
@@ -38,7 +63,7 @@ class ReadWFDB:
             ```None``` means using all processors. Defaults to None.
 
         Returns:
-            dict: imported data as a dictionary, where the keys are the record names.
+            dict: imported data as a dictionary, where the keys are the record names and the values their `Record`.
         '''        
         iterators = self.iterators
         print("Loading the data ...")
@@ -67,21 +92,61 @@ class ReadWFDB:
     def _get_data(self,iterator,sampfrom=0,sampto=None):
         rec_path = iterator[0]
         pn_dir = iterator[1]
+        if self._cache is not None:
+            rec, channels = self._cached(rec_path, pn_dir)
+            data = rec.window(channels, slice(sampfrom, sampto), dtype=precision.get_dtype())
+            return {rec.name: data, 'fs': rec.fs}
+
         res = _read_wfdb(
             record_path= rec_path,
             pn_dir = pn_dir,
             channel_names= self.channels,
             sampfrom = sampfrom,
-            sampto=sampto
+            sampto=sampto,
+            rec_info = self._header(rec_path, pn_dir),
+            digital = self.digital
         )
 
         return res
 
+    def _header(self,rec_path,pn_dir):
+        # the header of each record is read once
+        if (rec_path,pn_dir) not in self._rec_info:
+            self._rec_info[rec_path,pn_dir] = _get_rec_info(record_path=rec_path, pn_dir=pn_dir)
+        return self._rec_info[rec_path,pn_dir]
+
+    def _cached(self,rec_path,pn_dir):
+        return _cached_wfdb(self._cache, rec_path, pn_dir, self.channels, self._header(rec_path, pn_dir))
+
+    def _iterator_size(self,iterator):
+        # size of the local signal files, used for scheduling the longest records first
+        rec_path, pn_dir = iterator
+        if pn_dir is None:
+            files = [f for f in _local_files(rec_path, self._segments(rec_path, pn_dir)) if f.endswith('.dat')]
+            return max(sum(os.path.getsize(f) for f in files if os.path.exists(f)), 1)
+        return 1
+
+    def _record_files(self,iterator):
+        # local files of a record, whose changes are tracked in incremental runs
+        rec_path, pn_dir = iterator
+        if pn_dir is None:
+            return _local_files(rec_path, self._segments(rec_path, pn_dir))
+        return []
+
+    def _segments(self,rec_path,pn_dir):
+        # segments of a local record, without reading the header of the single segment records
+        if (rec_path,pn_dir) not in self._rec_info and os.path.exists(rec_path + '.dat'):
+            return None
+        return self._header(rec_path, pn_dir)[4]
+
 
 
 class RollingWindowWFDB:
 
-    def __init__(self, record_names, public_dir, win_len, step=None, channels=None):
+    def __init__(
+        self, record_names, public_dir, win_len, step=None, channels=None, cache_dir=None, catalog=None, digital=False,
+        segments='across'
+    ):
         '''
         Read multiple records of a WFDB [(Physionet waveform database)].
 
@@ -98,12 +163,35 @@ class RollingWindowWFDB:
                 If None, the step length is equalt to the window length. Defaults to None.
             channels (list, optional): list of the channel names (signals) to import. 
                 If None, all the channels are imported. Defaults to None.
+            cache_dir (str, optional): directory of a signal cache. If given, each record is converted once
+                into memory-mapped `.npy` files, from which the windows are sliced
+                without reading the WFDB files again until they change. In double precision, the windows are views
+                of the memory-mapped file, and copies otherwise (see `CachedRecord.window`). Defaults to None.
+            catalog ({str} or {HeaderCatalog}, optional): path of a SQLite header catalog, or a catalog instance,
+                from which the windows are planned without reading the headers of the known records again.
+                If None, the headers are read in parallel at each initialization. Defaults to None.
+            digital (bool, optional): if True, the digital samples (e.g. int16) of the windows are loaded with their gain and baseline
+                in a digital `Record`, which is converted into physical units only when it is used (e.g. by the pipeline).
+                It reduces the memory usage and the size of the data sent to the workers. Defaults to False.
+            segments (str, optional): planning of the windows of the multi-segment records, from the segments of their header.
+                `'across'`: over the whole record, the samples of the gaps being NaN.
+                `'skip_gaps'`: across the consecutive segments, but not over the gaps (segments named `~`).
+                `'within'`: inside each segment, none of the windows overlapping two segments.
+                The windows of the single segment records are the same in all cases. Only the segments
+                which a window overlaps are read. Defaults to 'across'.
         '''  
+        if segments not in ('across', 'skip_gaps', 'within'):
+            raise ValueError(f"segments must be 'across', 'skip_gaps' or 'within', got {segments!r}")
         self.channels = channels
+        self.digital = digital
+        self.segments = segments
+        self._cache = SignalCache(cache_dir) if cache_dir is not None else None
+        self._rec_info = {}
         self.win_len = win_len
         self.step = step
         self.iswin = True
-        self.iterator = self._iterator(rec_path_list=record_names, pn_dir=public_dir) 
+        self.iterators = self._iterator(rec_path_list=record_names, pn_dir=public_dir, catalog=catalog)
+        self.iterator = self.iterators
 
     def load(self,n_jobs=None):
         '''
@@ -114,7 +202,7 @@ class RollingWindowWFDB:
             ```None``` means using all processors. Defaults to None.
 
         Returns:
-            dict: imported data as a dictionary, where the keys are the record names.
+            dict: imported data as a dictionary, where the keys are the record names and the values their `Record`.
         '''        
         iterator = self.iterator
         if n_jobs == 1:
@@ -126,7 +214,7 @@ class RollingWindowWFDB:
 
         return list(res)
     
-    def _iterator(self,rec_path_list,pn_dir):
+    def _iterator(self,rec_path_list,pn_dir,catalog=None):
         if not isinstance(pn_dir,list):
             itr = list(map(lambda x: (x, pn_dir), rec_path_list))
         else:
@@ -134,15 +222,18 @@ class RollingWindowWFDB:
 
         iterator = []
         print("Initializing the segmentation ...")
+        headers = _get_catalog(catalog).scan(itr)
+        self._rec_info = {rec: _header_info(h) for rec, h in headers.items()}
         for rec_path,pb in itr:
-            record_name, sig_len, sig_name, fs = _get_rec_info(
-                record_path=rec_path, pn_dir=pb
-            )
+            record_name, sig_len, sig_name, fs, segments = self._rec_info[rec_path,pb]
+            if self._cache is not None:
+                # convert the record before the windows are read, possibly by several workers
+                self._cached(rec_path, pb)
 
-            bins = get_bins(n = sig_len, win_len = self.win_len, step = self.step, fs = fs)
-
-            for win in bins:
-                iterator.append((rec_path,pb,win))
+            for start, n in _spans(sig_len, segments, self.segments):
+                bins = get_bins(n = n, win_len = self.win_len, step = self.step, fs = fs)
+                for win in bins:
+                    iterator.append((rec_path,pb,range(start + win.start, start + win.stop)))
 
         return iterator
 
@@ -151,14 +242,87 @@ class RollingWindowWFDB:
         rec_path,pn_dir,samples = iterator
         sampfrom = samples[0]
         sampto = samples[-1]
+        if self._cache is not None:
+            rec, channels = self._cached(rec_path, pn_dir)
+            data = rec.window(channels, slice(sampfrom, sampto), dtype=precision.get_dtype())
+            res = {rec.name: data, 'fs': rec.fs}
+            return self._window_data(res=res, sampfrom=sampfrom, sampto=sampto)
 
         res = _read_wfdb(
             record_path= rec_path,
             pn_dir = pn_dir,
             channel_names= self.channels,
             sampfrom = sampfrom,
-            sampto=sampto
+            sampto=sampto,
+            rec_info = self._header(rec_path, pn_dir),
+            digital = self.digital
+        )
+        return self._window_data(res=res, sampfrom=sampfrom, sampto=sampto)
+
+    def _get_data_batch(self,iterators):
+        # read the record once, from the first to the last sample of the given windows,
+        # and slice the windows from the loaded signals
+        rec_path,pn_dir,_ = iterators[0]
+        if self._cache is not None:
+            return [self._get_data(itr) for itr in iterators]
+
+        sampfrom = min(samples[0] for _,_,samples in iterators)
+        sampto = max(samples[-1] for _,_,samples in iterators)
+
+        data = _read_wfdb(
+            record_path= rec_path,
+            pn_dir = pn_dir,
+            channel_names= self.channels,
+            sampfrom = sampfrom,
+            sampto=sampto,
+            rec_info = self._header(rec_path, pn_dir),
+            digital = self.digital
         )
+        record_name = list(data.keys())[0]
+
+        res = []
+        for _,_,samples in iterators:
+            win_l = samples[0] - sampfrom
+            win_h = samples[-1] - sampfrom
+            # the windows are views of the loaded record
+            win = {record_name: data[record_name].window(win_l, win_h), 'fs': data['fs']}
+            res.append(self._window_data(res=win, sampfrom=samples[0], sampto=samples[-1]))
+        return res
+
+    def _header(self,rec_path,pn_dir):
+        # the header of each record is read once
+        if (rec_path,pn_dir) not in self._rec_info:
+            self._rec_info[rec_path,pn_dir] = _get_rec_info(record_path=rec_path, pn_dir=pn_dir)
+        return self._rec_info[rec_path,pn_dir]
+
+    def _cached(self,rec_path,pn_dir):
+        return _cached_wfdb(self._cache, rec_path, pn_dir, self.channels, self._header(rec_path, pn_dir))
+
+    def _group_key(self,iterator):
+        return iterator[0],iterator[1]
+
+    def _iterator_size(self,iterator):
+        return len(iterator[2])
+
+    def _record_files(self,key):
+        rec_path, pn_dir = key
+        if pn_dir is None:
+            return _local_files(rec_path, self._header(rec_path, pn_dir)[4])
+        return []
+
+    def _window_start(self,iterator):
+        # first sample of the window, used as the watermark of incremental runs
+        return iterator[2][0]
+
+    def _window_complete(self,iterator):
+        return True
+
+    def _window_data(self,res,sampfrom,sampto):
+        record_name = list(res.keys())[0]
+        res['win_len'] = self.win_len
+        res['time_stamps'] = None
+        # the windows of different records have the same sample ranges
+        res['window'] = (record_name,sampfrom,sampto)
         return res
 
 
@@ -201,27 +365,22 @@ def _get_rec_path(rec_name: str, rec_path: str, source: Optional[str] = None) ->
 def _get_rec_info(record_path: str, pn_dir: str) -> tuple:
     """
     Get the record name, sampling frequency of the signals,
-    signals length and available signal channels.
+    signals length, available signal channels and segments.
 
     Args:
         record_path (str): wfdb.rdrecord record_name input
         pn_dir (str): wfdb.rdrecord pn_dir input
 
     Returns:
+        record_name (str): Record's name
         sig_len (int): Signals' ndarray length
         sig_name (list): Signals' names
         fs (float): Signals' sampling frequency
+        segments (list): (name, first sample, length) of each segment, None for single segment records
     """
 
     # get the header of wfdb record
-    rec_info = wfdb.rdheader(record_name=record_path, pn_dir=pn_dir)
-
-    record_name = rec_info.record_name
-    sig_len = rec_info.sig_len
-    sig_name = rec_info.sig_name
-    fs = rec_info.fs
-
-    return record_name, sig_len, sig_name, fs
+    return _header_info(_read_header((record_path, pn_dir)))
 
 
 def _read_wfdb(
@@ -230,17 +389,49 @@ def _read_wfdb(
     channel_names: Optional[list] = None,
     sampfrom: int = 0,
     sampto: Optional[int] = None,
+    rec_info: Optional[tuple] = None,
+    digital: bool = False,
 ):
 
-    # get the wfdb record information
-    record_name, sig_len, sig_name, fs = _get_rec_info(
-        record_path=record_path, pn_dir=pn_dir
-    )
+    # get the wfdb record information, unless it is already known
+    if rec_info is None:
+        rec_info = _get_rec_info(record_path=record_path, pn_dir=pn_dir)
+    record_name, sig_len, sig_name, fs, segments = rec_info
 
     # TODO check the channel names
     if channel_names is None:
         channel_names = sig_name
 
+    if segments is not None:
+        return _read_segments(
+            record_path=record_path,
+            pn_dir=pn_dir,
+            channel_names=channel_names,
+            sampfrom=sampfrom,
+            sampto=sig_len if sampto is None else sampto,
+            rec_info=rec_info,
+            digital=digital,
+        )
+
+
+    if digital:
+        record = _read_digital(
+            record_name=record_path,
+            pn_dir=pn_dir,
+            sampfrom=sampfrom,
+            sampto=sampto,
+            channel_names=channel_names,
+        )
+        data = Record(
+            np.ascontiguousarray(record.d_signal.T),
+            channel_names,
+            fs=fs,
+            gain=list(record.adc_gain),
+            baseline=list(record.baseline),
+            d_nan=list(_digi_nan(record.fmt)),
+        )
+        res = {record_name: data, 'fs':fs}
+        return res
 
     record = wfdb.rdrecord(
         record_name=record_path,
@@ -248,16 +439,183 @@ def _read_wfdb(
         sampfrom=sampfrom,
         sampto=sampto,
         channel_names=channel_names,
+        return_res=32 if precision.is_single() else 64,
     )
 
-    data = record.p_signal
-    data = dict(zip(channel_names, data.transpose()))
+    # one copy into a (channels, samples) array, so the signal of each channel is contiguous
+    data = Record(np.ascontiguousarray(record.p_signal.T), channel_names, fs=fs)
+    data._owner = True
 
     # res = {record_name: data, 'fs':fs, 'window':(sampfrom,sampto)}
     res = {record_name: data, 'fs':fs}
     return res
 
 
+def _get_catalog(catalog):
+    if isinstance(catalog, HeaderCatalog):
+        return catalog
+    return HeaderCatalog(path=catalog)
+
+
+def _header_info(header):
+    # header of the catalog as returned by _get_rec_info
+    segments = None
+    if header['seg_len'] is not None:
+        segments = _segments(header['seg_name'], header['seg_len'])
+    return header['record_name'], header['sig_len'], header['sig_name'], header['fs'], segments
+
+
+def _spans(sig_len, segments, mode):
+    # (first sample, length) of the parts of a record in which the windows are planned
+    if segments is None or mode == 'across':
+        return [(0, sig_len)]
+    if mode == 'within':
+        return [(start, n) for name, start, n in segments if name != '~' and n > 0]
+
+    # the runs of consecutive segments between the gaps
+    spans = []
+    for name, start, n in segments:
+        if name == '~' or n == 0:
+            continue
+        if len(spans) > 0 and sum(spans[-1]) == start:
+            spans[-1] = (spans[-1][0], spans[-1][1] + n)
+        else:
+            spans.append((start, n))
+    return spans
+
+
+def _local_files(record_path, segments = None):
+    # header and signal files of a local record, or of its segments
+    if segments is None:
+        return [record_path + '.hea', record_path + '.dat']
+    dir_name = os.path.dirname(record_path)
+    files = [record_path + '.hea']
+    for name, _, _ in segments:
+        if name != '~':
+            files += [os.path.join(dir_name, name + '.hea'), os.path.join(dir_name, name + '.dat')]
+    return files
+
+
+def _read_segments(record_path, pn_dir, channel_names, sampfrom, sampto, rec_info, digital = False):
+    # read the samples [sampfrom, sampto) of a multi-segment record from the segments which overlap them only.
+    # The samples of the gaps, and of the channels missing in a segment, are NaN
+    record_name, sig_len, sig_name, fs, segments = rec_info
+    dir_name = os.path.dirname(record_path)
+    n = max(sampto - sampfrom, 0)
+
+    parts = []
+    for name, start, length in segments:
+        if name == '~' or start >= sampto or start + length <= sampfrom:
+            continue
+        seg_from = max(sampfrom - start, 0)
+        seg_to = min(sampto - start, length)
+        record = _read_segment(os.path.join(dir_name, name), pn_dir, channel_names, seg_from, seg_to, digital)
+        if record is not None:
+            parts.append((start + seg_from - sampfrom, record))
+
+    index = {c: i for i, c in enumerate(channel_names)}
+    if not digital:
+        data = np.full((len(channel_names), n), np.nan, dtype=precision.get_dtype())
+        for offset, record in parts:
+            for j, c in enumerate(record.sig_name):
+                data[index[c], offset:offset + record.sig_len] = record.p_signal[:, j]
+        data = Record(data, channel_names, fs=fs)
+        data._owner = True
+        return {record_name: data, 'fs': fs}
+
+    # ADC parameters of each channel in the segments read
+    params = [set() for _ in channel_names]
+    for _, record in parts:
+        for j, (c, d_nan) in enumerate(zip(record.sig_name, _digi_nan(record.fmt))):
+            params[index[c]].add((record.adc_gain[j], record.baseline[j], d_nan))
+    dtype = np.result_type(np.int16, *[record.d_signal.dtype for _, record in parts])
+
+    if any(len(p) > 1 for p in params):
+        # the segments have different gains or baselines, so the window is converted into physical units
+        data = np.full((len(channel_names), n), np.nan, dtype=precision.get_dtype())
+        for offset, record in parts:
+            for j, (c, d_nan) in enumerate(zip(record.sig_name, _digi_nan(record.fmt))):
+                x = DigitalSignal(record.d_signal[:, j], record.adc_gain[j], record.baseline[j], d_nan)
+                data[index[c], offset:offset + record.sig_len] = x.physical(dtype=data.dtype)
+        data = Record(data, channel_names, fs=fs)
+        data._owner = True
+        return {record_name: data, 'fs': fs}
+
+    # the channels which are in none of the segments read have only missing samples
+    params = [p.pop() if len(p) > 0 else (1.0, 0, int(np.iinfo(dtype).min)) for p in params]
+    gain, baseline, d_nan = (list(p) for p in zip(*params)) if len(params) > 0 else ([], [], [])
+    data = np.empty((len(channel_names), n), dtype=dtype)
+    data[:] = np.asarray(d_nan, dtype=dtype).reshape(-1, 1)
+    for offset, record in parts:
+        for j, c in enumerate(record.sig_name):
+            data[index[c], offset:offset + record.sig_len] = record.d_signal[:, j]
+    data = Record(data, channel_names, fs=fs, gain=gain, baseline=baseline, d_nan=d_nan)
+    return {record_name: data, 'fs': fs}
+
+
+def _read_digital(**kwargs):
+    # digital samples of a record in int16, or in int32 if its format has more than 16 bits
+    try:
+        return wfdb.rdrecord(**kwargs, physical=False, return_res=16)
+    except Exception as e:
+        # wfdb raises a plain Exception when the samples can not be converted to int16
+        if _LOWER_DTYPE_ERROR not in str(e):
+            raise
+    return wfdb.rdrecord(**kwargs, physical=False, return_res=32)
+
+
+def _read_segment(segment_path, pn_dir, channel_names, sampfrom, sampto, digital):
+    # samples of the given channels in a segment, None if it contains none of them
+    kwargs = dict(record_name=segment_path, pn_dir=pn_dir, sampfrom=sampfrom, sampto=sampto, channel_names=channel_names)
+    if digital:
+        record = _read_digital(**kwargs)
+    else:
+        record = wfdb.rdrecord(**kwargs, return_res=32 if precision.is_single() else 64)
+    if not record.n_sig or record.sig_name is None:
+        return None
+    return record
+
+
+def _cached_wfdb(cache, record_path, pn_dir, channel_names, rec_info, chunk_len = 1000000):
+    # get a record from the signal cache, reading its missing channels in chunks of samples
+    record_name, sig_len, sig_name, fs, segments = rec_info
+    if channel_names is None:
+        channel_names = sig_name
+
+    def reader(missing, time):
+        for sampfrom in range(0, sig_len, chunk_len):
+            sampto = min(sampfrom + chunk_len, sig_len)
+            if segments is not None:
+                rec = _read_segments(record_path, pn_dir, missing, sampfrom, sampto, rec_info)[record_name]
+                yield dict(zip(missing, rec.array))
+                continue
+            record = wfdb.rdrecord(
+                record_name=record_path,
+                pn_dir=pn_dir,
+                sampfrom=sampfrom,
+                sampto=sampto,
+                channel_names=missing,
+            )
+            yield dict(zip(missing, record.p_signal.transpose()))
+
+    if pn_dir is None:
+        source = os.path.abspath(record_path)
+        files = _local_files(record_path, segments)
+    else:
+        source = (record_path, pn_dir)
+        files = []
+
+    rec = cache.get(
+        source=source,
+        files=files,
+        channels=list(channel_names),
+        reader=reader,
+        fs=fs,
+        name=record_name,
+    )
+    return rec, channel_names
+
+
 def get_bins(n, win_len, step = None, fs = 1):
     
     if step is None:
@@ -0,0 +1,112 @@
+import time
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+
+# active profiler of each thread, e.g. of the threads of the 'thread' executor,
+# so that the stats of the concurrent tasks are not mixed
+_local = threading.local()
+
+
+class Profiler:
+
+    def __init__(self):
+        '''
+        Collect the wall time, CPU time and number of calls of the pipeline stages and feature functions.
+
+        The CPU time is the one of the calling thread, so it only counts the work of the profiled task.
+        '''
+        self.stats = {}
+
+    def tic(self):
+        return time.perf_counter(), time.thread_time()
+
+    def toc(self, key, t):
+        wall = time.perf_counter() - t[0]
+        cpu = time.thread_time() - t[1]
+        self.add(key=key, wall=wall, cpu=cpu)
+
+    def add(self, key, wall, cpu, calls = 1):
+        stat = self.stats.setdefault(key, [0.0, 0.0, 0])
+        stat[0] += wall
+        stat[1] += cpu
+        stat[2] += calls
+
+    def merge(self, stats):
+        '''
+        add the stats collected by another profiler, e.g. in a worker process.
+
+        Args:
+            stats (dict): stats of the other profiler
+        '''
+        for key, (wall, cpu, calls) in stats.items():
+            self.add(key=key, wall=wall, cpu=cpu, calls=calls)
+
+    def pop_stats(self):
+        stats = self.stats
+        self.stats = {}
+        return stats
+
+    def report(self):
+        '''
+        get the collected stats.
+
+        Returns:
+            pd.DataFrame: wall time, CPU time (in seconds) and number of calls of each stage or function,
+                sorted by the wall time.
+        '''
+        res = pd.DataFrame.from_dict(
+            self.stats, orient='index', columns=['wall_time', 'cpu_time', 'calls']
+        )
+        res['mean_wall_time'] = res['wall_time']/res['calls']
+        return res.sort_values('wall_time', ascending=False)
+
+
+
+def enable():
+    '''
+    enable the profiling in the current thread.
+
+    Returns:
+        Profiler: the active profiler
+    '''
+    if get_profiler() is None:
+        _local.profiler = Profiler()
+    return _local.profiler
+
+
+def disable():
+    '''
+    disable the profiling in the current thread.
+    '''
+    _local.profiler = None
+
+
+def get_profiler():
+    '''
+    get the active profiler of the current thread.
+
+    Returns:
+        Profiler: the active profiler, or None if the profiling is disabled.
+    '''
+    return getattr(_local, 'profiler', None)
+
+
+@contextmanager
+def profiler():
+    '''
+    enable a new profiler in the current thread within a `with` block.
+    The previous profiler of the thread, if any, is active again after the block.
+
+    Yields:
+        Profiler: the profiler of the block
+    '''
+    prev = get_profiler()
+    _local.profiler = Profiler()
+    try:
+        yield _local.profiler
+    finally:
+        _local.profiler = prev
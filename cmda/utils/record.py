@@ -0,0 +1,325 @@
+from collections.abc import MutableMapping
+
+import numpy as np
+import pandas as pd
+
+from . import precision
+
+
+
+class Record(MutableMapping):
+
+    def __init__(self, array, channels, fs = 1, time_stamps = None, gain = None, baseline = None, d_nan = None):
+        '''
+        Signals of a record (or a window of a record) in one contiguous 2-D array.
+
+        The record is a mapping of the channel names to their signals, so it can be used as the
+        dictionaries of arrays returned by the importers before (e.g. `record['ECG']`, `record.items()`).
+        The channels are the rows of `array`, so the signal of each channel is a contiguous view,
+        which the filters and features use without copying, and a record is pickled as a single array.
+
+        For the digital samples of WFDB records, `array` contains the integer samples and `gain`,
+        `baseline` and `d_nan` the ADC parameters of each channel. The channels are then returned as
+        `DigitalSignal`, and `physical` converts the whole record into physical units.
+
+        Args:
+            array (ndarray): signals of shape (number of channels, number of samples)
+            channels (list): channel names, in the order of the rows of `array`
+            fs (float, optional): sampling frequency of the signals. Defaults to 1.
+            time_stamps (ndarray, optional): time of each sample in seconds from the first sample. Defaults to None.
+            gain (list, optional): ADC gain of each channel of digital samples. Defaults to None.
+            baseline (list, optional): ADC baseline of each channel of digital samples. Defaults to None.
+            d_nan (list, optional): digital value of the missing samples of each channel. Defaults to None.
+        '''
+        array = np.asarray(array)
+        if array.ndim == 1:
+            array = array.reshape(1, -1)
+        if array.ndim != 2 or array.shape[0] != len(channels):
+            raise ValueError(f"array must be of shape ({len(channels)}, number of samples), got {array.shape}")
+        self.array = array
+        self.channels = list(channels)
+        self.fs = fs
+        self.time_stamps = time_stamps
+        self.gain = gain
+        self.baseline = baseline
+        self.d_nan = d_nan
+        self._index = {c: i for i, c in enumerate(self.channels)}
+        # the rows are written only after copying an array shared with other records (e.g. overlapping windows)
+        self._owner = False
+
+    @classmethod
+    def from_columns(cls, columns, fs = 1, time_stamps = None, dtype = None):
+        '''
+        create a record from a dictionary of 1-D arrays (or lists) of the same length.
+
+        Args:
+            columns (dict): signal of each channel
+            fs (float, optional): sampling frequency of the signals. Defaults to 1.
+            time_stamps (ndarray, optional): time of each sample in seconds. Defaults to None.
+            dtype (optional): data type of the record. If None, it is inferred from the signals. Defaults to None.
+
+        Returns:
+            Record: the record
+        '''
+        channels = list(columns)
+        if len(channels) == 0:
+            array = np.empty((0, 0), dtype=dtype or 'float64')
+        else:
+            array = np.stack([np.asarray(columns[c]) for c in channels]).astype(dtype or None, copy=False)
+        rec = cls(array, channels, fs=fs, time_stamps=time_stamps)
+        rec._owner = True
+        return rec
+
+    @classmethod
+    def from_frame(cls, df, fs = 1, time_stamps = None, dtype = 'float64'):
+        '''
+        create a record from the columns of a dataframe.
+
+        Args:
+            df (pd.DataFrame): dataframe, where each column is a channel
+            fs (float, optional): sampling frequency of the signals. Defaults to 1.
+            time_stamps (ndarray, optional): time of each sample in seconds. Defaults to None.
+            dtype (optional): data type of the record. Defaults to 'float64'.
+
+        Returns:
+            Record: the record
+        '''
+        # one copy into a (n_channels, n_samples) array, which is not shared with the (read-only) blocks of the dataframe
+        array = np.array(df.to_numpy(dtype=dtype).T, order='C')
+        rec = cls(array, list(df.columns), fs=fs, time_stamps=time_stamps)
+        rec._owner = True
+        return rec
+
+    @property
+    def n_samples(self):
+        '''
+        int: number of samples of each channel
+        '''
+        return self.array.shape[1]
+
+    @property
+    def is_digital(self):
+        '''
+        bool: True if the record contains digital samples, converted by `physical`
+        '''
+        return self.gain is not None
+
+    def __getitem__(self, channel):
+        i = self._index[channel]
+        if self.is_digital:
+            return DigitalSignal(
+                self.array[i], gain=self.gain[i], baseline=self.baseline[i],
+                d_nan=None if self.d_nan is None else self.d_nan[i]
+            )
+        return self.array[i]
+
+    def __setitem__(self, channel, x):
+        x = np.asarray(x)
+        if x.shape != (self.n_samples,):
+            raise ValueError(f"the signal of {channel} must have {self.n_samples} samples, got the shape {x.shape}")
+        if self.is_digital:
+            raise TypeError("the channels of a digital record can not be set, convert it by `physical` first")
+
+        if channel not in self._index:
+            self.array = np.vstack([self.array, x.reshape(1, -1).astype(self.array.dtype)])
+            self.channels.append(channel)
+            self._index[channel] = len(self.channels) - 1
+            self._owner = True
+            return
+
+        row = self.array[self._index[channel]]
+        if x is row:
+            return
+        if not self._owner or not self.array.flags.writeable:
+            self.array = self.array.copy()
+            self._owner = True
+        self.array[self._index[channel]] = x
+
+    def __delitem__(self, channel):
+        i = self._index[channel]
+        self.array = np.delete(self.array, i, axis=0)
+        self._owner = True
+        for name in ('gain', 'baseline', 'd_nan'):
+            if getattr(self, name) is not None:
+                setattr(self, name, [v for j, v in enumerate(getattr(self, name)) if j != i])
+        self.channels.pop(i)
+        self._index = {c: i for i, c in enumerate(self.channels)}
+
+    def __iter__(self):
+        return iter(self.channels)
+
+    def __len__(self):
+        return len(self.channels)
+
+    def __contains__(self, channel):
+        return channel in self._index
+
+    def __getstate__(self):
+        # the unpickled array is not shared with other records
+        state = self.__dict__.copy()
+        state['_owner'] = True
+        return state
+
+    def window(self, sampfrom, sampto, time_stamps = None):
+        '''
+        get the samples [sampfrom, sampto) of the record as a new record, sharing the array of this record.
+
+        Args:
+            sampfrom (int): first sample
+            sampto (int): sample after the last sample
+            time_stamps (ndarray, optional): time stamps of the window. Defaults to None.
+
+        Returns:
+            Record: the window
+        '''
+        return self.take(slice(sampfrom, sampto), time_stamps=time_stamps)
+
+    def take(self, idx, time_stamps = None):
+        '''
+        get some samples of the record as a new record.
+
+        Args:
+            idx (slice or array-like): samples to take. Slices share the array of this record.
+            time_stamps (ndarray, optional): time stamps of the samples. Defaults to None.
+
+        Returns:
+            Record: the selected samples
+        '''
+        if isinstance(idx, slice):
+            # the array is shared with the new record
+            self._owner = False
+        return Record(
+            self.array[:, idx], self.channels, fs=self.fs, time_stamps=time_stamps,
+            gain=self.gain, baseline=self.baseline, d_nan=self.d_nan
+        )
+
+    def copy(self):
+        '''
+        copy the record into a new array.
+
+        Returns:
+            Record: the copy, which does not share its array with other records
+        '''
+        rec = Record(
+            self.array.copy(), self.channels, fs=self.fs, time_stamps=self.time_stamps,
+            gain=self.gain, baseline=self.baseline, d_nan=self.d_nan
+        )
+        rec._owner = True
+        return rec
+
+    def astype(self, dtype):
+        '''
+        convert the record into a data type, without copying it if it has the data type already.
+        The digital records are converted into physical units.
+
+        Args:
+            dtype: data type
+
+        Returns:
+            Record: the converted record
+        '''
+        if self.is_digital:
+            return self.physical(dtype=dtype)
+        if self.array.dtype == dtype:
+            return self
+        rec = Record(self.array.astype(dtype), self.channels, fs=self.fs, time_stamps=self.time_stamps)
+        rec._owner = True
+        return rec
+
+    def physical(self, dtype = None):
+        '''
+        convert the digital samples into physical units, for all the channels at once.
+
+        Args:
+            dtype (str, optional): float data type of the physical samples.
+                If None, the data type of the current process (see `cmda.utils.precision`). Defaults to None.
+
+        Returns:
+            Record: the record in physical units, with NaN for the missing samples
+        '''
+        if dtype is None:
+            dtype = precision.get_dtype()
+        if not self.is_digital:
+            return self.astype(dtype)
+        x = self.array.astype(dtype)
+        np.subtract(x, np.asarray(self.baseline, dtype=dtype).reshape(-1, 1), out=x)
+        np.divide(x, np.asarray(self.gain, dtype=dtype).reshape(-1, 1), out=x)
+        if self.d_nan is not None:
+            x[self.array == np.asarray(self.d_nan).reshape(-1, 1)] = np.nan
+        rec = Record(x, self.channels, fs=self.fs, time_stamps=self.time_stamps)
+        rec._owner = True
+        return rec
+
+    def to_dataframe(self):
+        '''
+        convert the record into a dataframe with a column per channel.
+
+        Returns:
+            pd.DataFrame: the signals of the record
+        '''
+        rec = self.physical() if self.is_digital else self
+        return pd.DataFrame(rec.array.T, columns=self.channels)
+
+    def __array__(self, dtype = None, copy = None):
+        # the (n_channels, n_samples) array
+        rec = self.physical() if self.is_digital else self
+        return rec.array if dtype is None else rec.array.astype(dtype, copy=False)
+
+    def __repr__(self):
+        kind = ', digital' if self.is_digital else ''
+        return f"Record(channels={self.channels}, n_samples={self.n_samples}, fs={self.fs}, dtype={self.array.dtype}{kind})"
+
+
+
+class DigitalSignal:
+
+    def __init__(self, d_signal, gain, baseline, d_nan = None):
+        '''
+        Digital samples of a WFDB channel, converted into physical units when they are used.
+
+        The object behaves as an array for the numpy functions (converted with `np.asarray`),
+        and its slices are digital signals as well, so the windows are not converted until they are used.
+
+        Args:
+            d_signal (ndarray): digital samples
+            gain (float): ADC gain of the channel
+            baseline (int): ADC baseline of the channel
+            d_nan (int, optional): digital value of the missing samples. Defaults to None.
+        '''
+        self.d_signal = d_signal
+        self.gain = gain
+        self.baseline = baseline
+        self.d_nan = d_nan
+
+    def physical(self, dtype = 'float64'):
+        '''
+        convert the samples into physical units, as `wfdb.rdrecord` does.
+
+        Args:
+            dtype (str, optional): float data type of the physical samples. Defaults to 'float64'.
+
+        Returns:
+            ndarray: physical samples, with NaN for the missing samples
+        '''
+        x = self.d_signal.astype(dtype)
+        np.subtract(x, self.baseline, out=x)
+        np.divide(x, self.gain, out=x)
+        if self.d_nan is not None:
+            x[self.d_signal == self.d_nan] = np.nan
+        return x
+
+    def __array__(self, dtype = None, copy = None):
+        return self.physical(dtype=precision.get_dtype() if dtype is None else dtype)
+
+    def __getitem__(self, idx):
+        return DigitalSignal(self.d_signal[idx], gain=self.gain, baseline=self.baseline, d_nan=self.d_nan)
+
+    def __len__(self):
+        return len(self.d_signal)
+
+    @property
+    def shape(self):
+        return self.d_signal.shape
+
+    def __repr__(self):
+        return f"DigitalSignal({self.d_signal!r}, gain={self.gain}, baseline={self.baseline})"
@@ -74,6 +74,7 @@ class _AddUDF:
 
     def __init__(self):
         self._ListOfUDFs = {}
+        self._funcs = {}
 
     def _add2list(self,func_name):
         func_name_ = func_name+"__0"
@@ -98,6 +99,34 @@ class _AddUDF:
         func_name = func.__name__
         n_func_name = self._add2list(func_name=func_name)
         self._add(func=func, func_name=n_func_name)
+        self._funcs[n_func_name] = func
+
+    def _restore(self,funcs):
+        # re-add the user-defined functions, e.g. in a new worker process
+        for func_name, func in funcs.items():
+            self._ListOfUDFs[func_name] = {}
+            self._add(func=func, func_name=func_name)
+            self._funcs[func_name] = func
+
+
+
+class _UDFContainer:
+    # base of the objects holding added functions in `add` and user-defined functions in `udf` (features and filters)
+
+    def _get_spec(self):
+        # compact description of the added functions,
+        # used for rebuilding the object in the worker processes
+        return {
+            'functions': self.add._ListOfFunctions.copy(),
+            'udfs': self.udf._funcs.copy()
+        }
+
+    @classmethod
+    def _from_spec(cls, spec):
+        obj = cls()
+        obj.add._ListOfFunctions = spec['functions'].copy()
+        obj.udf._restore(funcs=spec['udfs'])
+        return obj
 
 
 def decorator_fun(func):
@@ -123,4 +152,16 @@ def get_bins(n, win_len, step=None, fs=1):
     step = int(step * fs)
     n_bins = int(np.floor((n - win_len) / step) + 1)
     bins = [(i * step,(i * step) + win_len,range((i * step), (i * step) + win_len)) for i in range(0, n_bins)]
-    return bins
\ No newline at end of file
+    return bins
+
+def _as_ns(time_idx):
+    # date-times of a DatetimeIndex as int64 nanoseconds since the epoch (UTC for the time zone aware ones),
+    # whatever the resolution of the index and the version of pandas
+    if time_idx.tz is not None:
+        time_idx = time_idx.tz_convert('UTC').tz_localize(None)
+    return time_idx.values.astype('datetime64[ns]').view('int64')
+
+
+def _to_ns(x, datetime_format=None):
+    # parse date-times (or their statistics) as int64 nanoseconds since the epoch
+    return _as_ns(pd.DatetimeIndex(pd.to_datetime(x, format=datetime_format)))
@@ -0,0 +1,18 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def fd_limit():
+    # a low limit of open files for the test, above the descriptors already open
+    resource = pytest.importorskip('resource')
+    if not os.path.isdir('/proc/self/fd'):
+        pytest.skip('the open file descriptors can not be counted')
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    limit = len(os.listdir('/proc/self/fd')) + 40
+    resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+    try:
+        yield limit
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
@@ -0,0 +1,99 @@
+import threading
+import multiprocessing
+from multiprocessing.connection import Client
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cmda.read_data import RollingWindowCSV
+from cmda.feature_extraction import Features
+from cmda.pipeline import Pipeline, DistributedExecutor
+from cmda.pipeline._distributed import run_worker
+
+
+AUTHKEY = b'cmda-test'
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    rng = np.random.default_rng(0)
+    files = []
+    for name in ('rec0', 'rec1'):
+        path = tmp_path / f'{name}.csv'
+        pd.DataFrame({'ECG': rng.normal(size=2000), 'ABP': rng.normal(size=2000)}).to_csv(path, index=False)
+        files.append(str(path))
+    features = Features()
+    features.add.mean()
+    features.add.std()
+    importer = RollingWindowCSV(files, win_len=1, channels=['ECG', 'ABP'], fs=100)
+    return Pipeline(importer=importer, features=features)
+
+
+def _assert_equal(res, ref):
+    assert [index for index, _ in res] == [index for index, _ in ref]
+    for (_, x), (_, y) in zip(res, ref):
+        assert x == pytest.approx(y)
+
+
+def test_distributed_localhost_workers(pipeline):
+    ref = list(pipeline.iter_run(n_jobs=1))
+    executor = DistributedExecutor(n_jobs=3, address=('127.0.0.1', 0), authkey=AUTHKEY)
+    res = list(pipeline.iter_run(executor=executor, chunksize=2))
+    _assert_equal(res, ref)
+
+
+def _stalled_worker(address, holding):
+    # a worker which takes a shard and never returns its result
+    conn = Client(tuple(address), authkey=AUTHKEY)
+    conn.recv_bytes()
+    conn.recv_bytes()
+    holding.set()
+    threading.Event().wait()
+
+
+def test_distributed_lost_worker(pipeline):
+    ref = list(pipeline.iter_run(n_jobs=1))
+    executor = DistributedExecutor(n_jobs=0, address=('127.0.0.1', 0), authkey=AUTHKEY)
+    workers = []
+
+    def start_workers():
+        while executor._coordinator is None:
+            threading.Event().wait(0.05)
+        address = executor._coordinator.address
+        # the first worker is killed while it computes the first shard
+        holding = multiprocessing.Event()
+        stalled = multiprocessing.Process(target=_stalled_worker, args=(address, holding), daemon=True)
+        stalled.start()
+        assert holding.wait(30)
+        stalled.kill()
+        stalled.join()
+        for _ in range(2):
+            w = multiprocessing.Process(target=run_worker, args=(address, AUTHKEY), daemon=True)
+            w.start()
+            workers.append(w)
+
+    thread = threading.Thread(target=start_workers, daemon=True)
+    thread.start()
+    try:
+        with pytest.warns(UserWarning, match='a worker was lost, its shard 0 is reassigned'):
+            res = list(pipeline.iter_run(executor=executor, chunksize=4))
+    finally:
+        thread.join()
+        for w in workers:
+            w.join(timeout=10)
+
+    _assert_equal(res, ref)
+
+
+def failing(x):
+    raise ValueError('failing feature')
+
+
+def test_distributed_error(pipeline):
+    pipeline.features.udf.add(failing)
+    executor = DistributedExecutor(n_jobs=1, address=('127.0.0.1', 0), authkey=AUTHKEY)
+    with pytest.raises(ValueError, match='failing feature') as err:
+        list(pipeline.iter_run(executor=executor))
+    # the traceback of the worker is the cause of the error
+    assert 'in failing' in str(err.value.__cause__)
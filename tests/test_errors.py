@@ -0,0 +1,82 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cmda.read_data import RollingWindowCSV
+from cmda.feature_extraction import Features
+from cmda.pipeline import Pipeline, TaskError
+
+
+# first sample of the windows already computed once, for the flaky feature
+_seen = set()
+
+
+def fail_third(x):
+    # fails in the third window of each record
+    if 200 <= x[0] < 300:
+        raise ValueError(f'bad window {x[0]}')
+    return {'first': float(x[0])}
+
+
+def flaky(x):
+    # fails the first time each window is computed
+    if float(x[0]) not in _seen:
+        _seen.add(float(x[0]))
+        raise RuntimeError('flaky')
+    return {'first': float(x[0])}
+
+
+def slow(x):
+    if 200 <= x[0] < 300:
+        time.sleep(5)
+    return {'first': float(x[0])}
+
+
+def _pipeline(tmp_path, udf):
+    files = []
+    for name in ('rec0', 'rec1'):
+        files.append(str(tmp_path / f'{name}.csv'))
+        pd.DataFrame({'ECG': np.arange(500.0)}).to_csv(files[-1], index=False)
+    features = Features()
+    features.udf.add(udf)
+    return Pipeline(importer=RollingWindowCSV(files, win_len=1, channels=['ECG'], fs=100), features=features)
+
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(group_by_record=True), dict(n_jobs=2, executor='process')])
+def test_report(tmp_path, kwargs):
+    pipeline = _pipeline(tmp_path, fail_third)
+    res = list(pipeline.iter_run(on_error='report', **kwargs))
+    # only the failing windows are lost
+    assert sorted(x['ECG_first'] for _, x in res) == [0, 0, 100, 100, 300, 300, 400, 400]
+    report = pipeline.error_report()
+    assert len(report) == 2
+    assert (report['error'] == 'ValueError').all() and (report['attempts'] == 1).all()
+    assert report['message'].str.contains('bad window 200').all()
+
+
+def test_raise(tmp_path):
+    pipeline = _pipeline(tmp_path, fail_third)
+    with pytest.raises(ValueError):
+        list(pipeline.iter_run())
+    with pytest.raises(TaskError, match='after 3 attempts'):
+        list(pipeline.iter_run(retries=2))
+    with pytest.raises(ValueError):
+        list(pipeline.iter_run(on_error='ignore'))
+
+
+def test_retries(tmp_path):
+    _seen.clear()
+    pipeline = _pipeline(tmp_path, flaky)
+    res = list(pipeline.iter_run(retries=1))
+    assert len(res) == 10 and pipeline.errors == []
+
+
+def test_timeout(tmp_path):
+    pipeline = _pipeline(tmp_path, slow)
+    t = time.perf_counter()
+    res = list(pipeline.iter_run(on_error='report', timeout=0.5))
+    assert time.perf_counter() - t < 4
+    assert len(res) == 8
+    assert list(pipeline.error_report()['error']) == ['TaskTimeout', 'TaskTimeout']
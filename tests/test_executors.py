@@ -0,0 +1,134 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cmda.read_data import RollingWindowCSV
+from cmda.feature_extraction import Features
+from cmda.pipeline import Pipeline
+from cmda.pipeline._executors import Prefetcher, SerialExecutor
+from cmda.utils import precision, profiling
+
+
+class _Importer:
+    # counts the tasks loaded by the prefetching threads
+
+    def __init__(self):
+        self.loaded = 0
+        self._lock = threading.Lock()
+
+    def _get_data(self, iterator):
+        with self._lock:
+            self.loaded += 1
+        return iterator
+
+
+def test_prefetch_bounded():
+    importer = _Importer()
+    prefetcher = Prefetcher(importer, prefetch=3, io_threads=2)
+    consumed = 0
+    for task_id, data, _ in prefetcher.load(enumerate([[i] for i in range(20)])):
+        assert data == [task_id]
+        # at most `prefetch` tasks are loaded and not consumed
+        assert importer.loaded - consumed <= 3
+        consumed += 1
+        prefetcher.done()
+    assert consumed == importer.loaded == 20
+
+
+def test_prefetch_close():
+    prefetcher = Prefetcher(_Importer(), prefetch=2, io_threads=1)
+    tasks = prefetcher.load(enumerate([[i] for i in range(10)]))
+    # the consumer does not release the slots of the two loaded tasks, so the loading blocks
+    assert [next(tasks)[0], next(tasks)[0]] == [0, 1]
+    thread = threading.Thread(target=lambda: list(tasks), daemon=True)
+    thread.start()
+    thread.join(0.2)
+    assert thread.is_alive()
+    prefetcher.close()
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+@pytest.fixture(scope='module')
+def pipeline(tmp_path_factory):
+    path = tmp_path_factory.mktemp('data')
+    rng = np.random.default_rng(0)
+    files = []
+    for name in ('rec0', 'rec1'):
+        files.append(str(path / f'{name}.csv'))
+        pd.DataFrame({'ECG': rng.normal(size=1000)}).to_csv(files[-1], index=False)
+    features = Features()
+    features.add.mean()
+    features.add.std()
+    return Pipeline(importer=RollingWindowCSV(files, win_len=1, channels=['ECG'], fs=100), features=features)
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+@pytest.mark.parametrize('prefetch', [0, 3])
+def test_executors(pipeline, executor, prefetch):
+    ref = list(pipeline.iter_run(n_jobs=1))
+    assert len(ref) == 20
+    res = list(pipeline.iter_run(n_jobs=2, executor=executor, prefetch=prefetch, chunksize=3))
+    assert [index for index, _ in res] == [index for index, _ in ref]
+    for (_, x), (_, y) in zip(res, ref):
+        assert x == pytest.approx(y)
+    # unordered results
+    res = list(pipeline.iter_run(n_jobs=2, executor=executor, prefetch=prefetch, ordered=False))
+    assert sorted(str(r) for r in res) == sorted(str(r) for r in ref)
+
+
+class _FailingExecutor(SerialExecutor):
+
+    closed = False
+
+    def start(self, *args, **kwargs):
+        raise RuntimeError('start failed')
+
+    def close(self):
+        self.closed = True
+
+
+def test_failed_start(pipeline):
+    executor = _FailingExecutor()
+    with pytest.raises(RuntimeError):
+        next(pipeline.iter_run(executor=executor, precision='float32', profile=True))
+    # the settings of the run are restored and the executor is closed
+    assert precision.get_dtype() == np.float64
+    assert profiling.get_profiler() is None
+    assert executor.closed
+
+    with pytest.raises(ValueError):
+        next(pipeline.iter_run(executor='unknown', precision='float32'))
+    assert precision.get_dtype() == np.float64
+
+
+def peak(x):
+    return {'peak': float(np.max(np.abs(x)))}
+
+
+def double(x):
+    return 2*x
+
+
+def test_pipeline_spec(pipeline):
+    import pickle
+    from cmda.preprocessing import Filters
+    from cmda.pipeline._tasks import _pipeline_spec, _object_from_spec, _process_data
+
+    features = Features()
+    features.add.mean()
+    features.udf.add(peak)
+    filters = Filters()
+    filters.add.scaler()
+    filters.udf.add(double)
+    # the importer is sent without its iterators, and the features and filters as the names and arguments of their functions
+    spec = pickle.loads(pickle.dumps(_pipeline_spec(pipeline.importer, {'ECG': features}, filters)))
+    assert spec['importer'].iterators is None and pipeline.importer.iterators is not None
+
+    data = pipeline.importer._get_data(pipeline.importer.iterators[0])
+    ref = _process_data(dict(data), {'ECG': features}, filters)
+    res = _process_data(dict(data), _object_from_spec(spec['features']), _object_from_spec(spec['filters']))
+    assert res[0] == ref[0] and res[1] == pytest.approx(ref[1])
+    assert set(res[1]) == {'ID', 'ECG_mean', 'ECG_peak'}
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pytest
+
+from cmda.read_data import ReadHDF5, RollingWindowHDF5, ReadZarr, RollingWindowZarr
+
+
+FS = 100
+
+
+def _signals(i = 0):
+    return {'ECG': np.arange(1000.0) + i, 'ABP': -np.arange(1000.0) - i}
+
+
+def _write_hdf5(path, i = 0, dataset = False):
+    h5py = pytest.importorskip('h5py')
+    x = _signals(i)
+    with h5py.File(path, 'w') as f:
+        if dataset:
+            ds = f.create_dataset('waveforms', data=np.stack([x['ECG'], x['ABP']], axis=1), chunks=(64, 2))
+            ds.attrs['channels'] = ['ECG', 'ABP']
+        else:
+            g = f.create_group('signals')
+            g.attrs['fs'] = FS
+            for c, v in x.items():
+                g.create_dataset(c, data=v, chunks=(64,))
+
+
+def _write_zarr(path, i = 0):
+    zarr = pytest.importorskip('zarr')
+    g = zarr.open_group(str(path), mode='w')
+    g.attrs['fs'] = FS
+    for c, v in _signals(i).items():
+        g.create_dataset(c, data=v, chunks=(64,))
+
+
+@pytest.mark.parametrize('dataset', [False, True])
+def test_hdf5_windows(tmp_path, dataset):
+    path = str(tmp_path / 'rec0.h5')
+    _write_hdf5(path, dataset=dataset)
+    kwargs = dict(dataset='waveforms', fs=FS) if dataset else dict(group='signals')
+    x = _signals()
+
+    rec = ReadHDF5([path], channels=['ABP', 'ECG'], **kwargs).load(n_jobs=1)[0]['rec0']
+    assert rec.channels == ['ABP', 'ECG'] and rec.fs == FS
+    np.testing.assert_array_equal(rec['ECG'], x['ECG'])
+
+    importer = RollingWindowHDF5([path], win_len=1, step=0.5, channels=['ECG', 'ABP'], **kwargs)
+    assert len(importer.iterators) == 19
+    batch = importer._get_data_batch(importer.iterators)
+    for itr, res in zip(importer.iterators, batch):
+        assert res['window'] == (itr[1], itr[2])
+        for c in ('ECG', 'ABP'):
+            np.testing.assert_array_equal(res['rec0'][c], x[c][itr[1]:itr[2]])
+            np.testing.assert_array_equal(importer._get_data(itr)['rec0'][c], x[c][itr[1]:itr[2]])
+    importer.close()
+    assert len(importer._files) == 0
+
+
+def test_hdf5_many_files(tmp_path, fd_limit):
+    files = []
+    for i in range(2*fd_limit):
+        path = str(tmp_path / f'rec{i}.h5')
+        _write_hdf5(path, i=i)
+        files.append(path)
+
+    importer = RollingWindowHDF5(files, win_len=5, group='signals')
+    assert len(importer.iterators) == 4*fd_limit
+    for itr in importer.iterators:
+        i = int(os.path.basename(itr[0])[3:-3])
+        np.testing.assert_array_equal(importer._get_data(itr)[f'rec{i}']['ECG'], np.arange(itr[1], itr[2]) + i)
+    # the least recently used files are closed
+    assert 0 < len(importer._files) <= 16
+
+
+def test_zarr_windows(tmp_path):
+    path = str(tmp_path / 'rec0.zarr')
+    _write_zarr(path)
+    x = _signals()
+
+    rec = ReadZarr([path]).load(n_jobs=1)[0]['rec0']
+    assert sorted(rec.channels) == ['ABP', 'ECG'] and rec.fs == FS
+    np.testing.assert_array_equal(rec['ABP'], x['ABP'])
+
+    importer = RollingWindowZarr(str(tmp_path), win_len=1, channels=['ECG'])
+    assert len(importer.iterators) == 10
+    assert importer._record_files(path) == [os.path.join(path, 'ECG', '.zarray')]
+    for itr, res in zip(importer.iterators, importer._get_data_batch(importer.iterators)):
+        np.testing.assert_array_equal(res['rec0']['ECG'], x['ECG'][itr[1]:itr[2]])
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cmda.read_data import RollingWindowCSV
+from cmda.feature_extraction import Features
+from cmda.pipeline import Pipeline, TaskError
+
+
+def finite_mean(x):
+    if np.any(np.isnan(x)):
+        raise ValueError("NaN samples")
+    return {'finite_mean': float(np.mean(x))}
+
+
+def _pipeline(path):
+    features = Features()
+    features.udf.add(finite_mean)
+    importer = RollingWindowCSV(files_list=[str(path)], win_len=1, channels=['ECG'], fs=100)
+    return Pipeline(importer=importer, features=features)
+
+
+def _write(path, x):
+    # fixed-width values, so that fixing a sample does not change the size of the file
+    with open(path, 'w') as f:
+        f.write('ECG\n' + ''.join('nan\n' if np.isnan(v) else f'{v:.1f}\n' for v in x))
+
+
+def test_incremental_new_windows(tmp_path):
+    path = tmp_path / 'rec0.csv'
+    watermarks = str(tmp_path / 'watermarks.json')
+    x = np.arange(300) % 7.0
+    _write(path, x[:200])
+    res = list(_pipeline(path).iter_run(incremental=watermarks))
+    assert [index for index, _ in res] == [100, 200]
+
+    # only the windows appended since the last run are computed
+    _write(path, x)
+    res = list(_pipeline(path).iter_run(incremental=watermarks))
+    assert [index for index, _ in res] == [300]
+    assert list(_pipeline(path).iter_run(incremental=watermarks)) == []
+
+
+@pytest.mark.parametrize('on_error,retries', [('raise', 0), ('raise', 1), ('report', 0)])
+def test_incremental_failed_window(tmp_path, on_error, retries):
+    path = tmp_path / 'rec0.csv'
+    watermarks = str(tmp_path / 'watermarks.json')
+    x = np.arange(300) % 7.0
+    bad = x.copy()
+    bad[150] = np.nan
+    _write(path, bad)
+
+    pipeline = _pipeline(path)
+    if on_error == 'raise':
+        # the failed instance is retried in isolation, then the run stops
+        with pytest.raises(TaskError if retries > 0 else ValueError):
+            list(pipeline.iter_run(incremental=watermarks, retries=retries))
+    else:
+        res = list(pipeline.iter_run(incremental=watermarks, on_error='report'))
+        assert [index for index, _ in res] == [100, 300]
+        assert len(pipeline.errors) == 1
+
+    # once the input is fixed, the failed window is computed by the next run
+    _write(path, x)
+    res = dict(_pipeline(path).iter_run(incremental=watermarks))
+    assert 200 in res
+    assert res[200]['ECG_finite_mean'] == pytest.approx(np.mean(x[100:200]))
+    assert list(_pipeline(path).iter_run(incremental=watermarks)) == []
@@ -0,0 +1,97 @@
+import gzip
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cmda.read_data import RollingWindowCSV
+from cmda.feature_extraction import Features
+from cmda.pipeline import Pipeline
+
+
+def _features():
+    features = Features()
+    features.add.mean()
+    features.add.std()
+    return features
+
+
+@pytest.fixture
+def csv_files(tmp_path):
+    # two records, one of them compressed
+    rng = np.random.default_rng(0)
+    files = []
+    for name, n in (('rec0.csv.gz', 3000), ('rec1.csv', 2000)):
+        df = pd.DataFrame({'ECG': rng.normal(size=n), 'ABP': rng.normal(size=n)})
+        path = tmp_path / name
+        with (gzip.open(path, 'wt') if name.endswith('.gz') else open(path, 'w')) as f:
+            df.to_csv(f, index=False)
+        files.append(str(path))
+    return files
+
+
+def _run(files, **kwargs):
+    importer = RollingWindowCSV(files, win_len=1, channels=['ECG', 'ABP'], fs=100, chunk_size=70)
+    return list(Pipeline(importer=importer, features=_features()).iter_run(**kwargs))
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(executor='thread', n_jobs=4),
+    dict(executor='thread', n_jobs=4, group_by_record=True),
+    dict(prefetch=2),
+    dict(prefetch=8, io_threads=4),
+    dict(executor='thread', n_jobs=4, prefetch=8, io_threads=4),
+])
+def test_compressed_csv_threads(csv_files, kwargs):
+    ref = _run(csv_files, n_jobs=1)
+    assert len(ref) == 50
+    res = _run(csv_files, **kwargs)
+    assert [index for index, _ in res] == [index for index, _ in ref]
+    for (_, x), (_, y) in zip(res, ref):
+        assert x == pytest.approx(y)
+
+
+def test_pipeline_config(tmp_path, csv_files):
+    from cmda.pipeline._checkpoint import pipeline_config, config_hash
+
+    def config(precision=None, **kwargs):
+        params = dict(win_len=1, channels=['ECG', 'ABP'], fs=100)
+        params.update(kwargs)
+        importer = RollingWindowCSV(csv_files, **params)
+        return config_hash(pipeline_config(importer=importer, features=_features(), filters=None, precision=precision))
+
+    ref = config()
+    # the parameters which only change how the data is read do not change the configuration
+    assert config(chunk_size=70) == ref
+    assert config(cache_index=False) == ref
+    assert config(cache_dir=str(tmp_path / 'cache')) == ref
+    # the ones which change the results do
+    assert config(win_len=2) != ref
+    assert config(step=0.5) != ref
+    assert config(channels=['ECG']) != ref
+    assert config(fs=50) != ref
+    # the precision is always part of the configuration
+    assert config(precision='float64') == ref
+    assert config(precision='float32') != ref
+    importer = RollingWindowCSV(csv_files, win_len=1, fs=100)
+    assert pipeline_config(importer=importer, features=_features(), filters=None)['precision'] == 'float64'
+
+
+def test_iter_run_lazy(tmp_path, csv_files):
+    importer = RollingWindowCSV(csv_files, win_len=1, channels=['ECG', 'ABP'], fs=100)
+    loaded = []
+    get_data = importer._get_data
+    importer._get_data = lambda iterator: loaded.append(iterator) or get_data(iterator)
+    pipeline = Pipeline(importer=importer, features=_features())
+    checkpoint = str(tmp_path / 'results.sqlite')
+
+    # the results are computed as they are consumed
+    res = pipeline.iter_run(checkpoint=checkpoint)
+    first = [next(res), next(res)]
+    assert len(loaded) == 2
+    # stopping early keeps the results computed so far
+    res.close()
+    loaded.clear()
+    rest = list(pipeline.iter_run(checkpoint=checkpoint))
+    assert len(loaded) == 48 and rest[:2] == first
+    assert [index for index, _ in rest] == [index for index, _ in _run(csv_files)]
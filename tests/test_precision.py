@@ -0,0 +1,180 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cmda.benchmarks.bench import _FEATURE_FAMILIES
+from cmda.benchmarks.synthetic import generate_ecg, generate_rr
+from cmda.feature_extraction import Features
+from cmda.pipeline._tasks import _process_data
+from cmda.read_data import ReadCSV, RollingWindowCSV, ReadWFDB, RollingWindowWFDB, Record
+from cmda.pipeline import Pipeline
+from cmda.utils.precision import precision, get_dtype
+
+
+FS = 100
+
+# maximum relative error of the float32 features of each family, relative to the largest
+# value of each feature over the windows (see `bench_precision`)
+TOLERANCES = {
+    'td': 1e-5,
+    'ps': 1e-5,
+    'fd': 1e-5,
+    'wf': 1e-4,
+    'hrv': 5e-4,
+}
+
+
+def _features(family):
+    features = Features()
+    for add in _FEATURE_FAMILIES[family].values():
+        add(features)
+    return features
+
+
+def _windows(family):
+    if family == 'hrv':
+        rr, t = generate_rr(duration=1500, seed=0)
+        win = len(rr)//5
+        return [
+            {'x': {'x': rr[i*win:(i+1)*win]*1000}, 'fs': 4, 'win_len': t[(i+1)*win-1] - t[i*win],
+             'time_stamps': t[i*win:(i+1)*win] - t[i*win], 'window': None}
+            for i in range(5)
+        ]
+    x = generate_ecg(duration=50, fs=FS, seed=0, dtype='float64')
+    return [{'x': {'x': x[i*10*FS:(i+1)*10*FS]}, 'fs': FS} for i in range(5)]
+
+
+def _max_rel_error(family):
+    features = _features(family)
+    windows = _windows(family)
+    out = {}
+    for dtype in ('float64', 'float32'):
+        with precision(dtype):
+            out[dtype] = [_process_data(dict(w), features, None)[1] for w in windows]
+    a = pd.DataFrame(out['float64']).drop(columns='ID', errors='ignore').astype('float64')
+    b = pd.DataFrame(out['float32']).drop(columns='ID', errors='ignore').astype('float64')
+    assert list(a.columns) == list(b.columns)
+    # the features which are 0 up to the rounding in double precision are compared to the largest feature
+    scale = a.abs().max()
+    scale = scale.clip(lower=scale.max()*1e-6)
+    err = ((a - b).abs().max()/scale).dropna()
+    # the NaN features are NaN in both precisions
+    assert (a.isna() == b.isna()).all().all()
+    return err
+
+
+@pytest.mark.parametrize('family', sorted(TOLERANCES))
+def test_float32_features(family):
+    err = _max_rel_error(family)
+    # the features are computed in single precision
+    assert len(err) > 0 and err.max() > 0
+    assert err.max() <= TOLERANCES[family], f"{err.idxmax()}: {err.max():.2e}"
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    x = generate_ecg(duration=20, fs=FS, seed=0, dtype='float64')
+    path = tmp_path / 'rec0.csv'
+    pd.DataFrame({'ECG': x, 'ABP': 2*x}).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def wfdb_record(tmp_path):
+    wfdb = pytest.importorskip('wfdb')
+    x = generate_ecg(duration=20, fs=FS, seed=0, dtype='float64')
+    wfdb.wrsamp(
+        'rec0', fs=FS, units=['mV', 'mV'], sig_name=['ECG', 'ABP'], p_signal=np.stack([x, 2*x], axis=1),
+        fmt=['16', '16'], write_dir=str(tmp_path)
+    )
+    return str(tmp_path / 'rec0')
+
+
+@pytest.mark.parametrize('dtype', ['float64', 'float32'])
+def test_csv_dtype(csv_file, dtype):
+    with precision(dtype):
+        rec = ReadCSV(files_list=[csv_file]).load(n_jobs=1)[0]['rec0']
+        importer = RollingWindowCSV(files_list=[csv_file], win_len=5, fs=FS)
+        win = importer._get_data(importer.iterators[0])['rec0']
+    assert rec.array.dtype == dtype and win.array.dtype == dtype
+    assert rec['ECG'].dtype == dtype
+
+
+@pytest.mark.parametrize('dtype', ['float64', 'float32'])
+def test_wfdb_dtype(wfdb_record, dtype):
+    with precision(dtype):
+        rec = ReadWFDB([wfdb_record]).load(n_jobs=1)[0]['rec0']
+        importer = RollingWindowWFDB([wfdb_record], None, win_len=5)
+        win = importer._get_data(importer.iterators[0])['rec0']
+    assert rec.array.dtype == dtype and win.array.dtype == dtype
+
+
+def test_wfdb_digital(wfdb_record):
+    ref = ReadWFDB([wfdb_record]).load(n_jobs=1)[0]['rec0']
+    rec = ReadWFDB([wfdb_record], digital=True).load(n_jobs=1)[0]['rec0']
+    assert rec.is_digital and rec.array.dtype == np.int16
+    # the digital windows are smaller to send to the workers
+    assert len(pickle.dumps(rec)) < len(pickle.dumps(ref))/2
+    # the physical values are the same as read by wfdb, in the data type of the precision
+    np.testing.assert_array_equal(rec.physical().array, ref.array)
+    for dtype in ('float64', 'float32'):
+        with precision(dtype):
+            x = np.asarray(rec['ECG'])
+        assert x.dtype == dtype
+        np.testing.assert_allclose(x, ref['ECG'], rtol=1e-6, atol=1e-6)
+
+
+def test_record_dtype():
+    columns = {'ECG': np.arange(10), 'ABP': np.arange(10.0)}
+    assert Record.from_columns(columns).array.dtype == 'float64'
+    rec = Record.from_columns(columns, dtype='float32')
+    assert rec.array.dtype == 'float32' and rec['ECG'].dtype == 'float32'
+    assert rec.astype('float64').array.dtype == 'float64'
+    # the channels are views of the rows of the record
+    assert np.shares_memory(rec['ECG'], rec.array)
+
+
+def input_dtype(x):
+    return {'dtype': float(np.dtype(x.dtype).itemsize)}
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(n_jobs=1),
+    dict(n_jobs=1, prefetch=2),
+    dict(n_jobs=2, executor='thread', prefetch=2),
+    dict(n_jobs=2, executor='process'),
+])
+def test_pipeline_dtype(csv_file, kwargs):
+    features = Features()
+    features.udf.add(input_dtype)
+    pipeline = Pipeline(importer=RollingWindowCSV(files_list=[csv_file], win_len=5, fs=FS), features=features)
+    res = pipeline.iter_run(precision='float32', **kwargs)
+    for _, x in res:
+        # the data type is only set in the computation, not in the code consuming the results
+        assert get_dtype() == np.float64
+        assert x['ECG_dtype'] == 4
+    assert get_dtype() == np.float64
+
+
+def test_wfdb_digital_32(tmp_path, monkeypatch):
+    wfdb = pytest.importorskip('wfdb')
+    x = generate_ecg(duration=20, fs=FS, seed=0, dtype='float64')
+    wfdb.wrsamp('rec0', fs=FS, units=['mV'], sig_name=['ECG'], p_signal=x.reshape(-1, 1), fmt=['32'],
+                adc_gain=[1e6], baseline=[0], write_dir=str(tmp_path))
+    record = str(tmp_path / 'rec0')
+    # the samples of more than 16 bits are read as int32
+    rec = ReadWFDB([record], digital=True).load(n_jobs=1)[0]['rec0']
+    assert rec.is_digital and rec.array.dtype == np.int32
+    np.testing.assert_allclose(rec.physical().array[0], x, atol=1e-6)
+
+    # the other errors are not taken for a format error and are raised at once
+    calls = []
+    def rdrecord(**kwargs):
+        calls.append(kwargs)
+        raise OSError('unreadable')
+    monkeypatch.setattr(wfdb, 'rdrecord', rdrecord)
+    with pytest.raises(OSError):
+        ReadWFDB([record], digital=True).load(n_jobs=1)
+    assert len(calls) == 1
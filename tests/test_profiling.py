@@ -0,0 +1,82 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cmda.read_data import RollingWindowCSV
+from cmda.feature_extraction import Features
+from cmda.pipeline import Pipeline
+from cmda.pipeline._tasks import _compute_task
+from cmda.utils import profiling
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    files = []
+    for name in ('rec0', 'rec1'):
+        files.append(str(tmp_path / f'{name}.csv'))
+        pd.DataFrame({'ECG': np.random.default_rng(0).normal(size=1000)}).to_csv(files[-1], index=False)
+    features = Features()
+    features.add.mean()
+    features.add.welch()
+    features.add.mnf(spectrum='welch')
+    return Pipeline(importer=RollingWindowCSV(files, win_len=1, channels=['ECG'], fs=100), features=features)
+
+
+def test_compute_task_stats():
+    features = Features()
+    features.add.mean()
+    prof = profiling.enable()
+    try:
+        prof.add('import', wall=1.0, cpu=0.5)
+        loaded = (0, [{'rec0': {'x': np.arange(10.0)}, 'fs': 1}], {'import': [2.0, 1.0, 1]})
+        _, res, stats = _compute_task(loaded, features=features, filters=None)
+    finally:
+        profiling.disable()
+    assert res[0][1]['x_mean'] == 4.5
+    # the loading and computing stats of the same stage are summed
+    assert stats['import'] == [3.0, 1.5, 2]
+    assert stats['features'][2] == 1
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(n_jobs=1),
+    dict(n_jobs=1, prefetch=2),
+    dict(n_jobs=1, prefetch=2, group_by_record=True),
+    dict(n_jobs=2, executor='process'),
+    dict(n_jobs=4, executor='thread'),
+    dict(n_jobs=4, executor='thread', prefetch=2, group_by_record=True),
+])
+def test_profile(pipeline, kwargs):
+    list(pipeline.iter_run(profile=True, **kwargs))
+    report = pipeline.profile.report()
+    assert report.loc['import', 'calls'] == (2 if kwargs.get('group_by_record') else 20)
+    assert report.loc['features', 'calls'] == 20
+    assert report.loc['features.mnf__0', 'calls'] == 20
+    assert (report['wall_time'] >= 0).all()
+    # the profiling is disabled after the run
+    assert profiling.get_profiler() is None
+
+
+def test_profile_threads(pipeline):
+    # a profiler of the caller keeps its own stats
+    prof = profiling.enable()
+    try:
+        prof.add('caller', wall=1.0, cpu=1.0)
+        for _ in pipeline.iter_run(n_jobs=4, executor='thread', profile=True):
+            assert profiling.get_profiler() is prof
+        assert prof.stats == {'caller': [1.0, 1.0, 1]}
+    finally:
+        profiling.disable()
+    assert 'caller' not in pipeline.profile.stats
+
+    # each thread has its own profiler
+    def run():
+        assert profiling.get_profiler() is None
+        profiling.enable().add('thread', wall=1.0, cpu=1.0)
+    thread = threading.Thread(target=run)
+    with profiling.profiler() as prof:
+        thread.start()
+        thread.join()
+        assert prof.stats == {}
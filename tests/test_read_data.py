@@ -0,0 +1,276 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cmda.read_data import RollingWindowCSV
+
+
+@pytest.fixture
+def timed_csv(tmp_path):
+    # irregularly sampled signals with a date-time column
+    rng = np.random.default_rng(0)
+    t = pd.Timestamp('2020-01-01') + pd.to_timedelta(np.cumsum(rng.uniform(0.5, 1.5, 300)), unit='s')
+    df = pd.DataFrame({'time': t.strftime('%Y-%m-%d %H:%M:%S.%f'), 'HR': rng.normal(size=300), 'SpO2': rng.normal(size=300)})
+    path = tmp_path / 'rec0.csv'
+    df.to_csv(path, index=False)
+    return str(path), df
+
+
+@pytest.mark.parametrize('cache_index', [True, False])
+def test_rolling_csv_time_index(timed_csv, cache_index):
+    path, df = timed_csv
+    importer = RollingWindowCSV(
+        files_list=[path], win_len=30, channels=['HR', 'SpO2'], time_index_col='time', cache_index=cache_index
+    )
+    assert len(importer.iterators) > 0
+
+    t = pd.to_datetime(df['time'])
+    for itr in importer.iterators:
+        res = importer._get_data(itr)
+        mask = ((t >= itr[3]) & (t < itr[4])).to_numpy()
+        if mask.sum() == 0:
+            continue
+        np.testing.assert_allclose(res['rec0']['HR'], df['HR'][mask])
+        expected = (t[mask] - t[mask].iloc[0]).dt.total_seconds().to_numpy()
+        np.testing.assert_allclose(res['time_stamps'], expected)
+
+
+def test_rolling_csv_time_index_cached(timed_csv, tmp_path):
+    path, df = timed_csv
+    importer = RollingWindowCSV(
+        files_list=[path], win_len=30, channels=['HR'], time_index_col='time', cache_dir=str(tmp_path / 'cache')
+    )
+    ref = RollingWindowCSV(files_list=[path], win_len=30, channels=['HR'], time_index_col='time')
+    assert [itr[1] for itr in importer.iterators] == [itr[1] for itr in ref.iterators]
+    for itr in importer.iterators:
+        np.testing.assert_allclose(importer._get_data(itr)['rec0']['HR'], ref._get_data(itr)['rec0']['HR'])
+
+
+def test_rolling_csv_time_zone(tmp_path):
+    t = pd.date_range('2020-01-01', periods=120, freq='s', tz='Europe/Berlin')
+    df = pd.DataFrame({'time': t.astype(str), 'HR': np.arange(120.0)})
+    path = tmp_path / 'rec0.csv'
+    df.to_csv(path, index=False)
+
+    importer = RollingWindowCSV(files_list=[str(path)], win_len=60, channels=['HR'], time_index_col='time')
+    assert [itr[3] for itr in importer.iterators] == [t[0], t[60]]
+    np.testing.assert_allclose(importer._get_data(importer.iterators[1])['rec0']['HR'], np.arange(60.0, 120.0))
+
+
+@pytest.mark.parametrize('as_string', [False, True])
+def test_rolling_parquet_time_index(tmp_path, timed_csv, as_string):
+    pq = pytest.importorskip('pyarrow.parquet')
+    import pyarrow as pa
+    from cmda.read_data import RollingWindowParquet
+
+    _, df = timed_csv
+    df = df.assign(time=df['time'] if as_string else pd.to_datetime(df['time']))
+    path = tmp_path / 'rec0.parquet'
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path, row_group_size=40)
+
+    importer = RollingWindowParquet(files_list=[str(path)], win_len=30, channels=['HR'], time_index_col='time')
+    t = pd.to_datetime(df['time'])
+    assert len(importer.iterators) == int(np.ceil((t.iloc[-1] - t.iloc[0]).total_seconds()/30))
+    for itr, res in zip(importer.iterators, importer._get_data_batch(importer.iterators)):
+        # only the row groups overlapping the window are read
+        assert len(itr[1]) <= 2
+        mask = ((t >= itr[3]) & (t < itr[4])).to_numpy()
+        np.testing.assert_allclose(res['rec0']['HR'], df['HR'][mask])
+        np.testing.assert_allclose(importer._get_data(itr)['rec0']['HR'], df['HR'][mask])
+
+
+def test_rolling_csv_compressed(tmp_path, monkeypatch):
+    import gzip
+    from cmda.read_data import import_local
+
+    df = pd.DataFrame({'ECG': np.arange(1000.0), 'ABP': -np.arange(1000.0)})
+    path = tmp_path / 'rec0.csv.gz'
+    with gzip.open(path, 'wt') as f:
+        df.to_csv(f, index=False)
+
+    opened = []
+    open_csv = import_local._open_csv
+    monkeypatch.setattr(import_local, '_open_csv', lambda p: opened.append(p) or open_csv(p))
+
+    importer = RollingWindowCSV(files_list=[str(path)], win_len=1, fs=100, channels=['ECG', 'ABP'], chunk_size=30)
+    assert len(importer.iterators) == 10 and len(opened) == 1
+    for itr in importer.iterators:
+        res = importer._get_data(itr)
+        assert 'rec0' in res
+        np.testing.assert_allclose(res['rec0']['ECG'], df['ECG'][itr[1][0]:itr[1][-1]+1])
+    # the windows read in order continue from the same decompression stream
+    assert len(opened) == 2
+
+
+def test_rolling_csv_cache_views(tmp_path):
+    from cmda.utils.precision import precision
+
+    df = pd.DataFrame({'ECG': np.arange(1000.0), 'ABP': -np.arange(1000.0)})
+    path = tmp_path / 'rec0.csv'
+    df.to_csv(path, index=False)
+
+    importer = RollingWindowCSV(
+        files_list=[str(path)], win_len=1, fs=100, channels=['ECG', 'ABP'], cache_dir=str(tmp_path / 'cache')
+    )
+    rec = importer._cached(str(path))
+    block = rec._map(rec._location('ECG')[0])
+    for itr in importer.iterators:
+        res = importer._get_data(itr)['rec0']
+        # the windows are views of the memory-mapped cache
+        assert np.shares_memory(res.array, block)
+        np.testing.assert_array_equal(res['ECG'], df['ECG'][itr[1][0]:itr[1][-1]+1])
+        np.testing.assert_array_equal(res['ABP'], df['ABP'][itr[1][0]:itr[1][-1]+1])
+        # and are copied before being modified
+        res['ECG'] = res['ECG']*2
+        assert not np.shares_memory(res.array, block)
+    np.testing.assert_array_equal(block[0], df['ECG'])
+
+    # in another order or data type, the windows are copied
+    importer = RollingWindowCSV(
+        files_list=[str(path)], win_len=1, fs=100, channels=['ABP', 'ECG'], cache_dir=str(tmp_path / 'cache')
+    )
+    res = importer._get_data(importer.iterators[0])['rec0']
+    assert not np.shares_memory(res.array, block)
+    np.testing.assert_array_equal(res['ABP'], df['ABP'][:100])
+    with precision('float32'):
+        res = importer._get_data(importer.iterators[0])['rec0']
+    assert res.array.dtype == 'float32'
+    np.testing.assert_array_equal(res['ECG'], df['ECG'][:100])
+
+
+@pytest.mark.parametrize('time_index_col', [None, 'time'])
+def test_rolling_csv_offsets(tmp_path, monkeypatch, time_index_col):
+    from cmda.read_data import import_local
+
+    t = pd.date_range('2020-01-01', periods=1000, freq='10ms')
+    df = pd.DataFrame({'time': t.astype(str), 'ECG': np.arange(1000.0), 'ABP': -np.arange(1000.0)})
+    path = tmp_path / 'rec0.csv'
+    df.to_csv(path, index=False)
+
+    importer = RollingWindowCSV(
+        files_list=[str(path)], win_len=1, fs=100, channels=['ECG', 'ABP'], time_index_col=time_index_col, chunk_size=30
+    )
+    assert len(importer.iterators) == 10
+
+    parsed = []
+    read_csv = import_local.pd.read_csv
+    monkeypatch.setattr(
+        import_local.pd, 'read_csv', lambda *args, **kwargs: parsed.append(kwargs.get('nrows')) or read_csv(*args, **kwargs)
+    )
+    for itr in reversed(importer.iterators):
+        res = importer._get_data(itr)
+        np.testing.assert_array_equal(res['rec0']['ECG'], df['ECG'][itr[1][0]:itr[1][-1]+1])
+        np.testing.assert_array_equal(res['rec0']['ABP'], df['ABP'][itr[1][0]:itr[1][-1]+1])
+    # each window is parsed from the offset of the closest chunk before it, not from the start of the file
+    parsed = [n for n in parsed if n]
+    assert len(parsed) == 10 and max(parsed) < 100 + 30
+
+
+def test_rolling_csv_compressed_many_files(tmp_path, fd_limit):
+    import gzip
+
+    files = []
+    for i in range(2*fd_limit):
+        path = tmp_path / f'rec{i}.csv.gz'
+        with gzip.open(path, 'wt') as f:
+            pd.DataFrame({'ECG': np.arange(200.0) + i}).to_csv(f, index=False)
+        files.append(str(path))
+
+    importer = RollingWindowCSV(files_list=files, win_len=1, fs=100, channels=['ECG'])
+    assert len(importer.iterators) == 4*fd_limit
+    for itr in importer.iterators:
+        res = importer._get_data(itr)
+        i = int(os.path.basename(itr[0])[3:-7])
+        np.testing.assert_array_equal(res[f'rec{i}']['ECG'], np.arange(itr[1][0], itr[1][-1] + 1) + i)
+    importer.close()
+    assert len(importer._streams) == 0
+
+
+def test_rolling_parquet_many_files(tmp_path, fd_limit):
+    pq = pytest.importorskip('pyarrow.parquet')
+    import pyarrow as pa
+    from cmda.read_data import RollingWindowParquet
+
+    files = []
+    for i in range(2*fd_limit):
+        path = tmp_path / f'rec{i}.parquet'
+        pq.write_table(pa.table({'ECG': np.arange(200.0) + i}), path, row_group_size=50)
+        files.append(str(path))
+
+    importer = RollingWindowParquet(files_list=files, win_len=1, fs=100)
+    assert len(importer.iterators) == 4*fd_limit
+    for itr in importer.iterators:
+        i = int(os.path.basename(itr[0])[3:-8])
+        res = importer._get_data(itr)
+        np.testing.assert_array_equal(res[f'rec{i}']['ECG'], np.arange(itr[3], itr[4]) + i)
+
+
+def test_rolling_parquet_time_format(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    import pyarrow as pa
+    from cmda.read_data import RollingWindowParquet
+
+    # day-first date-times, whose order as strings is not the order of the date-times
+    t = pd.date_range('2020-01-25', periods=24*20, freq='h')
+    df = pd.DataFrame({'time': t.strftime('%d/%m/%Y %H:%M'), 'HR': np.arange(len(t), dtype='float64')})
+    path = tmp_path / 'rec0.parquet'
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path, row_group_size=100)
+
+    importer = RollingWindowParquet(
+        files_list=[str(path)], win_len=24*3600, channels=['HR'], time_index_col='time', datetime_format='%d/%m/%Y %H:%M'
+    )
+    assert len(importer.iterators) == 20
+    for itr in importer.iterators:
+        mask = (t >= itr[3]) & (t < itr[4])
+        np.testing.assert_array_equal(importer._get_data(itr)['rec0']['HR'], df['HR'][mask])
+
+
+@pytest.mark.parametrize('compressed', [False, True])
+def test_rolling_csv_blank_lines(tmp_path, compressed):
+    import gzip
+
+    # blank lines, which the parser skips, inside the file and at its end
+    x = np.arange(330.0)
+    lines = ['ECG'] + [f'{v}' for v in x]
+    lines.insert(120, '')
+    lines.insert(201, '\r')
+    text = '\n'.join(lines) + '\n\n'
+    path = tmp_path / ('rec0.csv.gz' if compressed else 'rec0.csv')
+    with (gzip.open(path, 'wt') if compressed else open(path, 'w')) as f:
+        f.write(text)
+
+    for chunk_size in (7, 100000):
+        importer = RollingWindowCSV(files_list=[str(path)], win_len=1, fs=100, channels=['ECG'], chunk_size=chunk_size)
+        assert [itr[2] for itr in importer.iterators] == [330]*3
+        for itr in importer.iterators:
+            np.testing.assert_array_equal(importer._get_data(itr)['rec0']['ECG'], x[itr[1][0]:itr[1][-1]+1])
+        batch = importer._get_data_batch(importer.iterators)
+        np.testing.assert_array_equal(np.concatenate([res['rec0']['ECG'] for res in batch]), x[:300])
+
+
+def test_rolling_csv_fewer_rows(tmp_path):
+    # a row dropped by the parser (a comment) cuts the last window short
+    path = tmp_path / 'rec0.csv'
+    with open(path, 'w') as f:
+        f.write('ECG\n' + ''.join(f'{v}\n' for v in range(299)) + '# end\n')
+    importer = RollingWindowCSV(files_list=[str(path)], win_len=1, fs=100, channels=['ECG'], comment='#')
+    assert len(importer.iterators) == 3
+    np.testing.assert_array_equal(importer._get_data(importer.iterators[2])['rec0']['ECG'], np.arange(200.0, 299.0))
+
+
+def test_rolling_csv_time_index_pickle(timed_csv):
+    import pickle
+
+    path, df = timed_csv
+    importer = RollingWindowCSV(files_list=[path], win_len=30, channels=['HR'], time_index_col='time')
+    assert importer._time_index == {}
+    importer = RollingWindowCSV(files_list=[path], win_len=30, channels=['HR'], time_index_col='time', cache_index=True)
+    assert path in importer._time_index
+    # the workers parse the date-times of their windows instead of receiving the index of every file
+    worker = pickle.loads(pickle.dumps(importer))
+    assert worker._time_index == {}
+    itr = importer.iterators[1]
+    np.testing.assert_allclose(worker._get_data(itr)['time_stamps'], importer._get_data(itr)['time_stamps'])
+    np.testing.assert_array_equal(worker._get_data(itr)['rec0']['HR'], importer._get_data(itr)['rec0']['HR'])
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cmda.read_data import RollingWindowCSV
+from cmda.feature_extraction import Features
+from cmda.pipeline import Pipeline, ParquetSink, ArrowSink, SQLiteSink, FeatureMatrix
+
+
+def finite_max(x):
+    # missing in the windows with missing samples
+    return {} if np.isnan(x).any() else {'max': float(np.max(x))}
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    files = []
+    for name, n in (('rec0', 500), ('rec1', 300)):
+        files.append(str(tmp_path / f'{name}.csv'))
+        x = np.arange(n, dtype='float64')
+        # the first window has no samples of ABP
+        pd.DataFrame({'ECG': x, 'ABP': np.where(x < 100, np.nan, -x)}).to_csv(files[-1], index=False)
+    features = Features()
+    features.add.mean()
+    features.add.std()
+    features.udf.add(finite_max)
+    importer = RollingWindowCSV(files, win_len=1, channels=['ECG', 'ABP'], fs=100)
+    return Pipeline(importer=importer, features=features)
+
+
+COLUMNS = ['ECG_mean', 'ECG_std', 'ECG_max', 'ABP_mean', 'ABP_std', 'ABP_max']
+
+
+def _check(df):
+    df = df.sort_values(['ID', 'ECG_mean'])
+    assert len(df) == 8 and list(df['ID'].unique()) == ['rec0', 'rec1']
+    # the features missing in the first results are in the schema
+    assert set(COLUMNS) <= set(df.columns)
+    rec0 = df[df['ID'] == 'rec0']
+    np.testing.assert_allclose(rec0['ECG_mean'], [49.5, 149.5, 249.5, 349.5, 449.5])
+    np.testing.assert_allclose(rec0['ECG_max'], [99, 199, 299, 399, 499])
+    np.testing.assert_allclose(rec0['ABP_max'], [np.nan, -100, -200, -300, -400])
+
+
+@pytest.mark.parametrize('sink_type', [ParquetSink, ArrowSink])
+def test_arrow_sinks(pipeline, tmp_path, sink_type):
+    pytest.importorskip('pyarrow')
+    sink = sink_type(str(tmp_path / 'out'), row_group_size=2)
+    assert pipeline.run(sink=sink) == sink.path
+    assert sink.columns == COLUMNS
+    df = sink.read()
+    # one file per record, features downcasted and dictionary-encoded record names
+    assert df['ECG_mean'].dtype == 'float32'
+    _check(df.astype({'ID': str}))
+
+
+def test_sqlite_sink(pipeline, tmp_path):
+    sink = SQLiteSink(str(tmp_path / 'out.sqlite'), row_group_size=3)
+    pipeline.run(sink=sink)
+    _check(sink.read())
+
+
+def test_feature_matrix(pipeline):
+    m = pipeline.run(array_output=True, dtype='float32')
+    assert isinstance(m, FeatureMatrix) and m.columns == COLUMNS
+    assert m.values.shape == (8, 6) and m.values.dtype == 'float32'
+    _check(m.to_dataframe())
+
+
+def test_sink_given_columns(pipeline, tmp_path):
+    sink = SQLiteSink(str(tmp_path / 'out.sqlite'), columns=['ECG_mean'])
+    with pytest.warns(UserWarning, match='not in the sink schema'):
+        pipeline.run(sink=sink)
+    assert list(sink.read().columns) == ['ID', 'index', 'ECG_mean']
+
+
+def test_feature_matrix_rows():
+    m = FeatureMatrix(n_rows=2, columns=['a', 'b'], dtype='float32')
+    for i in range(5):
+        res = {'ID': f'rec{i % 2}', 'a': i} if i == 3 else {'ID': f'rec{i % 2}', 'a': i, 'b': 2*i}
+        m.write(index=i*100, res=res)
+    # the matrix grows beyond the expected number of rows, and the missing features are NaN
+    assert len(m) == 5 and m.values.dtype == 'float32'
+    np.testing.assert_array_equal(m.values[:, 0], np.arange(5))
+    np.testing.assert_array_equal(m.values[:, 1], [0, 2, 4, np.nan, 8])
+    assert list(m.index) == [0, 100, 200, 300, 400]
+    assert list(m.ids) == ['rec0', 'rec1', 'rec0', 'rec1', 'rec0']
+
+    with pytest.warns(UserWarning, match='feature c is not in the schema'):
+        m.write(index=500, res={'ID': 'rec1', 'a': 5, 'c': 1})
+    df = m.to_dataframe()
+    assert list(df.columns) == ['ID', 'a', 'b'] and len(df) == 6
+    # the dataframe shares the matrix
+    assert np.shares_memory(df['a'].to_numpy(), m.values)
@@ -0,0 +1,106 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from cmda.feature_extraction import Features
+from cmda.preprocessing import Filters
+from cmda.pipeline import StreamingPipeline
+from cmda.pipeline._streaming import RingBuffer
+
+
+FS = 100
+
+
+def centre(x):
+    # modifies its input in place
+    x -= x.mean()
+    return x
+
+
+def _features():
+    features = Features()
+    features.add.mean()
+    features.add.std()
+    return features
+
+
+def _reference(x, win, step):
+    # features of the windows computed on the whole signal
+    res = []
+    for start in range(0, x.shape[0] - win + 1, step):
+        w = x[start:start + win]
+        res.append(((start, start + win), {
+            'ID': 'stream',
+            'ECG_mean': w[:, 0].mean(), 'ECG_std': w[:, 0].std(),
+            'ABP_mean': w[:, 1].mean(), 'ABP_std': w[:, 1].std(),
+        }))
+    return res
+
+
+def test_ring_buffer():
+    buf = RingBuffer(5)
+    buf.extend(np.arange(3))
+    buf.extend(np.arange(3, 8))
+    assert len(buf) == 5 and buf.total == 8
+    np.testing.assert_array_equal(buf.view(3, 8), np.arange(3, 8))
+    # the window is a view of the buffer
+    assert buf.view(4, 7).base is not None
+
+
+@pytest.mark.parametrize('step', [None, 0.5])
+def test_push_chunks(step):
+    x = np.random.default_rng(0).normal(size=(1000, 2))
+    stream = StreamingPipeline(_features(), channels=['ECG', 'ABP'], fs=FS, win_len=2, step=step)
+    res = []
+    chunks = np.split(x, [7, 150, 151, 420, 700])
+    for chunk in chunks:
+        res.extend(stream.push(chunk))
+    ref = _reference(x, 200, 200 if step is None else 50)
+    assert [i for i, _ in res] == [i for i, _ in ref]
+    for (_, a), (_, b) in zip(res, ref):
+        assert a == pytest.approx(b)
+
+
+def test_channels_pushed_separately():
+    x = np.random.default_rng(0).normal(size=(600, 2))
+    seen = []
+    stream = StreamingPipeline(
+        _features(), channels=['ECG', 'ABP'], fs=FS, win_len=2, buffer_len=6, callback=lambda i, r: seen.append(i)
+    )
+    # no window is complete until both channels have its samples
+    assert stream.push({'ECG': x[:, 0]}) == []
+    res = stream.push({'ABP': x[:, 1]})
+    assert [i for i, _ in res] == seen == [(0, 200), (200, 400), (400, 600)]
+
+    with pytest.raises(ValueError):
+        stream.push({'ECG': np.zeros(1000)})
+
+
+def test_stream_filters():
+    x = np.random.default_rng(0).normal(size=(800, 2)) + 5
+    filters = Filters()
+    filters.udf.add(centre)
+    # overlapping windows, whose samples are shared in the buffers
+    stream = StreamingPipeline(_features(), channels=['ECG', 'ABP'], fs=FS, win_len=2, step=1, filters=filters)
+    res = list(stream.stream(np.split(x, 8)))
+    ref = _reference(x, 200, 100)
+    assert len(res) == len(ref) == 7
+    for (_, a), (_, b) in zip(res, ref):
+        assert a['ECG_mean'] == pytest.approx(0, abs=1e-9)
+        assert a['ECG_std'] == pytest.approx(b['ECG_std'])
+
+
+def test_astream():
+    x = np.random.default_rng(0).normal(size=(400, 2))
+
+    async def source():
+        for chunk in np.split(x, 4):
+            yield chunk
+
+    async def collect():
+        stream = StreamingPipeline(_features(), channels=['ECG', 'ABP'], fs=FS, win_len=2)
+        return [r async for r in stream.astream(source())]
+
+    res = asyncio.run(collect())
+    assert [i for i, _ in res] == [(0, 200), (200, 400)]
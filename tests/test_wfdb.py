@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from cmda.benchmarks.synthetic import generate_ecg
+from cmda.feature_extraction import Features
+from cmda.preprocessing import Filters
+from cmda.pipeline import Pipeline, ParquetSink
+from cmda.read_data import ReadWFDB, RollingWindowWFDB, HeaderCatalog
+
+wfdb = pytest.importorskip('wfdb')
+
+
+FS = 100
+
+
+@pytest.fixture
+def records(tmp_path):
+    names = []
+    for seed, name in enumerate(('rec0', 'rec1')):
+        x = generate_ecg(duration=20, fs=FS, seed=seed, dtype='float64')
+        wfdb.wrsamp(
+            name, fs=FS, units=['mV', 'mV'], sig_name=['ECG', 'ABP'], p_signal=np.stack([x, 2*x], axis=1),
+            fmt=['16', '16'], write_dir=str(tmp_path)
+        )
+        names.append(str(tmp_path / name))
+    return names
+
+
+def centre(x):
+    # modifies its input in place
+    x -= x.mean()
+    return x
+
+
+def test_filter_in_place(records):
+    features = Features()
+    features.add.mean()
+    features.add.std()
+    filters = Filters()
+    filters.udf.add(centre)
+    # overlapping windows, which are views of the same array when a record is read at once
+    importer = RollingWindowWFDB(records, None, win_len=5, step=2)
+    pipeline = Pipeline(importer=importer, features=features, filters=filters)
+    ref = list(pipeline.iter_run(n_jobs=1))
+    res = list(pipeline.iter_run(n_jobs=1, group_by_record=True))
+    assert len(res) == len(ref) == 16
+    for (i, x), (j, y) in zip(res, ref):
+        assert i == j
+        assert x['ECG_std'] == pytest.approx(y['ECG_std'])
+        assert x['ECG_mean'] == pytest.approx(0, abs=1e-9)
+
+
+def test_window_index(records, tmp_path):
+    features = Features()
+    features.add.mean()
+    pipeline = Pipeline(importer=RollingWindowWFDB(records, None, win_len=5), features=features)
+    res = pipeline.run(n_jobs=1, group_by_record=True)
+    # the windows of the two records have the same sample ranges, but not the same index
+    assert len(res) == 8
+    assert ('rec0', 0, 499) in res and ('rec1', 0, 499) in res
+    assert res['rec0', 0, 499]['ID'] == 'rec0'
+
+    sink = ParquetSink(str(tmp_path / 'out'))
+    pipeline.run(n_jobs=1, sink=sink)
+    df = sink.read()
+    assert len(df) == 8 and set(df['ID']) == {'rec0', 'rec1'}
+
+
+@pytest.fixture
+def multi_segment(tmp_path):
+    # fixed layout record: two segments separated by a gap of 300 samples
+    rng = np.random.default_rng(0)
+    for i, n in enumerate((700, 500)):
+        wfdb.wrsamp(
+            f'seg{i}', fs=FS, units=['mV', 'mV'], sig_name=['ECG', 'ABP'], p_signal=rng.normal(size=(n, 2)),
+            fmt=['16', '16'], write_dir=str(tmp_path)
+        )
+    (tmp_path / 'multi.hea').write_text('multi/3 2 100 1500\nseg0 700\n~ 300\nseg1 500\n')
+    return str(tmp_path / 'multi')
+
+
+def test_multi_segment(multi_segment, tmp_path):
+    rec = ReadWFDB([multi_segment]).load(n_jobs=1)[0]['multi']
+    seg0 = wfdb.rdrecord(str(tmp_path / 'seg0')).p_signal.T
+    assert rec.channels == ['ECG', 'ABP'] and rec.array.shape == (2, 1500)
+    np.testing.assert_array_equal(rec.array[:, :700], seg0)
+    assert np.isnan(rec.array[:, 700:1000]).all()
+
+    # the channels of the record are stored in the catalog, and read from it the second time
+    catalog = str(tmp_path / 'catalog.sqlite')
+    for _ in range(2):
+        res = ReadWFDB([multi_segment], catalog=catalog).load(n_jobs=1)[0]['multi']
+        assert res.channels == rec.channels
+        np.testing.assert_array_equal(res.array, rec.array)
+
+    importer = RollingWindowWFDB([multi_segment], None, win_len=2, catalog=catalog, segments='within')
+    assert [samples[0] for _, _, samples in importer.iterators] == [0, 200, 400, 1000, 1200]
+    data = importer._get_data(importer.iterators[3])['multi']
+    np.testing.assert_array_equal(data.array, rec.array[:, 1000:1199])
+
+
+def test_header_catalog(records, multi_segment, tmp_path, monkeypatch):
+    path = str(tmp_path / 'catalog.sqlite')
+    read = []
+    scan = HeaderCatalog._read
+    monkeypatch.setattr(HeaderCatalog, '_read', lambda self, recs: read.append(list(recs)) or scan(self, recs))
+
+    keys = [(r, None) for r in records + [multi_segment]]
+    headers = HeaderCatalog(path).scan(keys)
+    assert headers[keys[0]]['sig_name'] == ['ECG', 'ABP'] and headers[keys[0]]['sig_len'] == 20*FS
+    assert headers[keys[2]]['seg_len'] == [700, 300, 500] and headers[keys[2]]['sig_name'] == ['ECG', 'ABP']
+    assert read == [keys]
+
+    # a new catalog on the same file only reads the headers which changed
+    read.clear()
+    assert HeaderCatalog(path).scan(keys) == headers
+    assert read == []
+    with open(records[1] + '.hea', 'a') as f:
+        f.write('# changed\n')
+    assert HeaderCatalog(path).scan(keys) == headers
+    assert read == [[keys[1]]]